@@ -0,0 +1,209 @@
+"""
+benchmark.py
+Times the G15 parsing hot paths against the recorded `g15_dumpplayer` log and synthetic dumps for 12, 24, 32 and 100
+slot servers, writes the results as JSON and compares them against a stored baseline.
+
+Run from the repository root:
+    python -m src.modules.backend.g15parser.benchmark [--update-baseline]
+
+Exits non-zero if any benchmark is slower than its baseline by more than the threshold.
+
+Results go to data/benchmarks/g15_results.json (not tracked). The baseline, data/benchmarks/g15_baseline.json, is
+tracked and was recorded with the defaults (its "meta" says on what). Timings only compare on the same machine, so
+before measuring a change, record a baseline of the unchanged tree with `--update-baseline`, then run without it.
+"""
+from src.modules.backend.g15parser.consumer import G15DumpPlayer, G15DeltaParser, MAX_PLAYER_SLOTS
+from src.modules.backend.g15parser.helpers import get_player_idx, get_player_stats_from_identifier
+from typing import Callable
+from pathlib import Path
+from datetime import datetime
+
+import argparse
+import platform
+import random
+import statistics
+import json
+import time
+import sys
+
+DATA_PATH: Path = Path(__file__).parents[4].joinpath("data")
+RECORDED_DUMP: Path = DATA_PATH.joinpath("logs/g15_dumpplayer.log")
+RESULTS_PATH: Path = DATA_PATH.joinpath("benchmarks/g15_results.json")
+BASELINE_PATH: Path = DATA_PATH.joinpath("benchmarks/g15_baseline.json")
+SYNTHETIC_SLOTS: list[int] = [12, 24, 32, 100]
+
+# The per-slot fields of (playerresource), in the order the dump emits them
+_RESOURCE_FIELDS: list[str] = [
+    "m_iPing", "m_iScore", "m_iDeaths", "m_bConnected", "m_iTeam", "m_bAlive",
+    "m_iHealth", "m_iAccountID", "m_iUserID", "m_bValid",
+]
+
+
+def synthesise_dump(recorded: str, players: int, seed: int = 0) -> str:
+    """
+    Build a `g15_dumpplayer` output for a server with `players` occupied slots, by replacing the per-slot lines of the
+    recorded dumps (playerresource) section with generated ones. All other sections are kept as recorded.
+
+    :param recorded: the recorded dump to base the synthetic one on
+    :param players: the number of occupied player slots (1..players)
+    :param seed: seed for the generated values, so every run benchmarks the same dump
+    :return: the synthetic dump
+    """
+    _rng = random.Random(seed)
+    _slots = max(34, players + 2)
+    if _slots > MAX_PLAYER_SLOTS:
+        raise ValueError(f"Can't synthesise {players} players, the parser only has {MAX_PLAYER_SLOTS} slots.")
+
+    _lines = recorded.replace("\r\n", "\n").split("\n")
+    _start = _lines.index(G15DumpPlayer.playerresource)
+    _stop = _lines.index(G15DumpPlayer.localplayerweapon)
+
+    _generated = []
+    for _idx in range(_slots):
+        _occupied = 1 <= _idx <= players
+        if _idx:
+            _generated.append(f"m_szName[{_idx}] string ({f'player {_idx}' if _occupied else 'unconnected'})")
+        _values = {
+            "m_iPing": _rng.randint(5, 250) if _occupied else 0,
+            "m_iScore": _rng.randint(0, 60) if _occupied else 0,
+            "m_iDeaths": _rng.randint(0, 40) if _occupied else 0,
+            "m_bConnected": "true" if _occupied else "false",
+            "m_iTeam": 2 + _idx % 2 if _occupied else 0,
+            "m_bAlive": "true" if _occupied and _rng.random() > 0.2 else "false",
+            "m_iHealth": _rng.randint(1, 300) if _occupied else 0,
+            "m_iAccountID": 100000000 + _idx if _occupied else 0,
+            "m_iUserID": 100 + _idx if _occupied else -1,
+            "m_bValid": "true" if _occupied else "false",
+        }
+        for _field in _RESOURCE_FIELDS:
+            _type = "bool" if _field.startswith("m_b") else "integer"
+            _generated.append(f"{_field}[{_idx}] {_type} ({_values[_field]})")
+
+    _kept = [_line for _line in _lines[_start + 1:_stop] if "[" not in _line.split(" ")[0]]
+    return "\n".join(_lines[:_start + 1] + _generated + _kept + _lines[_stop:])
+
+
+def _time_call(fn: Callable[[], None], repeat: int, number: int) -> dict[str, float]:
+    """ Time `fn` in `repeat` batches of `number` calls, returning per-call microseconds. """
+    _samples = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        _samples.append((time.perf_counter() - _start) / number * 1e6)
+    return {
+        "min_us": min(_samples),
+        "median_us": statistics.median(_samples),
+        "max_us": max(_samples),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def benchmark_corpus(dump_str: str, repeat: int, number: int) -> dict[str, dict[str, float]]:
+    """ Run every benchmark against one dump. """
+    _dump = G15DumpPlayer(dump_str)
+    _sid3s = [f"[U:1:{_aid}]" for _aid in _dump.get_local_player_resource_data().m_iAccountID if _aid]
+
+    def _lookup_all() -> None:
+        _dump.invalidate_derived()
+        for _sid3 in _sid3s:
+            get_player_idx(_dump, sid3=_sid3)
+
+    def _stats_all() -> None:
+        _dump.invalidate_derived()
+        for _sid3 in _sid3s:
+            get_player_stats_from_identifier(_dump, sid3=_sid3)
+
+    _delta = G15DeltaParser()
+    _delta.update(dump_str)
+
+    return {
+        "construct": _time_call(lambda: G15DumpPlayer(dump_str), repeat, number),
+        "construct_packed_vectors": _time_call(lambda: G15DumpPlayer(dump_str, pack_vectors=True), repeat, number),
+        "get_player_idx_all": _time_call(_lookup_all, repeat, number),
+        "get_player_stats_from_identifier_all": _time_call(_stats_all, repeat, number),
+        "delta_update_unchanged": _time_call(lambda: _delta.update(dump_str), repeat, number),
+    }
+
+
+def run_benchmarks(repeat: int, number: int) -> dict:
+    with open(RECORDED_DUMP, 'r') as h:
+        _recorded = h.read()
+
+    _corpora = {"recorded": _recorded}
+    for _players in SYNTHETIC_SLOTS:
+        _corpora[f"synthetic_{_players}"] = synthesise_dump(_recorded, _players)
+
+    _results = {}
+    for _name, _dump_str in _corpora.items():
+        for _bench, _timing in benchmark_corpus(_dump_str, repeat, number).items():
+            _results[f"{_name}/{_bench}"] = _timing
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": _results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare median timings against the baseline.
+
+    :return: the names of the benchmarks that regressed by more than `threshold` (a fraction, e.g. 0.1 for 10%)
+    """
+    _regressions = []
+    for _name, _timing in results["results"].items():
+        _base = baseline["results"].get(_name)
+        if _base is None:
+            print(f"{_name:<55} {_timing['median_us']:>10.1f}us  (no baseline)")
+            continue
+        _ratio = _timing["median_us"] / _base["median_us"]
+        _flag = ""
+        if _ratio > 1 + threshold:
+            _flag = "  REGRESSION"
+            _regressions.append(_name)
+        print(f"{_name:<55} {_timing['median_us']:>10.1f}us  x{_ratio:.2f} vs {_base['median_us']:.1f}us{_flag}")
+    return _regressions
+
+
+def main():
+    _parser = argparse.ArgumentParser(description="Benchmark the G15 parser.")
+    _parser.add_argument("--repeat", type=int, default=7)
+    _parser.add_argument("--number", type=int, default=50)
+    _parser.add_argument("--output", type=Path, default=RESULTS_PATH)
+    _parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    _parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown vs baseline (0.1 = 10%%)")
+    _parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    _args = _parser.parse_args()
+
+    _results = run_benchmarks(_args.repeat, _args.number)
+
+    _args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(_args.output, 'w') as h:
+        json.dump(_results, h, indent=2)
+
+    _regressions = []
+    if _args.baseline.exists():
+        with open(_args.baseline, 'r') as h:
+            _regressions = compare(_results, json.load(h), _args.threshold)
+    else:
+        print(f"No baseline at {_args.baseline}, nothing to compare against.")
+
+    if _args.update_baseline:
+        _args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(_args.baseline, 'w') as h:
+            json.dump(_results, h, indent=2)
+        print(f"Stored baseline at {_args.baseline}")
+
+    if _regressions:
+        print(f"{len(_regressions)} benchmark(s) regressed by more than {_args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,50 @@
 from enum import Enum
-from datetime import datetime
-from typing import Union
+from typing import Union, Callable, Any, Self, Iterator, NamedTuple
 from pathlib import Path
+from threading import Lock
 from src.modules.backend.rc.rcon_client import RCONListener
 
 import loguru
 
-from src.modules.backend.rc.FragClient import FragClient
 import numpy as np
+import functools
+import atexit
 import struct
+import time
 import re
 
 FLOAT_MAX = struct.unpack('>f', b'\x7f\x7f\xff\xff')
+# Length of the per-player arrays in (playerresource). The dump has always emitted 34 slots (the world + 33), but
+# servers running TF2's 100 player support emit up to MAX_PLAYERS (101) + 1.
+MAX_PLAYER_SLOTS: int = 102
+_ARRAY_REGEX = re.compile(r"^(.+)\[(\d+)\]$")
+_RAW_VALUE_REGEX = re.compile(r"^([\w.\[\]]*)(.*)$", re.DOTALL)
 
 
 class Vector3D:
     """
-    Dummy vector class that uses np.arrays for the pure fact that np implemented
-    vector arithmetic and operations, which may or may not be useful at any point.
+    A vector field from the dump. Only the raw `x y z` text is kept when parsing, it is decoded into a float triple the
+    first time it is read, so the dozens of vectors in each dump that nobody looks at cost next to nothing.
     """
-    def __init__(self, vec: list):
-        self.vec = np.array(vec)
+    __slots__ = ("_raw", "_xyz")
 
-    def get(self):
-        return self.vec
+    def __init__(self, vec: str | list) -> None:
+        if isinstance(vec, str):
+            self._raw = vec
+            self._xyz = None
+        else:
+            self._raw = None
+            self._xyz = tuple(float(_c) for _c in vec)
+
+    @property
+    def xyz(self) -> tuple[float, float, float]:
+        if self._xyz is None:
+            _x, _y, _z = self._raw.split()
+            self._xyz = (float(_x), float(_y), float(_z))
+        return self._xyz
+
+    def get(self) -> np.ndarray:
+        return np.array(self.xyz, dtype=np.float32)
 
 
 _jd = dict[str, Union[int, float, bool, str, Vector3D, bytes]]
@@ -40,235 +61,294 @@ class Team(Enum):
     Blue = 3
 
 
-class InternalVarMShared:
-    """
-    m_Shared is a struct that is mapped across several classes/structs in the g15 dump, and thus we store them
-    externally to the data classes themselves to allow cross-class referencing
-    """
-    m_nPlayerState: int = None
-    m_nPlayerCond: int = None
-    m_flCloakMeter: float = None
-    m_flRageMeter: float = None
-    m_flNextRageEarnTime: float = None
-    m_bRageDraining: bool = None
-    m_flEnergyDrinkMeter: float = None
-    m_flInvisChangeCompleteTime: float = None
-    m_flHypeMeter: float = None
-    m_nDisguiseTeam: int = None
-    m_flChargeMeter: float = None
-    m_nDisguiseClass: int = None
-    m_bJumping: bool = None
-    m_nDisguiseSkinOverride: int = None
-    m_iAirDash: int = None
-    m_nMaskClass: int = None
-    m_nAirDucked: int = None
-    m_nDesiredDisguiseTeam: int = None
-    m_flDuckTimer: float = None
-    m_nDesiredDisguiseClass: int = None
-    m_bLastDisguisedAsOwnTeam: bool = None
-    m_bFeignDeathReady: bool = None
-    m_nPlayerCondEx: int = None
-    m_nPlayerCondEx2: int = None
-    m_flDisguiseCompleteTime: float = None
-    m_nPlayerCondEx3: int = None
-    m_bHasPasstimeBall: bool = None
-    m_nPlayerCondEx4: int = None
-    m_bIsTargetedForPasstimePass: bool = None
-    m_askForBallTime: float = None
-    m_flItemChargeMeter: list[float] = None
+class G15Field(NamedTuple):
+    """ One field of a G15 data class: its var name, value type and (for arrays) length. """
+    name: str
+    type: type | None  # None for fields the dump only ever names, a g15_struct type for nested structs
+    length: int | None = None  # array length, or None for scalar fields
+    default: Any = None  # the scalar default, arrays are filled with the zero value of their type
 
-    def __init__(self) -> None:
-        self.m_flItemChargeMeter = [0.0]*10
 
+# zero value that array fields are filled with, by element type
+_ARRAY_DEFAULTS: dict[type, Any] = {int: 0, float: 0.0, bool: False, str: "", Team: Team.Unconnected}
 
-class InternalVarMLocal:
-    """
-    m_Local is a shared struct that contains data on the local player and events
-    """
-    m_nStepside: int = None
-    m_bPrevForceLocalPlayerDraw: bool = None
-    m_iHideHUD: int = None
-    m_vecPunchAngle: Vector3D = None
-    m_vecPunchAngleVel: Vector3D = None
-    m_bDrawViewmodel: bool = None
-    m_bAllowAutoMovement: bool = None
-    m_bWearingSuit: bool = None
-    m_bDucked: bool = None
-    m_bPoisoned: bool = None
-    m_bDucking: bool = None
-    m_bForceLocalPlayerDraw: bool = None
-    m_bInDuckJump: bool = None
-    m_flDucktime: float = None
-    m_flDuckJumpTime: float = None
-    m_flJumpTime: float = None
-    m_flFallVelocity: float = None
-    m_nOldButtons: int = None
-    m_flOldForwardMove: float = None
-    m_flStepSize: float = None
-    m_flFOVRate: float = None
-
-
-class InternalVarMCollision:
+
+def g15_struct(name: str, doc: str, fields: list[G15Field]) -> type:
     """
-    m_Collision is a common struct between multiple classes, and details the relevant components of the collision
-    properties of something. Technically each data class should have its own instance of this, but since we don't
-    actually care about collision properties, we just have every class point at the same one. This can be changed
-    later if necessary.
+    Generate a `__slots__` data class for one G15 section (or nested struct) from its field schema. Nested structs
+    (fields typed with another g15_struct) get a fresh instance per object, so no two dumps share any state, and the
+    slots keep each instance free of a `__dict__`, which keeps historical dumps cheap to hold on to.
+
+    :param name: the class name
+    :param doc: the class docstring
+    :param fields: the schema, in dump order
+    :return: the generated class
     """
-    m_vecMinsPreScaled: Vector3D = None
-    m_vecMaxsPreScaled: Vector3D = None
-    m_vecMaxs: Vector3D = None
-    m_vecMins: Vector3D = None
-    m_nSolidType: None = None
-    m_triggerBloat: None = None
-    m_usSolidFlags: int = None
-    m_bUniformTriggerBloat: bool = None
-
+    _scalars = tuple((_f.name, _f.default) for _f in fields if _f.length is None and not hasattr(_f.type, "schema"))
+    _arrays = tuple((_f.name, _ARRAY_DEFAULTS.get(_f.type), _f.length) for _f in fields if _f.length is not None)
+    _structs = tuple((_f.name, _f.type) for _f in fields if _f.length is None and hasattr(_f.type, "schema"))
 
-class InternalVar:
+    def __init__(self) -> None:
+        for _name, _default in _scalars:
+            setattr(self, _name, _default)
+        for _name, _default, _length in _arrays:
+            setattr(self, _name, [_default] * _length)
+        for _name, _struct in _structs:
+            setattr(self, _name, _struct())
+
+    def as_dict(self) -> dict[str, Any]:
+        """ The fields of this instance (nested structs included) as a plain dict. """
+        return {
+            _f.name: getattr(self, _f.name).as_dict() if hasattr(_f.type, "schema") else getattr(self, _f.name)
+            for _f in fields
+        }
+
+    return type(name, (), {
+        "__doc__": doc,
+        "__module__": __name__,
+        "__slots__": tuple(_f.name for _f in fields),
+        "__init__": __init__,
+        "as_dict": as_dict,
+        "schema": tuple(fields),
+    })
+
+
+InternalVarMShared = g15_struct(
+    "InternalVarMShared",
     """
-    Data class containing references to shared common structs
+    m_Shared is a struct that is mapped across several classes/structs in the g15 dump. Every data class instance gets
+    its own copy, so separate dumps never share state.
+    """,
+    [
+        G15Field("m_nPlayerState", int),
+        G15Field("m_nPlayerCond", int),
+        G15Field("m_flCloakMeter", float),
+        G15Field("m_flRageMeter", float),
+        G15Field("m_flNextRageEarnTime", float),
+        G15Field("m_bRageDraining", bool),
+        G15Field("m_flEnergyDrinkMeter", float),
+        G15Field("m_flInvisChangeCompleteTime", float),
+        G15Field("m_flHypeMeter", float),
+        G15Field("m_nDisguiseTeam", int),
+        G15Field("m_flChargeMeter", float),
+        G15Field("m_nDisguiseClass", int),
+        G15Field("m_bJumping", bool),
+        G15Field("m_nDisguiseSkinOverride", int),
+        G15Field("m_iAirDash", int),
+        G15Field("m_nMaskClass", int),
+        G15Field("m_nAirDucked", int),
+        G15Field("m_nDesiredDisguiseTeam", int),
+        G15Field("m_flDuckTimer", float),
+        G15Field("m_nDesiredDisguiseClass", int),
+        G15Field("m_bLastDisguisedAsOwnTeam", bool),
+        G15Field("m_bFeignDeathReady", bool),
+        G15Field("m_nPlayerCondEx", int),
+        G15Field("m_nPlayerCondEx2", int),
+        G15Field("m_flDisguiseCompleteTime", float),
+        G15Field("m_nPlayerCondEx3", int),
+        G15Field("m_bHasPasstimeBall", bool),
+        G15Field("m_nPlayerCondEx4", int),
+        G15Field("m_bIsTargetedForPasstimePass", bool),
+        G15Field("m_askForBallTime", float),
+        G15Field("m_flItemChargeMeter", float, 10),
+    ]
+)
+
+
+InternalVarMLocal = g15_struct(
+    "InternalVarMLocal",
     """
-    m_Shared = InternalVarMShared()
-    m_Local = InternalVarMLocal()
-    m_Collision = InternalVarMCollision()
-
+    m_Local is a shared struct that contains data on the local player and events
 
-class pl:
+    """,
+    [
+        G15Field("m_nStepside", int),
+        G15Field("m_bPrevForceLocalPlayerDraw", bool),
+        G15Field("m_iHideHUD", int),
+        G15Field("m_vecPunchAngle", Vector3D),
+        G15Field("m_vecPunchAngleVel", Vector3D),
+        G15Field("m_bDrawViewmodel", bool),
+        G15Field("m_bAllowAutoMovement", bool),
+        G15Field("m_bWearingSuit", bool),
+        G15Field("m_bDucked", bool),
+        G15Field("m_bPoisoned", bool),
+        G15Field("m_bDucking", bool),
+        G15Field("m_bForceLocalPlayerDraw", bool),
+        G15Field("m_bInDuckJump", bool),
+        G15Field("m_flDucktime", float),
+        G15Field("m_flDuckJumpTime", float),
+        G15Field("m_flJumpTime", float),
+        G15Field("m_flFallVelocity", float),
+        G15Field("m_nOldButtons", int),
+        G15Field("m_flOldForwardMove", float),
+        G15Field("m_flStepSize", float),
+        G15Field("m_flFOVRate", float),
+    ]
+)
+
+
+InternalVarMCollision = g15_struct(
+    "InternalVarMCollision",
+    """
+    m_Collision is a common struct between multiple classes, and details the relevant components of the collision
+    properties of something. Each data class instance has its own.
+    """,
+    [
+        G15Field("m_vecMinsPreScaled", Vector3D),
+        G15Field("m_vecMaxsPreScaled", Vector3D),
+        G15Field("m_vecMaxs", Vector3D),
+        G15Field("m_vecMins", Vector3D),
+        G15Field("m_nSolidType", None),
+        G15Field("m_triggerBloat", None),
+        G15Field("m_usSolidFlags", int),
+        G15Field("m_bUniformTriggerBloat", bool),
+    ]
+)
+
+
+pl = g15_struct(
+    "pl",
     """
     this is a bit of a stub, but the way it appears in the dump output, `pl` is probably a player struct, but may or may
     not be an artifact of porting from half life 1, and thus has mostly irrelevant data in it that doesn't pertain to
     multiplayer. Either that or they don't like revealing the data in here...
-    """
-    deadflag: bool = None
+    """,
+    [
+        G15Field("deadflag", bool),
+    ]
+)
 
 
-class IntVarLocalPlayer:
+IntVarLocalPlayer = g15_struct(
+    "IntVarLocalPlayer",
     """
     Local player data, most useful thing in here is probably `m_iTeamNum`, but this is duplicated across other
     data classes anyway. Notably, the current ammo in mag value of _every player in the server_ is recorded in here.
-    """
-    m_Shared = InternalVar.m_Shared
-    m_Local = InternalVar.m_Local
-    m_nSequence: int = None
-    m_flPlaybackRate: float = None
-    m_flCycle: float = None
-    m_flEncodedController: list[float] = None
-    m_nSkin: int = None
-    m_nBody: int = None
-    m_nNewSequenceParity: int = None
-    m_nResetEventsParity: int = None
-    m_flInspectTime: float = None
-    m_nMuzzleFlashParity: None = None
-    m_flHelpmeButtonPressTime: float = None
-    m_flTauntYaw: float = None
-    m_flCurrentTauntMoveSpeed: float = None
-    m_flVehicleReverseTime: float = FLOAT_MAX,
-    pl: pl = pl
-    m_iFOV: int = None
-    m_flFOVTime: float = None
-    m_iFOVStart: int = None
-    m_flMaxspeed: float = None
-    m_iHealth: int = None
-    m_iBonusProgress: int = None
-    m_iBonusChallenge: int = None
-    m_fOnTarget: bool = None
-    m_nNextThinkTick: int = None
-    m_vecBaseVelocity: Vector3D = None
-    m_lifeState: None = None
-    m_nButtons: int = None
-    m_nWaterLevel: None = None
-    m_flWaterJumpTime: float = None
-    m_nImpulse: int = None
-    m_flPhysics: int = None
-    m_flStepSoundTime: float = None
-    m_szAnimExtensiongl: None = None
-    m_flSwimSoundTime: float = None
-    m_afButtonLast: int = None
-    m_vecLadderNormal: Vector3D = None
-    m_afButtonPressed: int = None
-    m_iAmmo: list[int] = None
-    m_afButtonReleased: int = None
-    m_nTickBase: int = None
-    m_surfaceFriction: int = None
-    m_flNextAttack: float = None
-    m_nPrevSequence: int = None
-    m_Collision = InternalVar.m_Collision
-    m_MoveCollide: None = None
-    m_MoveType: bytes = None
-    m_vecAbsVelocity: Vector3D = None
-    m_vecVelocity: Vector3D = None
-    m_nRenderMode: None = None
-    m_nRenderFX: None = None
-    m_fFlags: int = None
-    m_vecViewOffset: Vector3D = None
-    m_nModelIndex: int = None
-    m_flFriction: float = None
-    m_iTeamNum: int = None
-    m_vecNetworkOrigin: Vector3D = None
-    m_vecAbsOrigin: Vector3D = None
-    m_angNetworkAngles: Vector3D = None
-    m_angAbsRotation: Vector3D = None
-    m_vecOrigin: Vector3D = None
-    m_angRotation: Vector3D = None
-    m_vecAngVelocity: Vector3D = None
-    m_nWaterType: None = None
-    m_bDormant: bool = None
-    m_flGravity: float = None
-    m_iEFlags: int = None
-    m_flProxyRandomValue: float = None
-
-    def __init__(self):
-        self.m_flEncodedController: list[float] = [0.0]*4
-        self.m_iAmmo: list[int] = [0]*32
-
-
-class IntVarLocalTeam:
+
+    """,
+    [
+        G15Field("m_Shared", InternalVarMShared),
+        G15Field("m_Local", InternalVarMLocal),
+        G15Field("m_nSequence", int),
+        G15Field("m_flPlaybackRate", float),
+        G15Field("m_flCycle", float),
+        G15Field("m_flEncodedController", float, 4),
+        G15Field("m_nSkin", int),
+        G15Field("m_nBody", int),
+        G15Field("m_nNewSequenceParity", int),
+        G15Field("m_nResetEventsParity", int),
+        G15Field("m_flInspectTime", float),
+        G15Field("m_nMuzzleFlashParity", None),
+        G15Field("m_flHelpmeButtonPressTime", float),
+        G15Field("m_flTauntYaw", float),
+        G15Field("m_flCurrentTauntMoveSpeed", float),
+        G15Field("m_flVehicleReverseTime", float, default=FLOAT_MAX[0]),
+        G15Field("pl", pl),
+        G15Field("m_iFOV", int),
+        G15Field("m_flFOVTime", float),
+        G15Field("m_iFOVStart", int),
+        G15Field("m_flMaxspeed", float),
+        G15Field("m_iHealth", int),
+        G15Field("m_iBonusProgress", int),
+        G15Field("m_iBonusChallenge", int),
+        G15Field("m_fOnTarget", bool),
+        G15Field("m_nNextThinkTick", int),
+        G15Field("m_vecBaseVelocity", Vector3D),
+        G15Field("m_lifeState", None),
+        G15Field("m_nButtons", int),
+        G15Field("m_nWaterLevel", None),
+        G15Field("m_flWaterJumpTime", float),
+        G15Field("m_nImpulse", int),
+        G15Field("m_flPhysics", int),
+        G15Field("m_flStepSoundTime", float),
+        G15Field("m_szAnimExtensiongl", None),
+        G15Field("m_flSwimSoundTime", float),
+        G15Field("m_afButtonLast", int),
+        G15Field("m_vecLadderNormal", Vector3D),
+        G15Field("m_afButtonPressed", int),
+        G15Field("m_iAmmo", int, 32),
+        G15Field("m_afButtonReleased", int),
+        G15Field("m_nTickBase", int),
+        G15Field("m_surfaceFriction", int),
+        G15Field("m_flNextAttack", float),
+        G15Field("m_nPrevSequence", int),
+        G15Field("m_Collision", InternalVarMCollision),
+        G15Field("m_MoveCollide", None),
+        G15Field("m_MoveType", bytes),
+        G15Field("m_vecAbsVelocity", Vector3D),
+        G15Field("m_vecVelocity", Vector3D),
+        G15Field("m_nRenderMode", None),
+        G15Field("m_nRenderFX", None),
+        G15Field("m_fFlags", int),
+        G15Field("m_vecViewOffset", Vector3D),
+        G15Field("m_nModelIndex", int),
+        G15Field("m_flFriction", float),
+        G15Field("m_iTeamNum", int),
+        G15Field("m_vecNetworkOrigin", Vector3D),
+        G15Field("m_vecAbsOrigin", Vector3D),
+        G15Field("m_angNetworkAngles", Vector3D),
+        G15Field("m_angAbsRotation", Vector3D),
+        G15Field("m_vecOrigin", Vector3D),
+        G15Field("m_angRotation", Vector3D),
+        G15Field("m_vecAngVelocity", Vector3D),
+        G15Field("m_nWaterType", None),
+        G15Field("m_bDormant", bool),
+        G15Field("m_flGravity", float),
+        G15Field("m_iEFlags", int),
+        G15Field("m_flProxyRandomValue", float),
+    ]
+)
+
+
+IntVarLocalTeam = g15_struct(
+    "IntVarLocalTeam",
     """
     Contains the name of the team the local player is on. Annoyingly this is presented as either the `m_szTeamnameBlue`
     field or the `m_szTeamnameRed` field existing (i.e. not None), perhaps artifacts of having multiple team colors
     planned? either way, it just makes checking the team name slightly more annoying.
-    """
-    m_szTeamnameBlue: None = None
-    m_szTeamnameRed: None = None
-    m_iScore: int = None
-    m_iRoundsWon: int = None
-    m_iPing: int = None
-    m_iDeaths: int = None
-    m_iPacketloss: int = None
-    m_iTeamNum: int = None
-    m_Collision = InternalVar.m_Collision
-    m_MoveType: None = None
-    m_MoveCollide: None = None
-    m_vecAbsVelocity: Vector3D = None
-    m_fFlags: int = None
-    m_vecVelocity: Vector3D = None
-    m_vecViewOffset: Vector3D = None
-    m_nRenderMode: None = None
-    m_nModelIndex: int = None
-    m_nRenderFX: None = None
-    m_flFriction: float = None
-    m_angNetworkAngles: Vector3D = None
-    m_vecNetworkOrigin: Vector3D = None
-    m_vecAbsOrigin: Vector3D = None
-    m_angAbsRotation: Vector3D = None
-    m_vecOrigin: Vector3D = None
-    m_vecAngVelocity: Vector3D = None
-    m_angRotation: Vector3D = None
-    m_bDormant: bool = None
-    m_nWaterLevel: None = None
-    m_vecBaseVelocity: Vector3D = None
-    m_nWaterType: None = None
-    m_iEFlags: int = None
-    m_flGravity: float = None
-    m_flProxyRandomValue: float = None
-    m_szName: list[str] = None
-
-    def __init__(self):
-        self.m_szName: list[str] = [""]*1
-
-
-class IntVarPlayerResource:
+
+    """,
+    [
+        G15Field("m_szTeamnameBlue", None),
+        G15Field("m_szTeamnameRed", None),
+        G15Field("m_iScore", int),
+        G15Field("m_iRoundsWon", int),
+        G15Field("m_iPing", int),
+        G15Field("m_iDeaths", int),
+        G15Field("m_iPacketloss", int),
+        G15Field("m_iTeamNum", int),
+        G15Field("m_Collision", InternalVarMCollision),
+        G15Field("m_MoveType", None),
+        G15Field("m_MoveCollide", None),
+        G15Field("m_vecAbsVelocity", Vector3D),
+        G15Field("m_fFlags", int),
+        G15Field("m_vecVelocity", Vector3D),
+        G15Field("m_vecViewOffset", Vector3D),
+        G15Field("m_nRenderMode", None),
+        G15Field("m_nModelIndex", int),
+        G15Field("m_nRenderFX", None),
+        G15Field("m_flFriction", float),
+        G15Field("m_angNetworkAngles", Vector3D),
+        G15Field("m_vecNetworkOrigin", Vector3D),
+        G15Field("m_vecAbsOrigin", Vector3D),
+        G15Field("m_angAbsRotation", Vector3D),
+        G15Field("m_vecOrigin", Vector3D),
+        G15Field("m_vecAngVelocity", Vector3D),
+        G15Field("m_angRotation", Vector3D),
+        G15Field("m_bDormant", bool),
+        G15Field("m_nWaterLevel", None),
+        G15Field("m_vecBaseVelocity", Vector3D),
+        G15Field("m_nWaterType", None),
+        G15Field("m_iEFlags", int),
+        G15Field("m_flGravity", float),
+        G15Field("m_flProxyRandomValue", float),
+        G15Field("m_szName", str, 1),
+    ]
+)
+
+
+IntVarPlayerResource = g15_struct(
+    "IntVarPlayerResource",
     """
     A big compendium of resources related to _all_ players in the server. This includes:
     - the nick names (i.e. 'personaname') of every player in the server
@@ -282,383 +362,854 @@ class IntVarPlayerResource:
     - the in game ID of every player in the server
     - the current health value of every player on your team
     - the 'validity' of every player slot (probably determines what the scoreboard shows)
-    """
-    m_szName: list[str] = None
-    m_iPing: list[int] = None
-    m_iScore: list[int] = None
-    m_iDeaths: list[int] = None
-    m_bConnected: list[bool] = None
-    m_iTeam: list[Team] = None
-    m_bAlive: list[bool] = None
-    m_iHealth: list[int] = None
-    m_iAccountID: list[int] = None
-    m_iUserID: list[int] = None
-    m_bValid: list[bool] = None
-    m_Collision = InternalVar.m_Collision
-    m_MoveCollide: None = None
-    m_MoveType: None = None
-    m_vecAbsVelocity: Vector3D = None
-    m_nRenderMode: None = None
-    m_vecVelocity: Vector3D = None
-    m_nRenderFX: None = None
-    m_vecViewOffset: Vector3D = None
-    m_fFlags: int = None
-    m_nModelIndex: int = None
-    m_flFriction: float = None
-    m_iTeamNum: int = None
-    m_vecNetworkOrigin: Vector3D = None
-    m_angNetworkAngles: Vector3D = None
-    m_vecAbsOrigin: Vector3D = None
-    m_vecOrigin: Vector3D = None
-    m_angAbsRotation: Vector3D = None
-    m_angRotation: Vector3D = None
-    m_nWaterLevel: None = None
-    m_nWaterType: None = None
-    m_vecAngVelocity: Vector3D= None
-    m_bDormant: bool = None
-    m_vecBaseVelocity: Vector3D = None
-    m_bLowered: bool = None
-    m_iEFlags: int = None
-    m_iReloadMode: int = None
-    m_flGravity: float = None
-    m_bReloadedThroughAnimEvent: bool = None
-    m_flProxyRandomValue: float = None
-    m_bDisguiseWeapon: bool = None
-    m_flEncodedController: list[float] = None
-
-    def __init__(self):
-        self.m_szName: list[str] = [""] * 34
-        self.m_iPing: list[int] = [0] * 34
-        self.m_iScore: list[int] = [0] * 34
-        self.m_iDeaths: list[int] = [0] * 34
-        self.m_bConnected: list[bool] = [False] * 34
-        self.m_iTeam: list[Team] = [Team.Unconnected] * 34
-        self.m_bAlive: list[bool] = [False] * 34
-        self.m_iHealth: list[int] = [0] * 34
-        self.m_iAccountID: list[int] = [0] * 34
-        self.m_iUserID: list[int] = [0] * 34
-        self.m_bValid: list[bool] = [False] * 34
-        self.m_flEncodedController: list[float] = [0.0] * 4
-
-
-class IntVarLocalPlayerWeapon:
+
+    """,
+    [
+        G15Field("m_szName", str, MAX_PLAYER_SLOTS),
+        G15Field("m_iPing", int, MAX_PLAYER_SLOTS),
+        G15Field("m_iScore", int, MAX_PLAYER_SLOTS),
+        G15Field("m_iDeaths", int, MAX_PLAYER_SLOTS),
+        G15Field("m_bConnected", bool, MAX_PLAYER_SLOTS),
+        G15Field("m_iTeam", Team, MAX_PLAYER_SLOTS),
+        G15Field("m_bAlive", bool, MAX_PLAYER_SLOTS),
+        G15Field("m_iHealth", int, MAX_PLAYER_SLOTS),
+        G15Field("m_iAccountID", int, MAX_PLAYER_SLOTS),
+        G15Field("m_iUserID", int, MAX_PLAYER_SLOTS),
+        G15Field("m_bValid", bool, MAX_PLAYER_SLOTS),
+        G15Field("m_Collision", InternalVarMCollision),
+        G15Field("m_MoveCollide", None),
+        G15Field("m_MoveType", None),
+        G15Field("m_vecAbsVelocity", Vector3D),
+        G15Field("m_nRenderMode", None),
+        G15Field("m_vecVelocity", Vector3D),
+        G15Field("m_nRenderFX", None),
+        G15Field("m_vecViewOffset", Vector3D),
+        G15Field("m_fFlags", int),
+        G15Field("m_nModelIndex", int),
+        G15Field("m_flFriction", float),
+        G15Field("m_iTeamNum", int),
+        G15Field("m_vecNetworkOrigin", Vector3D),
+        G15Field("m_angNetworkAngles", Vector3D),
+        G15Field("m_vecAbsOrigin", Vector3D),
+        G15Field("m_vecOrigin", Vector3D),
+        G15Field("m_angAbsRotation", Vector3D),
+        G15Field("m_angRotation", Vector3D),
+        G15Field("m_nWaterLevel", None),
+        G15Field("m_nWaterType", None),
+        G15Field("m_vecAngVelocity", Vector3D),
+        G15Field("m_bDormant", bool),
+        G15Field("m_vecBaseVelocity", Vector3D),
+        G15Field("m_bLowered", bool),
+        G15Field("m_iEFlags", int),
+        G15Field("m_iReloadMode", int),
+        G15Field("m_flGravity", float),
+        G15Field("m_bReloadedThroughAnimEvent", bool),
+        G15Field("m_flProxyRandomValue", float),
+        G15Field("m_bDisguiseWeapon", bool),
+        G15Field("m_flEncodedController", float, 4),
+    ]
+)
+
+
+IntVarLocalPlayerWeapon = g15_struct(
+    "IntVarLocalPlayerWeapon",
     """
     Who knows if much of this is useful? It contains local data on the local players crit seed and such, which may
     prove useful to some.
+
+    """,
+    [
+        G15Field("m_flLastCritCheckTime", float),
+        G15Field("m_flReloadPriorNextFire", float),
+        G15Field("m_flLastFireTime", float),
+        G15Field("m_bCurrentAttackIsCrit", bool),
+        G15Field("m_iCurrentSeed", int),
+        G15Field("m_flEnergy", float),
+        G15Field("m_flEffectBarRegenTime", float),
+        G15Field("m_bBeingRepurposedForTaunt", bool),
+        G15Field("m_nNextThinkTick", int),
+        G15Field("m_iState", int),
+        G15Field("m_iViewModelIndex", int),
+        G15Field("m_iWorldModelIndex", int),
+        G15Field("m_flNextPrimaryAttack", float),
+        G15Field("m_flNextSecondaryAttack", float),
+        G15Field("m_flTimeWeaponIdle", float),
+        G15Field("m_iPrimaryAmmoType", int),
+        G15Field("m_iSecondaryAmmoType", int),
+        G15Field("m_nViewModelIndex", int),
+        G15Field("m_iClip1", int),
+        G15Field("m_iClip2", int),
+        G15Field("m_bInReload", bool),
+        G15Field("m_bFireOnEmpty", bool),
+        G15Field("m_flNextEmptySoundTime", float),
+        G15Field("m_bFiringWholeClip", bool),
+        G15Field("m_Activity", int),
+        G15Field("m_fFireDuration", float),
+        G15Field("m_bFiresUnderwater", bool),
+        G15Field("m_iszName", int),
+        G15Field("m_bAltFiresUnderwater", bool),
+        G15Field("m_fMinRange1", float),
+        G15Field("m_fMinRange2", float),
+        G15Field("m_fMaxRange1", float),
+        G15Field("m_fMaxRange2", float),
+        G15Field("m_bReloadsSingly", bool),
+        G15Field("m_bRemoveable", bool),
+        G15Field("m_iPrimaryAmmoCount", int),
+        G15Field("m_iSecondaryAmmoCount", int),
+        G15Field("m_nSkin", int),
+        G15Field("m_flPlaybackRate", float),
+        G15Field("m_nBody", int),
+        G15Field("m_flCycle", float),
+        G15Field("m_nSequence", int),
+        G15Field("m_flEncodedController", float, 4),
+        G15Field("m_nPrevSequence", int),
+        G15Field("m_nNewSequenceParity", int),
+        G15Field("m_nResetEventsParity", int),
+        G15Field("m_nMuzzleFlashParity", bytes),
+        G15Field("m_Collision", InternalVarMCollision),
+        G15Field("m_MoveType", None),
+        G15Field("m_MoveCollide", None),
+        G15Field("m_vecAbsVelocity", Vector3D),
+        G15Field("m_vecVelocity", Vector3D),
+        G15Field("m_nRenderMode", None),
+        G15Field("m_nRenderFX", None),
+        G15Field("m_fFlags", int),
+        G15Field("m_vecViewOffset", Vector3D),
+        G15Field("m_nModelIndex", int),
+        G15Field("m_flFriction", float),
+        G15Field("m_iTeamNum", int),
+        G15Field("m_vecNetworkOrigin", Vector3D),
+        G15Field("m_angNetworkAngles", Vector3D),
+        G15Field("m_vecAbsOrigin", Vector3D),
+        G15Field("m_angAbsRotation", Vector3D),
+        G15Field("m_vecOrigin", Vector3D),
+        G15Field("m_angRotation", Vector3D),
+        G15Field("m_nWaterLevel", None),
+        G15Field("m_nWaterType", None),
+        G15Field("m_vecAngVelocity", Vector3D),
+        G15Field("m_bDormant", bool),
+        G15Field("m_vecBaseVelocity", Vector3D),
+        G15Field("m_iEFlags", int),
+        G15Field("m_flGravity", float),
+        G15Field("m_flProxyRandomValue", float),
+    ]
+)
+
+
+class VectorBlock:
     """
-    m_flLastCritCheckTime: float = None
-    m_flReloadPriorNextFire: float = None
-    m_flLastFireTime: float = None
-    m_bCurrentAttackIsCrit: bool = None
-    m_iCurrentSeed: int = None
-    m_flEnergy: float = None
-    m_flEffectBarRegenTime: float = None
-    m_bBeingRepurposedForTaunt: bool = None
-    m_nNextThinkTick: int = None
-    m_iState: int = None
-    m_iViewModelIndex: int = None
-    m_iWorldModelIndex: int = None
-    m_flNextPrimaryAttack: float = None
-    m_flNextSecondaryAttack: float = None
-    m_flTimeWeaponIdle: float = None
-    m_iPrimaryAmmoType: int = None
-    m_iSecondaryAmmoType: int = None
-    m_nViewModelIndex: int = None
-    m_iClip1: int = None
-    m_iClip2: int = None
-    m_bInReload: bool = None
-    m_bFireOnEmpty: bool = None
-    m_flNextEmptySoundTime: float = None
-    m_bFiringWholeClip: bool = None
-    m_Activity: int = None
-    m_fFireDuration: float = None
-    m_bFiresUnderwater: bool = None
-    m_iszName: int = None
-    m_bAltFiresUnderwater: bool = None
-    m_fMinRange1: float = None
-    m_fMinRange2: float = None
-    m_fMaxRange1: float = None
-    m_fMaxRange2: float = None
-    m_bReloadsSingly: bool = None
-    m_bRemoveable: bool = None
-    m_iPrimaryAmmoCount: int = None
-    m_iSecondaryAmmoCount: int = None
-    m_nSkin: int = None
-    m_flPlaybackRate: float = None
-    m_nBody: int = None
-    m_flCycle: float = None
-    m_nSequence: int = None
-    m_flEncodedController: list[float] = None
-    m_nPrevSequence: int = None
-    m_nNewSequenceParity: int = None
-    m_nResetEventsParity: int = None
-    m_nMuzzleFlashParity: bytes = None
-    m_Collision = InternalVar.m_Collision
-    m_MoveType: None = None
-    m_MoveCollide: None = None
-    m_vecAbsVelocity: Vector3D = None
-    m_vecVelocity: Vector3D = None
-    m_nRenderMode: None = None
-    m_nRenderFX: None = None
-    m_fFlags: int = None
-    m_vecViewOffset: Vector3D = None
-    m_nModelIndex: int = None
-    m_flFriction: float = None
-    m_iTeamNum: int = None
-    m_vecNetworkOrigin: Vector3D = None
-    m_angNetworkAngles: Vector3D = None
-    m_vecAbsOrigin: Vector3D = None
-    m_angAbsRotation: Vector3D = None
-    m_vecOrigin: Vector3D = None
-    m_angRotation: Vector3D = None
-    m_nWaterLevel: None = None
-    m_nWaterType: None = None
-    m_vecAngVelocity: Vector3D = None
-    m_bDormant: bool = None
-    m_vecBaseVelocity: Vector3D = None
-    m_iEFlags: int = None
-    m_flGravity: float = None
-    m_flProxyRandomValue: float = None
-
-    def __init__(self):
-        self.m_flEncodedController: list[float] = [0.0]*4
-
-
-class G15Stream:
-    """
-    A useful metaclass that turns the list of strings generated from splitting the output of `g15_dumpplayer` on
-    newlines into a generator with specifiable start and end sections. This allows us to use the section delimiters
-    embedded within the command output such as "(localplayerweapon)" as flags to segment the data stream into iterable
-    chunks all within the one variable.
-    """
-    def __init__(self, stream: list[str], start: str, until: str) -> None:
-        self.stream = stream
-        self.start = start
-        self.idx = self.stream.index(self.start)
-        self.until = until
-
-    def __iter__(self):
-        return self
-
-    def __next__(self):
-        return self.next()
-
-    def next(self):
-        try:
-            _elem = ""
-            while not _elem.strip():
-                _elem = self.stream[self.idx]
-                if _elem == self.until:
-                    raise StopIteration
-                self.idx += 1
-            return _elem
-        except IndexError:
-            raise StopIteration
+    Every vector field of one G15 section packed into a single preallocated (n, 3) float32 array, one row per field.
+    Used by G15DumpPlayer when `pack_vectors` is set, in place of a Vector3D per field.
+    """
+    __slots__ = ("index", "values")
+    # data class -> {var name (e.g. "m_vecOrigin", "m_Collision.m_vecMins") -> row}
+    _indexes: dict[type, dict[str, int]] = {}
+
+    def __init__(self, data_class: type) -> None:
+        self.index = self.vector_index(data_class)
+        self.values = np.zeros((len(self.index), 3), dtype=np.float32)
+
+    @classmethod
+    def vector_index(cls, data_class: type) -> dict[str, int]:
+        """ Assign a row to every vector field of `data_class` (nested structs included), from its schema. """
+        if data_class not in cls._indexes:
+            _names = []
+            for _f in data_class.schema:
+                if _f.type is Vector3D:
+                    _names.append(_f.name)
+                elif hasattr(_f.type, "schema"):
+                    _names.extend(f"{_f.name}.{_sub.name}" for _sub in _f.type.schema if _sub.type is Vector3D)
+            cls._indexes[data_class] = {_name: _row for _row, _name in enumerate(_names)}
+        return cls._indexes[data_class]
+
+    def set(self, var_name: str, raw: str) -> bool:
+        """ Decode the `x y z` text of `var_name` into its row. Returns False if the field is not in the schema. """
+        _row = self.index.get(var_name)
+        if _row is None:
+            return False
+        _x, _y, _z = raw.split()
+        _values = self.values
+        _values[_row, 0] = float(_x)
+        _values[_row, 1] = float(_y)
+        _values[_row, 2] = float(_z)
+        return True
+
+    def get(self, var_name: str) -> np.ndarray | None:
+        """ A view onto the row of `var_name`, or None if the section has no such vector field. """
+        _row = self.index.get(var_name)
+        return None if _row is None else self.values[_row]
+
+
+class PlayerResourceTable:
+    """
+    Columnar view over the per-slot `(playerresource)` data (plus the per-slot ammo from `(localplayer)`).
+
+    Every column is a typed NumPy array indexed by the G15 player slot, so lobby-wide questions become vectorised
+    expressions rather than Python loops, e.g. all connected blu players:
+        `np.flatnonzero(table.connected & (table.team == Team.Blue.value))`
+    or everyone lagging: `np.flatnonzero(table.ping > 150)`.
+    """
+    MAX_PLAYERS: int = MAX_PLAYER_SLOTS
+    # column name -> (source data class attribute, dtype)
+    _columns: dict[str, tuple[str, type]] = {
+        "name": ("m_szName", object),
+        "ping": ("m_iPing", np.int32),
+        "score": ("m_iScore", np.int32),
+        "deaths": ("m_iDeaths", np.int32),
+        "connected": ("m_bConnected", np.bool_),
+        "team": ("m_iTeam", np.int8),
+        "alive": ("m_bAlive", np.bool_),
+        "health": ("m_iHealth", np.int32),
+        "account_id": ("m_iAccountID", np.uint32),
+        "user_id": ("m_iUserID", np.int32),
+        "valid": ("m_bValid", np.bool_),
+    }
+
+    name: np.ndarray = None
+    ping: np.ndarray = None
+    score: np.ndarray = None
+    deaths: np.ndarray = None
+    connected: np.ndarray = None
+    team: np.ndarray = None
+    alive: np.ndarray = None
+    health: np.ndarray = None
+    account_id: np.ndarray = None
+    user_id: np.ndarray = None
+    valid: np.ndarray = None
+    ammo: np.ndarray = None
+
+    def __init__(self, columns: dict[str, np.ndarray] | None = None) -> None:
+        """
+        :param columns: optional - pre-built arrays keyed by column name (including "ammo"). Any column not
+                        provided is zero-filled for `MAX_PLAYERS` slots.
+        """
+        columns = {} if columns is None else columns
+        for _col, (_, _dtype) in self._columns.items():
+            setattr(self, _col, columns[_col] if _col in columns else np.zeros(self.MAX_PLAYERS, dtype=_dtype))
+        self.ammo = columns["ammo"] if "ammo" in columns else np.zeros(self.MAX_PLAYERS, dtype=np.int32)
+
+    @classmethod
+    def from_data(cls, local_player: IntVarLocalPlayer, player_resource: IntVarPlayerResource) -> Self:
+        """ Build the table from the parsed `(localplayer)` and `(playerresource)` data classes. """
+        _columns = {}
+        for _col, (_attr, _dtype) in cls._columns.items():
+            _values = getattr(player_resource, _attr)
+            if _col == "team":
+                _values = [_v.value if isinstance(_v, Team) else _v for _v in _values]
+            if _dtype is not object:
+                _values = [0 if _v is None else _v for _v in _values]
+            _columns[_col] = np.array(_values, dtype=_dtype)
+
+        # m_iAmmo only has 32 entries, pad it out to the player slot count
+        _ammo = np.zeros(cls.MAX_PLAYERS, dtype=np.int32)
+        _lp_ammo = [0 if _v is None else _v for _v in local_player.m_iAmmo[:cls.MAX_PLAYERS]]
+        _ammo[:len(_lp_ammo)] = _lp_ammo
+        _columns["ammo"] = _ammo
+        return cls(_columns)
+
+    def snapshot(self) -> Self:
+        """ A deep copy of every column - cheap enough to keep one per dump for history. """
+        return PlayerResourceTable({_col: getattr(self, _col).copy() for _col in self.column_names()})
+
+    @classmethod
+    def column_names(cls) -> list[str]:
+        return [*cls._columns.keys(), "ammo"]
+
+    def on_team(self, team: Team | int, connected_only: bool = True) -> np.ndarray:
+        """ Slot indices of the players on `team` (optionally only those currently connected). """
+        _mask = self.team == (team.value if isinstance(team, Team) else team)
+        if connected_only:
+            _mask &= self.connected
+        return np.flatnonzero(_mask)
+
+    def valid_slots(self) -> np.ndarray:
+        """ Slot indices that hold a real player (the scoreboard-visible slots). """
+        return np.flatnonzero(self.valid & (self.account_id != 0))
+
+    def __len__(self) -> int:
+        return len(self.ping)
+
+
+class UnknownFieldRegistry:
+    """
+    Counts the fields TF2 emits that the data classes don't declare (or can't hold, e.g. an array idx past the end),
+    keyed by (data class name, var name). The parse loop only pays for a dict increment; `report()` logs each newly
+    seen field once along with its count so far, at most once every REPORT_INTERVAL seconds. `report_on_exit()` has the
+    totals of every field logged when the process exits.
+
+    `get_counts()` exposes the registry, i.e. everything the field schema is currently missing.
+    """
+    REPORT_INTERVAL: float = 60.0
+    _counts: dict[tuple[str, str], int] = {}
+    _reported: set[tuple[str, str]] = set()
+    _last_report: float = None
+    _report_at_exit: bool = False
+    _lock: Lock = Lock()
+
+    @classmethod
+    def record(cls, data_class: str, var_name: str) -> None:
+        _key = (data_class, var_name)
+        cls._counts[_key] = cls._counts.get(_key, 0) + 1
+
+    @classmethod
+    def report(cls, force: bool = False) -> None:
+        """ Log the fields not reported yet, unless we already reported within REPORT_INTERVAL (or force is set). """
+        if len(cls._counts) == len(cls._reported):
+            return
+        _now = time.monotonic()
+        with cls._lock:
+            if not force and cls._last_report is not None and _now - cls._last_report < cls.REPORT_INTERVAL:
+                return
+            _new = [_key for _key in list(cls._counts) if _key not in cls._reported]
+            cls._reported.update(_new)
+            cls._last_report = _now
+        if _new:
+            loguru.logger.warning(
+                f"Got {len(_new)} unprepared G15 attribute(s), ignoring: "
+                + ", ".join(f"{_cls}.{_var} (x{cls._counts[(_cls, _var)]})" for _cls, _var in _new)
+            )
+
+    @classmethod
+    def report_totals(cls) -> None:
+        """ Log how many times every unprepared field has been seen, most frequent first. """
+        _counts = cls.get_counts()
+        if not _counts:
+            return
+        loguru.logger.warning(
+            f"Ignored {len(_counts)} unprepared G15 attribute(s) in total: "
+            + ", ".join(
+                f"{_cls}.{_var} (x{_n})"
+                for (_cls, _var), _n in sorted(_counts.items(), key=lambda _item: _item[1], reverse=True)
+            )
+        )
+
+    @classmethod
+    def report_on_exit(cls) -> None:
+        """ Log the totals (see report_totals()) when the interpreter exits. Calling again does nothing. """
+        with cls._lock:
+            if cls._report_at_exit:
+                return
+            cls._report_at_exit = True
+        atexit.register(cls.report_totals)
+
+    @classmethod
+    def get_counts(cls) -> dict[tuple[str, str], int]:
+        """ A copy of the registry: (data class name, var name) -> times seen. """
+        return dict(cls._counts)
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._counts = {}
+            cls._reported = set()
+            cls._last_report = None
 
 
 class G15DumpPlayer:
     """
     A data class that parses the output of the `g15_dumpplayer` command into the 4 relevant data classes.
 
-    The G15 data is extracted via RCON de-fragged packets, and fed in here. The constructor performs the
-    simple iterative data parsing to apply the values to the data classes.
+    The G15 data is extracted via RCON de-fragged packets, and fed in here. The constructor walks the dump exactly
+    once, switching the target data class whenever it hits one of the section headers (e.g. "(localplayer)"), and
+    dispatches every `name type (value)` line through a table keyed by the var name.
     """
     _LocalPlayer: IntVarLocalPlayer = None
     _LocalTeam: IntVarLocalTeam = None
     _PlayerResource: IntVarPlayerResource = None
     _LocalPlayerWeapon: IntVarLocalPlayerWeapon = None
+    _ResourceTable: PlayerResourceTable = None
+    _SlotIndexes: dict[str, dict] = None
+    _VectorBlocks: dict[str, VectorBlock] = None
     localplayer: str = "(localplayer)"
     localteam: str = "(localteam)"
     playerresource: str = "(playerresource)"
     localplayerweapon: str = "(localplayerweapon)"
     end: str = "Other replacements:"
 
+    # section header -> name of the instance attribute holding that sections data class
+    _sections: dict[str, str] = {
+        localplayer: "_LocalPlayer",
+        localteam: "_LocalTeam",
+        playerresource: "_PlayerResource",
+        localplayerweapon: "_LocalPlayerWeapon",
+    }
+    # value type (the second column of the dump) -> parser for the bracket-stripped value
+    _value_parsers: dict[str, Callable[[str], Any]] = {
+        "integer": int,
+        "short": int,
+        "float": float,
+        "bool": lambda v: v == "true",
+        "vector": Vector3D,
+        "string": str,
+    }
+    # data class -> {var name -> (sub struct name | None, field name, array idx | None)}, filled in as names are
+    # first seen and then shared by every dump, so steady-state parsing is a single dict lookup per line.
+    _field_tables: dict[type, dict[str, tuple[str | None, str, int | None]]] = {}
+
     def debug_print_localplayer(self) -> None:
-        print(self._LocalPlayer.__dict__)
+        print(self.get_local_player_data().as_dict())
 
     @staticmethod
-    def _fix_values(values: list[str]) -> None:
-        if len(values) < 3:
-            if ord(values[0][len(values[0]) - 1:]) < 20:
-                values.append("bytes")
-                values.append(values[0][len(values[0]) - 1:])
-            else:
-                values.append("none")
-                values.append("(none)")
+    def _split_line(line: str) -> tuple[str, Any]:
+        """
+        Split one `g15_dumpplayer` line into its var name and parsed value.
 
-    @staticmethod
-    def _parse_value(value_str: str, value_type: str) -> bytes | str | int | float | bool | Vector3D:
-        parsed_val = None
-        if value_type == "vector":
-            parsed_val = Vector3D(value_str[1:len(value_str) - 1].split())
-        elif value_type == "integer" or value_type == "short":
-            parsed_val = int(value_str[1:len(value_str) - 1])
-        elif value_type == "bool":
-            parsed_val = value_str[1:len(value_str) - 1] == "true"
-        elif value_type == "float":
-            parsed_val = float(value_str[1:len(value_str) - 1])
-        elif value_type == "none":
-            parsed_val = None
-        elif value_type == "bytes":
-            parsed_val = bytes(value_str, encoding="utf8")
-        return parsed_val
+        Most lines look like `m_iHealth integer (125)`. Lines without a type column are either bare names (no value)
+        or a name followed directly by the raw byte value of the field (e.g. a control character, or a `$`).
+        """
+        _parts = line.split(" ", 2)
+        if len(_parts) < 3:
+            _name, _raw = _RAW_VALUE_REGEX.match(line).groups()
+            return _name, bytes(_raw, encoding="utf8") if _raw else None
 
-    @staticmethod
-    def _set_attribute(primary_target, sub_target, var_name, parsed_val) -> None:
-        _array_regex = r"\[(\d+)\]"
-        _match = re.search(_array_regex, var_name)
+        _name, _type, _value = _parts
+        try:
+            return _name, G15DumpPlayer._value_parsers[_type](_value[1:-1])
+        except KeyError:
+            return _name, None
+
+    @classmethod
+    def _resolve_field(cls, target: object, var_name: str) -> tuple[str | None, str, int | None]:
+        """ Resolve (and cache) where `var_name` lives on the data class of `target`. """
+        _table = cls._field_tables.setdefault(type(target), {})
+        try:
+            return _table[var_name]
+        except KeyError:
+            pass
+
+        _sub, _, _field = var_name.rpartition(".")
+        _idx = None
+        _match = _ARRAY_REGEX.match(_field)
         if _match:
-            if sub_target is not None:
-                _idx = int(_match.groups()[0])
-                try:
-                    _target: list = getattr(sub_target, var_name.split(".")[1].split("[")[0])
-                    _target[_idx] = parsed_val
-                except AttributeError:
-                    loguru.logger.warning(f"Got unprepared attribute {var_name} for {primary_target}, ignoring...")
-                    return
-                except TypeError:
-                    loguru.logger.warning(f"Got unprepared attribute {var_name} for {primary_target}, ignoring...")
-                    return
+            _field, _idx = _match.group(1), int(_match.group(2))
 
-            else:
-                _idx = int(_match.groups()[0])
-                try:
-                    _target: list = getattr(primary_target, var_name.split("[")[0])
-                    _target[_idx] = parsed_val
-                except AttributeError:
-                    loguru.logger.warning(f"Got unprepared attribute {var_name} for {primary_target}, ignoring...")
-                    return
-                except TypeError:
-                    loguru.logger.warning(f"Got unprepared attribute {var_name} for {primary_target}, ignoring...")
-                    return
-        else:
-            if sub_target is not None:
-                try:
-                    setattr(sub_target, var_name.split(".")[1], parsed_val)
-                except AttributeError:
-                    loguru.logger.warning(f"Got unprepared attribute {var_name} for {primary_target}, ignoring...")
-                    return
-                except TypeError:
-                    loguru.logger.warning(f"Got unprepared attribute {var_name} for {primary_target}, ignoring...")
-                    return
-            else:
-                try:
-                    setattr(primary_target, var_name, parsed_val)
-                except AttributeError:
-                    loguru.logger.warning(f"Got unprepared attribute {var_name} for {primary_target}, ignoring...")
-                    return
-                except TypeError:
-                    loguru.logger.warning(f"Got unprepared attribute {var_name} for {primary_target}, ignoring...")
-                    return
-
-    def __init__(self, command_stream: str) -> None:
-        """
-        This is incredibly gross as a function
+        _entry = (_sub or None, _field, _idx)
+        _table[var_name] = _entry
+        return _entry
 
-        It's got a lot of repeated code that could be (and probably will be later)
-        abstracted into sub functions. But it works and it's quick.
+    @classmethod
+    def _get_attribute(cls, target: object, var_name: str) -> Any:
+        _sub, _field, _idx = cls._resolve_field(target, var_name)
+        try:
+            _holder = getattr(target, _sub) if _sub is not None else target
+            _val = getattr(_holder, _field)
+            return _val if _idx is None else _val[_idx]
+        except (AttributeError, TypeError, IndexError):
+            return None
+
+    @classmethod
+    def _set_attribute(cls, target: object, var_name: str, parsed_val: Any) -> None:
+        _sub, _field, _idx = cls._resolve_field(target, var_name)
+        try:
+            _holder = getattr(target, _sub) if _sub is not None else target
+            if _idx is None:
+                setattr(_holder, _field, parsed_val)
+            else:
+                getattr(_holder, _field)[_idx] = parsed_val
+        except (AttributeError, TypeError, IndexError):
+            UnknownFieldRegistry.record(type(target).__name__, var_name)
 
-        Parse the output of `g15_dumpplayer` into data classes.
-        :param command_stream: the stream of str of the command
+    @classmethod
+    def _iter_section_lines(cls, command_stream: str) -> Iterator[tuple[str, str]]:
+        """
+        Walk the dump once, yielding (section header, line) for every non-empty data line inside a section.
+        """
+        _walker = G15SectionWalker()
+        for _line in command_stream.split("\n"):
+            _step = _walker.step(_line)
+            if _walker.ended:
+                return
+            if _step is not None:
+                yield _step
+
+    def __init__(self, command_stream: str | None, pack_vectors: bool = False) -> None:
+        """
+        Parse the output of `g15_dumpplayer` into data classes in a single pass.
+        :param command_stream: the stream of str of the command. None builds an empty (default valued) dump.
+        :param pack_vectors: if true, vector fields are decoded straight into one preallocated float32 array per
+                             section (see `get_vector_block()`) and left as None on the data classes.
         """
         self._LocalPlayer = IntVarLocalPlayer()
         self._LocalTeam = IntVarLocalTeam()
         self._PlayerResource = IntVarPlayerResource()
         self._LocalPlayerWeapon = IntVarLocalPlayerWeapon()
-        _start = datetime.now()
 
+        if pack_vectors:
+            self._VectorBlocks = {
+                _section: VectorBlock(type(getattr(self, _attr))) for _section, _attr in self._sections.items()
+            }
+
+        if command_stream is None:
+            return
         if not command_stream.split():
             loguru.logger.warning(f"Not in lobby, not parsing G15.")
             return
 
-        _g15_dumpplayer_stream = command_stream.split("\n")
-
-        # TODO: Attempt to refactor the 4 distinct for loops into one to reduce code duplication
-
-        # (localplayer) data
-        for i in G15Stream(_g15_dumpplayer_stream, self.localplayer, self.localteam):
-            values = i.split()
-            self._fix_values(values)
-
-            varName, varType, currentValue = values[0], values[1], values[2]
-
-            # parse value
-            parsed_val = self._parse_value(currentValue, varType)
+        _blocks = self._VectorBlocks
+        for _section, _line in self._iter_section_lines(command_stream):
+            if _blocks is not None:
+                _var_name, _sep, _raw = _line.partition(" vector (")
+                if _sep and _blocks[_section].set(_var_name, _raw[:-1]):
+                    continue
+            _var_name, _parsed_val = self._split_line(_line)
+            self._set_attribute(getattr(self, self._sections[_section]), _var_name, _parsed_val)
+        UnknownFieldRegistry.report()
+
+    def get_vector_block(self, section: str) -> VectorBlock | None:
+        """
+        The packed vector fields of `section` (e.g. "(localplayer)"), only populated when parsed with pack_vectors.
+        """
+        return None if self._VectorBlocks is None else self._VectorBlocks.get(section)
 
-            sub_target = getattr(self._LocalPlayer, varName.split(".")[0]) if "." in varName else None
-            self._set_attribute(self._LocalPlayer, sub_target, varName, parsed_val)
+    def invalidate_derived(self) -> None:
+        """ Drop the cached resource table and slot indexes, call after mutating the data classes in place. """
+        self._ResourceTable = None
+        self._SlotIndexes = None
 
-        # print(f"Stored {len(self._LocalPlayer.__dict__.keys())} values in {self._LocalPlayer.__class__.__name__}")
+    def get_local_player_data(self) -> IntVarLocalPlayer:
+        return self._LocalPlayer
 
-        for i in G15Stream(_g15_dumpplayer_stream, self.localteam, self.playerresource):
-            values = i.split()
-            self._fix_values(values)
+    def get_local_team_data(self) -> IntVarLocalTeam:
+        return self._LocalTeam
 
-            varName, varType, currentValue = values[0], values[1], values[2]
+    def get_local_player_resource_data(self) -> IntVarPlayerResource:
+        return self._PlayerResource
 
-            # parse value
-            parsed_val = self._parse_value(currentValue, varType)
+    def get_local_player_weapon_data(self) -> IntVarLocalPlayerWeapon:
+        return self._LocalPlayerWeapon
 
-            sub_target = getattr(self._LocalTeam, varName.split(".")[0]) if "." in varName else None
-            self._set_attribute(self._LocalTeam, sub_target, varName, parsed_val)
+    def get_player_resource_table(self) -> PlayerResourceTable:
+        """ The columnar per-slot player data of this dump, built on first access. """
+        if self._ResourceTable is None:
+            self._ResourceTable = PlayerResourceTable.from_data(
+                self.get_local_player_data(), self.get_local_player_resource_data()
+            )
+        return self._ResourceTable
 
-        # print(f"Stored {len(self._LocalTeam.__dict__.keys())} values in {self._LocalTeam.__class__.__name__}")
+    def get_slot_indexes(self) -> dict[str, dict]:
+        """
+        Hash indexes from player identifiers to G15 slot idx, built once per dump on first access.
+        Keys are "account_id" (int), "sid3" (`[U:1:N]` str), "user_id" (in-game id, int) and "name" (str). Where an
+        identifier appears in more than one slot, the lowest slot wins.
+        """
+        if self._SlotIndexes is None:
+            _pr = self.get_local_player_resource_data()
+            self._SlotIndexes = {"account_id": {}, "sid3": {}, "user_id": {}, "name": {}}
+            for _idx in range(len(_pr.m_iAccountID) - 1, -1, -1):
+                _aid = _pr.m_iAccountID[_idx]
+                self._SlotIndexes["account_id"][_aid] = _idx
+                self._SlotIndexes["sid3"][f"[U:1:{_aid}]"] = _idx
+                self._SlotIndexes["user_id"][_pr.m_iUserID[_idx]] = _idx
+                self._SlotIndexes["name"][_pr.m_szName[_idx]] = _idx
+        return self._SlotIndexes
+
+    def find_player_idx(
+            self, sid3: str = None, name: str = None, ig_id: int = None, account_id: int = None
+    ) -> int:
+        """
+        Constant time lookup of a players G15 slot idx. Identifiers are tried in the order sid3, name, ig_id,
+        account_id; the first one that matches is used.
+        :return: idx of the specified player, or -1 if not found.
+        """
+        _indexes = self.get_slot_indexes()
+        for _key, _ident in (("sid3", sid3), ("name", name), ("user_id", ig_id), ("account_id", account_id)):
+            if _ident is not None and _ident in _indexes[_key]:
+                return _indexes[_key][_ident]
+        return -1
 
-        for i in G15Stream(_g15_dumpplayer_stream, self.playerresource, self.localplayerweapon):
-            values = i.split()
-            self._fix_values(values)
 
-            varName, varType, currentValue = values[0], values[1], values[2]
+class LazyG15DumpPlayer(G15DumpPlayer):
+    """
+    A G15DumpPlayer that only locates the section headers up front, and parses a section the first time one of the
+    accessors (`get_local_player_data()` etc.) asks for it. Sections nobody asks for are never parsed.
 
-            # parse value
-            parsed_val = self._parse_value(currentValue, varType)
+    Optionally only a subset of fields is parsed per section, e.g. `LOBBY_G15_FIELDS` for what the lobby uses.
+    """
+    # section header -> its data class, only built once the section is parsed
+    _section_classes: dict[str, type] = {
+        G15DumpPlayer.localplayer: IntVarLocalPlayer,
+        G15DumpPlayer.localteam: IntVarLocalTeam,
+        G15DumpPlayer.playerresource: IntVarPlayerResource,
+        G15DumpPlayer.localplayerweapon: IntVarLocalPlayerWeapon,
+    }
+    _command_stream: str = None
+    _spans: dict[str, tuple[int, int]] = None
+    _parsed: set[str] = None
+    # section header -> a pattern matching the lines of its requested fields (None for the whole section)
+    _field_patterns: dict[str, re.Pattern | None] | None = None
+
+    def __init__(self, command_stream: str, fields: dict[str, set[str] | None] | None = None) -> None:
+        """
+        :param command_stream: the stream of str of the command
+        :param fields: optional - section header -> the var names (without array idx, e.g. "m_iAmmo" or
+                       "m_Shared.m_nPlayerCond") to parse in that section. A section mapped to None is parsed in
+                       full, and sections missing from the mapping are left at their defaults.
+        """
+        self._command_stream = command_stream
+        self._parsed = set()
+        self._spans = {}
 
-            sub_target = getattr(self._PlayerResource, varName.split(".")[0]) if "." in varName else None
-            self._set_attribute(self._PlayerResource, sub_target, varName, parsed_val)
+        self._field_patterns = None if fields is None else {
+            _section: None if _names is None else self._fields_pattern(frozenset(_names))
+            for _section, _names in fields.items()
+        }
 
-        # print(f"Stored {len(self._PlayerResource.__dict__.keys())} values in {self._PlayerResource.__class__.__name__}")
+        if not command_stream.strip():
+            loguru.logger.warning(f"Not in lobby, not parsing G15.")
+            return
 
-        for i in G15Stream(_g15_dumpplayer_stream, self.localplayerweapon, self.end):
-            values = i.split()
-            self._fix_values(values)
+        _starts = []
+        for _section in self._sections:
+            _idx = command_stream.find(f"\n{_section}")
+            if _idx != -1:
+                _starts.append((_idx + 1, _section))
+        _end = command_stream.find(f"\n{self.end}")
+        _starts.sort()
+        for _i, (_start, _section) in enumerate(_starts):
+            _stop = _starts[_i + 1][0] if _i + 1 < len(_starts) else (_end if _end != -1 else len(command_stream))
+            self._spans[_section] = (_start, _stop)
 
-            varName, varType, currentValue = values[0], values[1], values[2]
+    @staticmethod
+    @functools.cache
+    def _fields_pattern(names: frozenset[str]) -> re.Pattern:
+        """ Matches the whole line of any of the var names, with or without an array idx. """
+        return re.compile(
+            r"^(?:" + "|".join(re.escape(_name) for _name in sorted(names)) + r")[\[ ][^\r\n]*", re.MULTILINE
+        )
+
+    def section_lines(self, section: str) -> Iterator[str]:
+        """
+        The data lines of `section`, narrowed down to the requested fields, without parsing them. Yields nothing for a
+        section that wasn't requested, or isn't in the dump.
+        """
+        if self._field_patterns is not None and section not in self._field_patterns:
+            return
+        if section not in self._spans:
+            return
+        _start, _stop = self._spans[section]
+
+        _pattern = None if self._field_patterns is None else self._field_patterns[section]
+        if _pattern is None:
+            # the span starts with the section header, and holds nothing but that sections lines
+            for _line in self._command_stream[_start:_stop].split("\n")[1:]:
+                _line = _line.rstrip("\r")
+                if _line.strip():
+                    yield _line
+            return
+        # only the lines of the requested fields are even looked at, the rest of the section is skipped by the regex
+        for _match in _pattern.finditer(self._command_stream, _start, _stop):
+            yield _match.group()
 
-            # parse value
-            parsed_val = self._parse_value(currentValue, varType)
+    def _ensure_parsed(self, section: str) -> None:
+        if section in self._parsed:
+            return
 
-            sub_target = getattr(self._LocalPlayerWeapon, varName.split(".")[0]) if "." in varName else None
-            self._set_attribute(self._LocalPlayerWeapon, sub_target, varName, parsed_val)
+        _target = self._section_classes[section]()
+        setattr(self, self._sections[section], _target)
+        for _line in self.section_lines(section):
+            _var_name, _parsed_val = self._split_line(_line)
+            self._set_attribute(_target, _var_name, _parsed_val)
+        self._parsed.add(section)
+        UnknownFieldRegistry.report()
 
-        # print(f"Stored {len(self._LocalPlayerWeapon.__dict__.keys())} values in {self._LocalPlayerWeapon.__class__.__name__}")
+        if len(self._parsed) == len(self._sections):
+            # everything we will ever need is parsed, stop holding the raw output
+            self._command_stream = ""
 
     def get_local_player_data(self) -> IntVarLocalPlayer:
+        self._ensure_parsed(self.localplayer)
         return self._LocalPlayer
 
     def get_local_team_data(self) -> IntVarLocalTeam:
+        self._ensure_parsed(self.localteam)
         return self._LocalTeam
 
     def get_local_player_resource_data(self) -> IntVarPlayerResource:
+        self._ensure_parsed(self.playerresource)
         return self._PlayerResource
 
     def get_local_player_weapon_data(self) -> IntVarLocalPlayerWeapon:
+        self._ensure_parsed(self.localplayerweapon)
         return self._LocalPlayerWeapon
 
 
+# The fields TF2Lobby actually reads out of a dump, for use with LazyG15DumpPlayer and G15DeltaParser
+LOBBY_G15_FIELDS: dict[str, set[str] | None] = {
+    G15DumpPlayer.localplayer: {"m_iAmmo"},
+    G15DumpPlayer.playerresource: None,
+}
+
+
+class G15SectionWalker:
+    """
+    Tracks which section of the `g15_dumpplayer` output we are in, one line at a time. Shared by the whole-string and
+    delta parsers so they agree on what counts as a data line.
+    """
+    section: str | None = None
+    ended: bool = None
+
+    def __init__(self) -> None:
+        self.section = None
+        self.ended = False
+
+    def step(self, line: str) -> tuple[str, str] | None:
+        """
+        :param line: the next raw line of the dump (without its trailing newline)
+        :return: (section header, line) if this is a data line, otherwise None
+        """
+        line = line.rstrip("\r")
+        if self.ended or not line.strip():
+            return None
+        if line in G15DumpPlayer._sections:
+            self.section = line
+            return None
+        if line == G15DumpPlayer.end:
+            self.ended = True
+            return None
+        if self.section is None:
+            # the echoed command name before the first section header
+            return None
+        return self.section, line
+
+
+class G15Change(NamedTuple):
+    """ A single field that changed between two consecutive `g15_dumpplayer` pulls. """
+    section: str  # the section header, e.g. "(playerresource)"
+    slot: int | None  # the array idx for per-slot fields (e.g. m_iPing[3] -> 3), otherwise None
+    field: str  # the var name without its array idx, e.g. "m_iPing" or "m_Shared.m_flItemChargeMeter"
+    old: Any
+    new: Any
+
+
+class G15DeltaParser:
+    """
+    Keeps the previous `g15_dumpplayer` output around and only reparses the lines whose text changed since the last
+    pull, applying them in place to one long-lived G15DumpPlayer. Each update returns the change set, so consumers can
+    apply just the differences (and skip all work when nothing they care about moved).
+
+    Var names are unique within a section, so an identical line text means an identical value. A var that was in the
+    previous pull but isn't in this one (e.g. a player leaving a slot) is reset to its data class default.
+
+    Each pull is located with a LazyG15DumpPlayer, so given `fields` (e.g. `LOBBY_G15_FIELDS`) the sections and lines
+    outside of them are never walked, and are left at their defaults in `dump`.
+    """
+    dump: G15DumpPlayer = None
+    fields: dict[str, set[str] | None] | None = None
+    _previous: dict[str, set[str]] = None
+    # data class -> a default valued instance of it, to read the defaults of removed fields from (never mutated)
+    _defaults: dict[type, object] = {}
+
+    def __init__(self, fields: dict[str, set[str] | None] | None = None) -> None:
+        """
+        :param fields: optional - the fields to keep up to date, as for LazyG15DumpPlayer. All of them if None.
+        """
+        self.dump = None
+        self.fields = fields
+        self._previous = {}
+
+    def reset(self) -> None:
+        self.dump = None
+        self._previous = {}
+
+    def update(self, command_stream: str) -> list[G15Change]:
+        """
+        Apply the next `g15_dumpplayer` output. The first update (or the first after leaving a server) reports every
+        field, against the data class defaults.
+
+        :param command_stream: the stream of str of the command
+        :return: the fields that changed since the previous update
+        """
+        if not command_stream.strip():
+            self.reset()
+            return []
+        if self.dump is None:
+            self.dump = G15DumpPlayer(None)
+
+        _source = LazyG15DumpPlayer(command_stream, self.fields)
+        _changes: list[G15Change] = []
+        _current: dict[str, set[str]] = {_section: set() for _section in G15DumpPlayer._sections}
+        _applied: dict[str, set[str]] = {_section: set() for _section in G15DumpPlayer._sections}
+        for _section, _attr in G15DumpPlayer._sections.items():
+            _target = getattr(self.dump, _attr)
+            _previous = self._previous.get(_section, ())
+            for _line in _source.section_lines(_section):
+                _current[_section].add(_line)
+                if _line in _previous:
+                    continue
+
+                _var_name, _parsed_val = G15DumpPlayer._split_line(_line)
+                _applied[_section].add(_var_name)
+                _old = G15DumpPlayer._get_attribute(_target, _var_name)
+                G15DumpPlayer._set_attribute(_target, _var_name, _parsed_val)
+
+                _sub, _field, _idx = G15DumpPlayer._resolve_field(_target, _var_name)
+                _changes.append(G15Change(
+                    _section, _idx, _field if _sub is None else f"{_sub}.{_field}", _old, _parsed_val
+                ))
+
+        for _section, _lines in self._previous.items():
+            # lines that are gone, and whose var wasn't re-set by a new line above, are vars that stopped appearing
+            for _line in _lines - _current[_section]:
+                _var_name, _ = G15DumpPlayer._split_line(_line)
+                if _var_name in _applied[_section]:
+                    continue
+                _change = self._reset(_section, _var_name)
+                if _change is not None:
+                    _changes.append(_change)
+
+        self._previous = _current
+        if _changes:
+            self.dump.invalidate_derived()
+            UnknownFieldRegistry.report()
+        return _changes
+
+    def _reset(self, section: str, var_name: str) -> G15Change | None:
+        """ Reset `var_name` back to its data class default, or do nothing if the data class doesn't hold it. """
+        _target = getattr(self.dump, G15DumpPlayer._sections[section])
+        _defaults = self._defaults.get(type(_target))
+        if _defaults is None:
+            _defaults = self._defaults[type(_target)] = type(_target)()
+
+        _sub, _field, _idx = G15DumpPlayer._resolve_field(_target, var_name)
+        try:
+            _holder = getattr(_defaults, _sub) if _sub is not None else _defaults
+            _default = getattr(_holder, _field)
+            if _idx is not None:
+                _default = _default[_idx]
+        except (AttributeError, TypeError, IndexError):
+            return None
+
+        _old = G15DumpPlayer._get_attribute(_target, var_name)
+        G15DumpPlayer._set_attribute(_target, var_name, _default)
+        return G15Change(section, _idx, _field if _sub is None else f"{_sub}.{_field}", _old, _default)
+
+
+def fetch_g15(rcon_client: RCONListener, max_age: float | None = None) -> str:
+    """
+    Run the 'g15_dumpplayer' command over one of the rcon clients pooled FragClient connections and sequentially read
+    and concatenate the response (fragmented) packets. Goes through the rcon clients response cache, so callers
+    within `max_age` seconds of each other share one round trip.
+
+    Only the raw output is shared, not a parsed dump: each consumer parses it with its own (stateful) G15DeltaParser,
+    which only costs the lines that changed since that consumers last pull.
+
+    :param rcon_client: an initialised rcon client (used for its connection pool and response cache)
+    :param max_age: how old a cached output may be, in seconds (the caches default TTL if None)
+    :return: the raw command output
+    :raises GameUnavailable: if the rcon clients breaker is open
+    :raises OSError: (or another of rcon_client.CONNECTION_ERRORS) if the game couldn't be reached
+    """
+    return rcon_client.cache.get("g15_dumpplayer", lambda: rcon_client.pool.run("g15_dumpplayer"), max_age)
+
+
 def do_g15(rcon_client: RCONListener) -> G15DumpPlayer:
     """
-    Given the rcon configuration params, invoke a custom FragClient instance to invoke the 'g15_dumpplayer' command
-    and sequentially read and concatenate the response (fragmented) packets. Then this response is passed to
-    G15DumpPlayer and a parsed G15DumpPlayer instance is returned.
+    Run the 'g15_dumpplayer' command (through fetch_g15, so it shares round trips with the lobby) and parse it.
 
-    :param rcon_client: an initialised rcon client (used for its store on the rcon data)
+    :param rcon_client: an initialised rcon client (used for its connection pool and response cache)
     :return: The constructed G15DumpPlayer instance.
     """
-
-    with FragClient(rcon_client.rcon_ip, rcon_client.rcon_port, passwd=rcon_client.rcon_pword) as h:
-        resp = h.frag_run("g15_dumpplayer")
-    _inst = G15DumpPlayer(resp)
-    return _inst
+    return G15DumpPlayer(fetch_g15(rcon_client))
 
 
 def main():
@@ -84,23 +84,7 @@ def get_player_idx(dump: G15DumpPlayer, sid3: str = None, name: str = None, ig_i
     :param ig_id: optional - the in-game id (the first column in the output of `status`) you want the idx of.
     :return: idx of the specified player, or -1 if not found.
     """
-    if sid3 is not None:
-        for idx, _pl_id in enumerate(dump.get_local_player_resource_data().m_iAccountID):
-            _built_sid3 = get_id3_from_iAccountID(_pl_id)
-            if _built_sid3 == sid3:
-                return idx
-
-    if name is not None:
-        for idx, _pl_name in enumerate(dump.get_local_player_resource_data().m_szName):
-            if _pl_name == name:
-                return idx
-
-    if ig_id is not None:
-        for idx, _ig_id in enumerate(dump.get_local_player_resource_data().m_iUserID):
-            if _ig_id == ig_id:
-                return idx
-
-    return -1
+    return dump.find_player_idx(sid3=sid3, name=name, ig_id=ig_id)
 
 
 def get_player_stats_from_idx(dump: G15DumpPlayer, player_idx: int) -> PlayerDump:
@@ -112,24 +96,23 @@ def get_player_stats_from_idx(dump: G15DumpPlayer, player_idx: int) -> PlayerDum
     :param player_idx: the idx of the player you want the data on. Can be got using `get_player_idx`
     :return: PlayerDump instance containing all relevant data on this player.
     """
-    _lp = dump.get_local_player_data()
-    _pr = dump.get_local_player_resource_data()
+    _tbl = dump.get_player_resource_table()
 
-    _pl = PlayerDump(_pr.m_szName[player_idx])
-    _pl.set_ammo(_lp.m_iAmmo[player_idx])
-    _pl.set_team(_pr.m_iTeam[player_idx])
-    _pl.set_valid(_pr.m_bValid[player_idx])
-    _pl.set_ping(_pr.m_iPing[player_idx])
+    _pl = PlayerDump(_tbl.name[player_idx])
+    _pl.set_ammo(int(_tbl.ammo[player_idx]))
+    _pl.set_team(int(_tbl.team[player_idx]))
+    _pl.set_valid(bool(_tbl.valid[player_idx]))
+    _pl.set_ping(int(_tbl.ping[player_idx]))
 
-    _pl.set_steamid3(get_id3_from_iAccountID(_pr.m_iAccountID[player_idx]))
-    _pl.set_alive(_pr.m_bAlive[player_idx])
+    _pl.set_steamid3(get_id3_from_iAccountID(int(_tbl.account_id[player_idx])))
+    _pl.set_alive(bool(_tbl.alive[player_idx]))
 
-    _pl.set_score(_pr.m_iScore[player_idx])
-    _pl.set_deaths(_pr.m_iDeaths[player_idx])
-    _pl.set_health(_pr.m_iHealth[player_idx])
+    _pl.set_score(int(_tbl.score[player_idx]))
+    _pl.set_deaths(int(_tbl.deaths[player_idx]))
+    _pl.set_health(int(_tbl.health[player_idx]))
 
-    _pl.set_connected(_pr.m_bConnected[player_idx])
-    _pl.set_ig_id(_pr.m_iUserID[player_idx])
+    _pl.set_connected(bool(_tbl.connected[player_idx]))
+    _pl.set_ig_id(int(_tbl.user_id[player_idx]))
     return _pl
 
 
@@ -151,3 +134,17 @@ def get_player_stats_from_identifier(
         raise ValueError(f"No player idx was found with the provided identifier: {sid3}/{name}/{ig_id}")
     _pl = get_player_stats_from_idx(dump, _idx)
     return _pl
+
+
+def get_all_player_stats(dump: G15DumpPlayer) -> dict[str, PlayerDump]:
+    """
+    Build a PlayerDump for every valid (occupied) player slot in one pass over the dump.
+
+    :param dump: the G15DumpPlayer object returned from parsing the `g15_dumpplayer` command output
+    :return: PlayerDump instances keyed by their SteamID3
+    """
+    _players = {}
+    for _idx in dump.get_player_resource_table().valid_slots():
+        _pl = get_player_stats_from_idx(dump, int(_idx))
+        _players.setdefault(_pl.steamid3, _pl)
+    return _players
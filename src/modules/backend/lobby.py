@@ -4,21 +4,25 @@ import steam
 from steam import Steam
 from steamid_converter import Converter
 from typing import Self, Any, Callable
-from src.modules.backend.rc.rcon_client import RCONListener, RCONHelper
+from src.modules.backend.rc.rcon_client import RCONListener, RCONHelper, CONNECTION_ERRORS
+from src.modules.backend.rc.breaker import GameUnavailable
 from src.modules.caching.avatar_cache import AvCache
-from src.modules.backend.g15parser.consumer import do_g15, Team
-from src.modules.backend.g15parser.helpers import get_player_stats_from_identifier, get_id3_from_iAccountID, PlayerDump
+from src.modules.backend.g15parser.consumer import (
+    fetch_g15, Team, PlayerResourceTable, G15DeltaParser, G15DumpPlayer, LOBBY_G15_FIELDS
+)
+from src.modules.backend.g15parser.helpers import get_all_player_stats, PlayerDump
+from src.modules.backend.scheduler import AdaptiveScheduler, AdaptiveJob, waiting, woken
 from src.modules.deprecated.listener.path_listener import Watchdog
 from src.modules.deprecated.listener.status import TF2StatusBlob
+from src.modules.deprecated.listener.classifier import PlayerConnected, ServerConnected, Disconnected, MapChange
+from src.modules.deprecated.listener.event_bus import ConsoleEventBus, Subscription
 from pathlib import Path
-from threading import Thread, Lock
+from threading import Lock
 from abc import ABC, abstractmethod
 
 import os
 import re
-import time
 import loguru
-import schedule
 
 
 class PlayerAssociation(ABC):
@@ -234,14 +238,15 @@ class TF2Lobby:
     maxPlayers: int = None
     numPlayers: int = None
     gamemode: dict = None
+    # the per-slot G15 data from the most recent `g15_dumpplayer` pull
+    resource_table: PlayerResourceTable = None
+    g15_delta: G15DeltaParser = None
 
     rcon: RCONListener = None
     steam_: Steam = None
     listener: Watchdog = None
 
     last_update: datetime.datetime = None
-    update_order: list[Callable] = None
-    update_location: int = None
 
     lobby_lock: Lock = None
 
@@ -256,6 +261,7 @@ class TF2Lobby:
         self.maxPlayers: int = 0
         self.numPlayers: int = 0
         self.gamemode: dict = {}
+        self.g15_delta: G15DeltaParser = G15DeltaParser(LOBBY_G15_FIELDS)
 
         self.rcon = rcon_client
         self.steam = steam_client
@@ -263,15 +269,6 @@ class TF2Lobby:
 
         self.last_update: datetime.datetime = datetime.datetime.now()
 
-        self.update_order = [
-            self.update_from_status,
-            self.update_from_g15,
-            self.update_from_g15,
-            self.update_from_g15,
-            self.update_from_g15,
-        ]
-        self.update_location = 0
-
     def get_player_by_nick(self, nickname: str) -> TF2Player | None:
         with self.lobby_lock:
             for _pl in self.players:
@@ -280,46 +277,80 @@ class TF2Lobby:
 
         return None
 
-    def update_from_g15(self):
-        """ Update the player entries from a `g15_dumpplayer` command invocation. """
+    def is_live(self) -> bool:
+        """ Whether we are in a server, going by the last `g15_dumpplayer` pull, and the game is reachable. """
+        return self.g15_delta.dump is not None and self.rcon.game_available
+
+    def update_from_g15(self, max_age: float | None = None) -> bool:
+        """
+        Update the player entries from a `g15_dumpplayer` command invocation.
+
+        :param max_age: how old a cached dump may be, in seconds (the response caches TTL if None, 0 to always fetch)
+        :return: whether anything the player entries are built from changed
+        """
         try:
-            _g15_dump = do_g15(self.rcon)
+            _changes = self.g15_delta.update(fetch_g15(self.rcon, max_age))
         except ValueError:
-            return
+            return False
         except IndexError:
-            return
-        _to_remove = []
-        _found = []
+            return False
+        except GameUnavailable:
+            return False
+        except CONNECTION_ERRORS as e:
+            # the breaker has counted it, and warns (once) that the game is unavailable
+            loguru.logger.debug(f"Unable to pull g15_dumpplayer: {e!r}")
+            return False
+
+        _g15_dump = self.g15_delta.dump
+        if _g15_dump is None:
+            # Not in a server
+            with self.lobby_lock:
+                _had_players = bool(self.players)
+                self.players = []
+            return _had_players
+        if not any(
+                _change.section == G15DumpPlayer.playerresource or _change.field == "m_iAmmo"
+                for _change in _changes
+        ):
+            # nothing the player entries are built from has changed since the last pull
+            return False
+        _dumps = get_all_player_stats(_g15_dump)
 
         with self.lobby_lock:
+            self.resource_table = _g15_dump.get_player_resource_table()
+            _remaining = []
             for _pl in self.players:
-                try:
-                    _pd = get_player_stats_from_identifier(_g15_dump, sid3=_pl.steamID3)
+                _pd = _dumps.pop(_pl.steamID3, None)
+                if _pd is not None:
                     _pl.set_from_g15_player_dump(_pd)
-                    _found.append(_pl.steamID3)
-                except ValueError:
-                    _to_remove.append(_pl)
+                    _remaining.append(_pl)
 
-        with self.lobby_lock:
-            for aid in _g15_dump.get_local_player_resource_data().m_iAccountID:
-                _id3 = get_id3_from_iAccountID(aid)
-                if _id3 not in _found:
-                    _pl = TF2Player(self.steam_, _id3)
-                    _pl.set_from_g15_player_dump(get_player_stats_from_identifier(_g15_dump, sid3=_id3))
-                    self.players.append(_pl)
+            for _id3, _pd in _dumps.items():
+                _pl = TF2Player(self.steam_, _id3)
+                _pl.set_from_g15_player_dump(_pd)
+                _remaining.append(_pl)
 
-        with self.lobby_lock:
-            for _rpl in _to_remove:
-                self.players.remove(_rpl)
+            self.players = _remaining
+        return True
 
-    def update_from_status(self):
+    def update_from_status(self) -> bool:
         """
         Update player and lobby data from a status command invocation.
         This is the only way to get the `game_time` values populated per player.
+
+        :return: whether a player joined, or the lobby went away
         """
+        if not self.rcon.game_available:
+            # nothing will show up in the console, don't wait on it
+            return False
         self.listener.get_update()
-        RCONHelper.invoke_status(self.rcon)
-        status: TF2StatusBlob | None = self.listener.invoke_status()
+        # status, g15_dumpplayer and tf_lobby_debug in one pipelined round trip, the latter two land in the response
+        # cache, so the g15 job's next pull is served from it instead of going over the socket again
+        if not RCONHelper.get_refresh_data(self.rcon):
+            return False
+        with waiting():
+            # up to a couple of seconds for the console to print it, which isn't this jobs cost
+            status: TF2StatusBlob | None = self.listener.invoke_status()
 
         if status is None:
             if self.exists:
@@ -330,27 +361,29 @@ class TF2Lobby:
                     self.pending_players = 0
                     self.exists = False
                     loguru.logger.info(f"No longer in valid lobby.")
+                    return True
             loguru.logger.info("No lobby. ")
-            return
-        self.listener.changes.put("\n".join(status.excess_junk), block=True, timeout=None)
+            return False
+        self.listener.push_back(status.excess_junk)
         _existing_sid3 = [(x.steamID3, x) for x in self.players]
+        _changed = False
 
-        for player_match in status.players:
+        for _status_player in status.players:
             _found_player: bool = False
-            _groups = player_match.groups()
 
-            _sid3 = _groups[3].strip()
+            _sid3 = _status_player.steam_id3.strip()
             for _exist_sid3, _player in _existing_sid3:
                 if _sid3 == _exist_sid3:
-                    _player.set_from_status(_groups)
+                    _player.set_from_status(_status_player)
                     _found_player = True
 
             _to_add = []
             if not _found_player:
                 _new_player = TF2Player(self.steam_, _sid3)
-                _new_player.set_from_status(_groups)
+                _new_player.set_from_status(_status_player)
                 with self.lobby_lock:
                     self.players.append(_new_player)
+                _changed = True
 
         with self.lobby_lock:
             self.map = status.status_map.strip().split()[0]
@@ -359,13 +392,7 @@ class TF2Lobby:
             self.player_count = status.num_players
 
         # self.last_update = datetime.datetime.now()
-
-    def update_sequenced(self) -> None:
-        _update_method = self.update_order[self.update_location]
-        self.update_location += 1
-        self.update_location %= len(self.update_order)
-        _update_method()
-        self.last_update = datetime.datetime.now()
+        return _changed
 
     @classmethod
     def spawn_from_tf_lobby_debug(cls, tf_lobby_debug_str: str, _steam: Steam | None = None) -> Self:
@@ -397,25 +424,39 @@ class LobbyWatching:
         self.steam = steam_iclient
         self.lobby = TF2Lobby.spawn_from_tf_lobby_debug(RCONHelper.get_lobby_data(self.rcon))
         self.lobby.set_iclients(self.rcon, self.steam)
-        self.schedule_job = schedule.every(7).seconds.do(job_func=self.lobby.update_sequenced)
-        self._run_scheduler = True
-        self.schedule_proc = Thread(
-            target=self._manage_scheduler,
-            args=(),
-            daemon=True,
-            name="LobbyWatching-update-scheduler"
-        )
-        self.schedule_proc.start()
 
-    def _manage_scheduler(self) -> None:
-        while self._run_scheduler:
-            schedule.run_pending()
-            time.sleep(1)
-
-    def _end_scheduler(self):
-        self._run_scheduler = False
-        schedule.cancel_job(self.schedule_job)
-        self.schedule_proc.join()
+        # `status` is the expensive one (it's read back out of console.log), g15 is cheap and carries most updates
+        self.scheduler = AdaptiveScheduler(live=self.lobby.is_live)
+        self.scheduler.add_job(AdaptiveJob(
+            "status", self._updated(self.lobby.update_from_status),
+            min_interval=5.0, max_interval=60.0, idle_interval=120.0
+        ))
+        self.scheduler.add_job(AdaptiveJob(
+            # a wake means something just happened in the console, a dump cached before it is already stale
+            "g15", self._updated(lambda: self.lobby.update_from_g15(max_age=0 if woken() else None)),
+            min_interval=1.0, max_interval=15.0, idle_interval=30.0
+        ))
+        self.scheduler.start()
+        self.console_bus: ConsoleEventBus | None = None
+        self.console_events: Subscription | None = None
+
+    def _updated(self, update: Callable[[], bool]) -> Callable[[], bool]:
+        def _run() -> bool:
+            _changed = update()
+            self.lobby.last_update = datetime.datetime.now()
+            return _changed
+        return _run
+
+    def watch_console(self, bus: ConsoleEventBus) -> None:
+        """ Update straight away when a player (or us) connects, we disconnect, or the map changes. """
+        self.console_bus = bus
+        self.console_events = bus.subscribe(
+            PlayerConnected, ServerConnected, Disconnected, MapChange, maxsize=16,
+            callback=lambda _event: self.scheduler.wake()
+        )
 
     def kill_watcher(self):
-        self._end_scheduler()
+        if self.console_events is not None:
+            self.console_bus.unsubscribe(self.console_events)
+            self.console_events = None
+        self.scheduler.stop()
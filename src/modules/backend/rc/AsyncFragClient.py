@@ -0,0 +1,340 @@
+import asyncio
+import loguru
+from asyncio import StreamReader, StreamWriter, Future, Task
+from rcon.exceptions import SessionTimeout, WrongPassword, EmptyResponse
+from rcon.source.proto import Packet, Type, LittleEndianSignedInt32, random_request_id
+from src.modules.backend.rc.FragClient import make_command_frag
+from src.modules.backend.rc.metrics import METRICS, CONNECTION, command_name
+from dataclasses import dataclass, field
+from threading import Lock, Thread
+from typing import Callable, Self
+
+import time
+
+
+@dataclass
+class _PendingCommand:
+    """ A command that has been sent, and whose response has not been fully read yet. """
+    request_id: int
+    dummy_id: int
+    future: Future
+    command: str
+    started: float
+    on_fragment: Callable[[bytes], None] | None = None
+    fragments: list[bytes] = field(default_factory=list)
+    first_byte: float | None = None
+    fragment_count: int = 0
+    byte_count: int = 0
+
+
+class AsyncFragClient:
+    """
+    An asyncio Source RCON client that can have several commands in flight on one socket at once.
+
+    Every command is sent followed by its own delimiting dummy packet (see FragClient), and a single reader task
+    demultiplexes the response packets by request id. Because the server answers packets in the order it receives
+    them, the mirror of a commands dummy packet marks the end of that commands (fragmented) response, no matter how
+    many other commands are pipelined behind it. So e.g. `status`, `g15_dumpplayer` and `tf_lobby_debug` can all be
+    sent at once, and cost roughly one round trip instead of three:
+
+        async with AsyncFragClient("127.0.0.1", 27015, "password") as h:
+            status, g15, lobby = await h.run_many("status", "g15_dumpplayer", "tf_lobby_debug")
+    """
+    host: str = None
+    port: int = None
+    passwd: str = None
+    timeout: float | None = None
+    # how many finished request/dummy ids to remember for ignoring late packets
+    MAX_STALE_IDS: int = 64
+
+    def __init__(self, host: str, port: int, passwd: str, timeout: float | None = None) -> None:
+        self.host = host
+        self.port = port
+        self.passwd = passwd
+        self.timeout = timeout
+
+        self._reader: StreamReader | None = None
+        self._writer: StreamWriter | None = None
+        self._read_task: Task | None = None
+        # request id -> pending command, and each pending commands dummy id -> its request id
+        self._pending: dict[int, _PendingCommand] = {}
+        self._dummies: dict[int, int] = {}
+        # ids whose response is over, the server may still send a trailing packet carrying them (oldest first)
+        self._stale_ids: dict[int, None] = {}
+
+    async def __aenter__(self) -> Self:
+        await self.connect(login=True)
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    @property
+    def connected(self) -> bool:
+        """ Whether the connection is up, i.e. commands can be sent on it. """
+        return self._read_task is not None and not self._read_task.done()
+
+    async def _read_exactly(self, size: int) -> bytes:
+        try:
+            return await self._reader.readexactly(size)
+        except asyncio.IncompleteReadError as e:
+            # an EOFError, not an OSError: surface the server hanging up as the connection error it is
+            raise ConnectionResetError(f"Connection closed after {len(e.partial)} of {size} bytes.") from e
+
+    async def _read_packet(self) -> Packet:
+        _size = LittleEndianSignedInt32.from_bytes(await self._read_exactly(4), 'little', signed=True)
+        if not _size:
+            raise EmptyResponse()
+        _body = await self._read_exactly(_size)
+        return Packet(
+            LittleEndianSignedInt32.from_bytes(_body[0:4], 'little', signed=True),
+            Type(LittleEndianSignedInt32.from_bytes(_body[4:8], 'little', signed=True)),
+            _body[8:-2],
+            _body[-2:]
+        )
+
+    async def _send(self, *packets: Packet) -> None:
+        self._writer.write(b"".join(bytes(_packet) for _packet in packets))
+        await self._writer.drain()
+
+    async def connect(self, login: bool = True) -> None:
+        _start = time.perf_counter()
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        METRICS.observe(CONNECTION, "connect_ms", (time.perf_counter() - _start) * 1000)
+        if login:
+            _start = time.perf_counter()
+            await asyncio.wait_for(self._login(), self.timeout)
+            METRICS.observe(CONNECTION, "auth_ms", (time.perf_counter() - _start) * 1000)
+        self._read_task = asyncio.create_task(self._read_loop(), name="AsyncFragClient-reader")
+
+    async def _login(self) -> None:
+        await self._send(Packet.make_login(self.passwd))
+        while (_response := await self._read_packet()).type != Type.SERVERDATA_AUTH_RESPONSE:
+            # the server sends an empty SERVERDATA_RESPONSE_VALUE ahead of the auth response
+            continue
+        if _response.id == -1:
+            await self.close()
+            raise WrongPassword()
+
+    async def close(self) -> None:
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._writer = None
+        self._fail_pending(SessionTimeout())
+
+    def _fail_pending(self, exc: BaseException) -> None:
+        for _pending in self._pending.values():
+            if not _pending.future.done():
+                _pending.future.set_exception(exc)
+        self._pending.clear()
+        self._dummies.clear()
+
+    def _mark_stale(self, *ids: int) -> None:
+        for _id in ids:
+            self._stale_ids[_id] = None
+        while len(self._stale_ids) > self.MAX_STALE_IDS:
+            del self._stale_ids[next(iter(self._stale_ids))]
+
+    def _dispatch(self, packet: Packet) -> None:
+        if packet.type != Type.SERVERDATA_RESPONSE_VALUE or packet.id in self._stale_ids:
+            return
+
+        _pending = self._pending.get(packet.id)
+        if _pending is not None:
+            if _pending.first_byte is None:
+                _pending.first_byte = time.perf_counter()
+            _pending.fragment_count += 1
+            _pending.byte_count += len(packet.payload)
+            if _pending.on_fragment is not None:
+                _pending.on_fragment(packet.payload)
+            else:
+                _pending.fragments.append(packet.payload)
+            return
+
+        _request_id = self._dummies.pop(packet.id, None)
+        if _request_id is None:
+            loguru.logger.warning(f"Read packet with unknown request id {packet.id} from server...")
+            return
+
+        self._mark_stale(packet.id)
+        _pending = self._pending.pop(_request_id)
+        _now = time.perf_counter()
+        METRICS.observe(_pending.command, "ttfb_ms", ((_pending.first_byte or _now) - _pending.started) * 1000)
+        METRICS.observe(_pending.command, "total_ms", (_now - _pending.started) * 1000)
+        METRICS.observe(_pending.command, "fragments", _pending.fragment_count)
+        METRICS.observe(_pending.command, "bytes", _pending.byte_count)
+        if not _pending.future.done():
+            _pending.future.set_result(b"".join(_pending.fragments))
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                try:
+                    _packet = await self._read_packet()
+                except ValueError:
+                    loguru.logger.warning(f"Read invalid packet from server...")
+                    METRICS.increment(CONNECTION, "invalid_packets")
+                    continue
+                self._dispatch(_packet)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # connection closed or broken, nothing in flight will ever be answered
+            self._fail_pending(e if isinstance(e, (OSError, EmptyResponse)) else SessionTimeout())
+
+    async def communicate(self, packet: Packet, on_fragment: Callable[[bytes], None] | None = None) -> bytes:
+        """
+        Send a packet followed by its delimiting dummy packet, and wait for its full response payload. Several calls
+        can be awaited concurrently, they share the socket.
+
+        If on_fragment is given, each fragment payload is passed to it as soon as it is read instead of being
+        collected, and an empty payload is returned.
+        """
+        if self._read_task is None or self._read_task.done():
+            raise SessionTimeout()
+
+        _dummy = make_command_frag()
+        while _dummy.id in self._stale_ids or _dummy.id in self._pending or _dummy.id == packet.id:
+            _dummy = Packet(random_request_id(), _dummy.type, _dummy.payload)
+        _pending = _PendingCommand(
+            packet.id, _dummy.id, asyncio.get_running_loop().create_future(), command_name(packet.payload),
+            time.perf_counter(), on_fragment
+        )
+        self._pending[packet.id] = _pending
+        self._dummies[_dummy.id] = packet.id
+        self._stale_ids.pop(packet.id, None)
+
+        try:
+            await self._send(packet, _dummy)
+            return await asyncio.wait_for(asyncio.shield(_pending.future), self.timeout)
+        except BaseException:
+            self._pending.pop(packet.id, None)
+            self._dummies.pop(_dummy.id, None)
+            # anything still arriving for this command must be ignored
+            self._mark_stale(packet.id, _dummy.id)
+            raise
+
+    async def run(self, command: str, *args: str, encoding: str = 'utf-8') -> str:
+        """ Run a command and return its (defragmented) output. """
+        _payload = await self.communicate(Packet.make_command(command, *args, encoding=encoding))
+        return _payload.decode(encoding, errors='ignore')
+
+    async def stream(
+            self, command: str, *args: str, on_fragment: Callable[[bytes], None], encoding: str = 'utf-8'
+    ) -> None:
+        """ Run a command, handing each raw response fragment to on_fragment as it arrives. """
+        await self.communicate(Packet.make_command(command, *args, encoding=encoding), on_fragment=on_fragment)
+
+    async def run_many(self, *commands: str, encoding: str = 'utf-8') -> list[str]:
+        """
+        Pipeline several commands on the socket at once, returning their outputs in the order given. Each command
+        string is sent as is, e.g. "echo hello".
+        """
+        return list(await asyncio.gather(*(self.run(_command, encoding=encoding) for _command in commands)))
+
+
+def run_pipelined(host: str, port: int, passwd: str, *commands: str, timeout: float | None = 5.0) -> list[str]:
+    """
+    Blocking convenience wrapper, connect, pipeline the commands on one socket and return their outputs in order.
+    """
+    async def _run() -> list[str]:
+        async with AsyncFragClient(host, port, passwd, timeout=timeout) as h:
+            return await h.run_many(*commands)
+
+    return asyncio.run(_run())
+
+
+class PipelineSession:
+    """
+    A long-lived AsyncFragClient for blocking callers. It runs on an event loop thread of its own, connects on first
+    use and again after the connection breaks, and every thread calling in shares (and pipelines on) its one socket,
+    so a pipelined refresh costs one round trip rather than a connect, a login and then the round trip.
+
+        _session = PipelineSession("127.0.0.1", 27015, "password")
+        status, g15, lobby = _session.run_many("status", "g15_dumpplayer", "tf_lobby_debug")
+    """
+    host: str = None
+    port: int = None
+    passwd: str = None
+    timeout: float | None = None
+
+    def __init__(self, host: str, port: int, passwd: str, timeout: float | None = 5.0) -> None:
+        self.host = host
+        self.port = port
+        self.passwd = passwd
+        self.timeout = timeout
+
+        self._lock = Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: Thread | None = None
+        # only touched on the loop thread
+        self._client: AsyncFragClient | None = None
+        self._connecting: asyncio.Lock | None = None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = Thread(target=self._loop.run_forever, daemon=True, name="PipelineSession")
+                self._thread.start()
+            return self._loop
+
+    async def _get_client(self) -> AsyncFragClient:
+        if self._connecting is None:
+            self._connecting = asyncio.Lock()
+        async with self._connecting:
+            if self._client is None or not self._client.connected:
+                await self._drop_client()
+                _client = AsyncFragClient(self.host, self.port, self.passwd, timeout=self.timeout)
+                try:
+                    await _client.connect(login=True)
+                except BaseException:
+                    await _client.close()
+                    raise
+                self._client = _client
+            return self._client
+
+    async def _drop_client(self) -> None:
+        _client, self._client = self._client, None
+        if _client is not None:
+            await _client.close()
+
+    async def _run_many(self, commands: tuple[str, ...], encoding: str) -> list[str]:
+        _client = await self._get_client()
+        try:
+            return await _client.run_many(*commands, encoding=encoding)
+        except BaseException:
+            # a timed out or broken connection can't be trusted with the next call, start over on a new one
+            if self._client is _client:
+                await self._drop_client()
+            raise
+
+    def run_many(self, *commands: str, encoding: str = 'utf-8') -> list[str]:
+        """ Pipeline the commands on the shared connection, returning their outputs in the order given. """
+        return asyncio.run_coroutine_threadsafe(self._run_many(commands, encoding), self._get_loop()).result()
+
+    def close(self) -> None:
+        """ Close the connection, and stop the loop thread. The session starts over if it is used again. """
+        with self._lock:
+            _loop, _thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if _loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._drop_client(), _loop).result()
+        _loop.call_soon_threadsafe(_loop.stop)
+        _thread.join()
+        _loop.close()
+        self._connecting = None
@@ -1,9 +1,38 @@
 import loguru
 from rcon.source import Client
-from socket import SOCK_STREAM
-from rcon.exceptions import SessionTimeout, WrongPassword
+from socket import SOCK_STREAM, IPPROTO_TCP, TCP_NODELAY
+from rcon.exceptions import SessionTimeout, WrongPassword, EmptyResponse
 from rcon.source.proto import Packet, Type, random_request_id
 from functools import partial
+from src.modules.backend.rc.metrics import METRICS, CONNECTION, command_name
+from typing import Callable, BinaryIO, NamedTuple
+
+import struct
+import time
+
+# size, id, type, all little-endian signed int32
+_HEADER = struct.Struct("<iii")
+
+
+class BatchOutput(NamedTuple):
+    request_id: int
+    command: str
+    output: str
+
+
+class BatchResult(NamedTuple):
+    """ The outputs of a batch of commands (in the order they were given), and how long the batch took. """
+    outputs: list[BatchOutput]
+    # seconds from sending the batch to reading the first response packet, and to reading the last delimiter
+    ttfb: float
+    elapsed: float
+
+    def by_id(self) -> dict[int, str]:
+        return {_out.request_id: _out.output for _out in self.outputs}
+
+    def by_command(self) -> dict[str, str]:
+        """ Outputs keyed by command line. If a command line is repeated, the last one wins. """
+        return {_out.command: _out.output for _out in self.outputs}
 
 
 class FragClient(Client, socket_type=SOCK_STREAM):
@@ -18,9 +47,13 @@ class FragClient(Client, socket_type=SOCK_STREAM):
 
     Source RCON is a TCP socket server, thus packets are always sent in-order, and with ECC.
 
-    TODO: check if this leaves a dangling packet in the recv buffer, resulting in future messages failing.
+    Packets left over from an earlier exchange (e.g. the trailing packet some servers send after mirroring the dummy
+    packet) are skipped by id, so a FragClient connection can be reused for many commands (see RCONPool).
     """
 
+    # reassembly buffer size for a command not seen before, g15_dumpplayer output is ~23 KiB
+    INITIAL_BUFFER_SIZE: int = 32 * 1024
+
     def __init__(self, *args, **kwargs):
         """
         Arguments: rcon_ip, rcon_port, passwd=rcon_pword
@@ -28,39 +61,252 @@ class FragClient(Client, socket_type=SOCK_STREAM):
         Downside of using *args and **kwargs is that you lose parameter hinting in your IDE.
         """
         super().__init__(*args, **kwargs)
+        self._stale_ids: tuple[int, ...] = ()
+        self._rfile: BinaryIO | None = None
+        # command name -> size of its last response, to preallocate the reassembly buffer
+        self._size_hints: dict[bytes, int] = {}
+
+    def read(self) -> Packet:
+        """
+        Read one packet from the server.
+
+        The base Client opens (and closes) a new buffered file over the socket for every read, throwing away any bytes
+        it read ahead. That loses packets whenever the server sends several at once (the auth response, fragments, the
+        dummy mirror), so a single reader is kept for the lifetime of the connection instead. Fragment detection is
+        done by frag_communicate, not here.
+        """
+        if self._rfile is None:
+            self._rfile = self._socket.makefile('rb')
+        return Packet.read(self._rfile)
+
+    def connect(self, login: bool = False) -> None:
+        """ Connect the socket, and log in if asked to and a password is set, recording how long each step took. """
+        _start = time.perf_counter()
+        self._socket.connect((self.host, self.port))
+        self._socket.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+        METRICS.observe(CONNECTION, "connect_ms", (time.perf_counter() - _start) * 1000)
+
+        if login and self.passwd is not None:
+            _start = time.perf_counter()
+            self.login(self.passwd)
+            METRICS.observe(CONNECTION, "auth_ms", (time.perf_counter() - _start) * 1000)
+
+    def __exit__(self, typ, value, traceback):
+        # the reader holds a reference on the socket, so it has to be closed for the socket to be
+        self.close()
+        return super().__exit__(typ, value, traceback)
+
+    def close(self) -> None:
+        if self._rfile is not None:
+            self._rfile.close()
+            self._rfile = None
+        super().close()
+
+    def _read_header(self) -> tuple[int, int, int]:
+        """ Read the size, id and type of the next packet, leaving its payload and terminator unread. """
+        if self._rfile is None:
+            self._rfile = self._socket.makefile('rb')
+        _head = self._rfile.read(_HEADER.size)
+        if len(_head) < _HEADER.size:
+            raise EmptyResponse()
+        _size, _id, _type = _HEADER.unpack(_head)
+        if _size < 10:
+            raise EmptyResponse()
+        return _size, _id, _type
+
+    def _frag_collect(
+            self, packet: Packet, on_fragment: Callable[[bytes], None] | None = None
+    ) -> memoryview | None:
+        """
+        Send a packet followed by a delimiting dummy packet and read the response fragments up to the dummies mirror.
+
+        Fragment payloads answering the request are read straight into one growable buffer (sized from the last
+        response to the same command, and doubled when outgrown), so assembling a response costs a single copy of each
+        byte rather than re-copying everything read so far for every fragment.
+
+        :return: a view over the assembled payload (empty if on_fragment was given), or None if nothing answered the
+        request
+        """
+        _hint_key = packet.payload.split(b' ', 1)[0]
+        _command = command_name(_hint_key)
+        _start = time.perf_counter()
+        _first_byte: float | None = None
+        _fragments = 0
+        _invalid = 0
+        _streamed = 0
 
-    def frag_communicate(self, packet: Packet) -> Packet:
-        """Send and receive a fragmented packet using some helpful packet delimiting and packet defragmentation."""
-        self.send(packet)
         _dummy_pack = make_command_frag()
-        self.send(_dummy_pack)
-        _total_packet: Packet | None = None
+        # one write for both, sent as two small writes the dummy is held back by Nagle until the command is ACKed
+        self._socket.sendall(bytes(packet) + bytes(_dummy_pack))
+
+        # streamed fragments are handed on as they are read, only a collected response needs the buffer
+        _buffer = bytearray(self._size_hints.get(_hint_key, self.INITIAL_BUFFER_SIZE) if on_fragment is None else 0)
+        _view = memoryview(_buffer)
+        _used = 0
+        _matched = False
         while True:
-            try:
-                _pack = self.read()
-            except ValueError:
+            _size, _id, _type = self._read_header()
+            if _first_byte is None:
+                _first_byte = time.perf_counter()
+            _payload_len = _size - 10
+            if _type != Type.SERVERDATA_RESPONSE_VALUE:
+                self._rfile.read(_payload_len + 2)
                 loguru.logger.warning(f"Read invalid packet from server...")
+                _invalid += 1
                 continue
-            if _pack.type == Type.SERVERDATA_RESPONSE_VALUE:
-                if _pack.id == _dummy_pack.id or _pack.payload == b'\x00\x00\x00\x01\x00\x00\x00\x00':
-                    break
+
+            if _id == packet.id:
+                _matched = True
+                _fragments += 1
+                if on_fragment is not None:
+                    _fragment = self._rfile.read(_payload_len)
+                    if len(_fragment) < _payload_len:
+                        raise ConnectionResetError("Connection closed in the middle of a response packet.")
+                    on_fragment(_fragment)
+                    _streamed += _payload_len
                 else:
-                    if _total_packet is None:
-                        _total_packet = _pack
-                    elif _pack.id == packet.id:
-                        _total_packet += _pack
+                    if _used + _payload_len > len(_buffer):
+                        _view.release()
+                        _buffer.extend(bytes(max(_payload_len, len(_buffer))))
+                        _view = memoryview(_buffer)
+                    if self._rfile.readinto(_view[_used:_used + _payload_len]) < _payload_len:
+                        raise ConnectionResetError("Connection closed in the middle of a response packet.")
+                    _used += _payload_len
+                self._rfile.read(2)
+                continue
+
+            _payload = self._rfile.read(_payload_len + 2)[:-2]
+            if _id in self._stale_ids:
+                # The server can send a trailing 0x01 packet after mirroring an earlier exchanges dummy packet.
+                # On a reused connection that arrives here, and must not end this response.
+                continue
+            if _id == _dummy_pack.id or _payload == b'\x00\x00\x00\x01\x00\x00\x00\x00':
+                break
+            loguru.logger.debug(f"Skipped packet with unexpected id {_id} while reading a response.")
+
+        self._stale_ids = (packet.id, _dummy_pack.id)
+
+        METRICS.observe(_command, "ttfb_ms", (_first_byte - _start) * 1000)
+        METRICS.observe(_command, "total_ms", (time.perf_counter() - _start) * 1000)
+        METRICS.observe(_command, "fragments", _fragments)
+        METRICS.observe(_command, "bytes", _used + _streamed)
+        if _invalid:
+            METRICS.increment(_command, "invalid_packets", _invalid)
+
+        if not _matched:
+            return None
+        if on_fragment is None:
+            self._size_hints[_hint_key] = max(_used, self.INITIAL_BUFFER_SIZE)
+        return _view[:_used]
 
-        return _total_packet
+    def frag_communicate(self, packet: Packet, on_fragment: Callable[[bytes], None] | None = None) -> Packet | None:
+        """
+        Send and receive a fragmented packet using some helpful packet delimiting and packet defragmentation.
+
+        If on_fragment is given, each fragment payload answering the request is passed to it as soon as it is read
+        instead of being concatenated, and the returned packet carries the request id with an empty payload.
+        Returns None if no packet answered the request.
+        """
+        _payload = self._frag_collect(packet, on_fragment=on_fragment)
+        if _payload is None:
+            return None
+        return Packet(packet.id, Type.SERVERDATA_RESPONSE_VALUE, bytes(_payload))
 
     def frag_run(self, command: str, *args: str, encoding: str = 'utf-8') -> str:
-        """Run a command. Invokes frag_communicate rather than the usual communicate."""
+        """Run a command. Defragments the response like frag_communicate, and decodes it once, in place."""
         request = Packet.make_command(command, *args, encoding=encoding)
-        response = self.frag_communicate(request)
+        response = self._frag_collect(request)
 
-        if response.id != request.id:
+        if response is None:
             raise SessionTimeout()
 
-        return response.payload.decode(encoding, errors='ignore')
+        return str(response, encoding, errors='ignore')
+
+    def frag_stream(
+            self, command: str, *args: str, on_fragment: Callable[[bytes], None], encoding: str = 'utf-8'
+    ) -> None:
+        """Run a command, handing each raw response fragment to on_fragment as it arrives."""
+        request = Packet.make_command(command, *args, encoding=encoding)
+
+        if self._frag_collect(request, on_fragment=on_fragment) is None:
+            raise SessionTimeout()
+
+    def frag_batch(self, commands: list[str], encoding: str = 'utf-8') -> BatchResult:
+        """
+        Run several commands back to back on this connection. Every command packet (each followed by its own
+        delimiting dummy packet) goes out in one write, and the responses are sorted back out by request id, so the
+        batch costs about one round trip however many commands it has.
+
+        :param commands: command lines, e.g. ["status", "tf_lobby_debug", "echo marker"]
+        :return: each commands output by request id, in the order given, with the batch timing
+        """
+        if not commands:
+            return BatchResult([], 0.0, 0.0)
+
+        _requests = [Packet.make_command(_command, encoding=encoding) for _command in commands]
+        _dummies = [make_command_frag() for _ in _requests]
+        # request id -> its index, dummy id -> the index of the request it delimits
+        _request_idx = {_request.id: _idx for _idx, _request in enumerate(_requests)}
+        _dummy_idx = {_dummy.id: _idx for _idx, _dummy in enumerate(_dummies)}
+        if len(_request_idx) != len(_requests) or len(_dummy_idx) != len(_dummies) or _request_idx.keys() & _dummy_idx:
+            # random ids collided, vanishingly unlikely, just try again
+            return self.frag_batch(commands, encoding=encoding)
+        _all_dummy_ids = frozenset(_dummy_idx)
+
+        _buffers = [bytearray() for _ in _requests]
+        _fragments = [0] * len(_requests)
+        _matched = [False] * len(_requests)
+        _remaining = len(_requests)
+        _start = time.perf_counter()
+        _first_byte: float | None = None
+
+        self._socket.sendall(b"".join(bytes(_p) for _pair in zip(_requests, _dummies) for _p in _pair))
+        while _remaining:
+            _size, _id, _type = self._read_header()
+            if _first_byte is None:
+                _first_byte = time.perf_counter()
+            _payload = self._rfile.read(_size - 10 + 2)[:-2]
+            if _type != Type.SERVERDATA_RESPONSE_VALUE:
+                loguru.logger.warning(f"Read invalid packet from server...")
+                METRICS.increment(CONNECTION, "invalid_packets")
+                continue
+
+            _idx = _request_idx.get(_id)
+            if _idx is not None:
+                _buffers[_idx] += _payload
+                _fragments[_idx] += 1
+                _matched[_idx] = True
+                continue
+
+            _idx = _dummy_idx.pop(_id, None)
+            if _idx is not None:
+                # the mirror of this requests dummy, its response is complete (a trailer repeating the id is ignored)
+                _remaining -= 1
+            elif _id not in self._stale_ids and _id not in _all_dummy_ids:
+                loguru.logger.debug(f"Skipped packet with unexpected id {_id} while reading a batch.")
+
+        _end = time.perf_counter()
+        self._stale_ids = tuple(_request_idx) + tuple(_all_dummy_ids)
+        if not all(_matched):
+            raise SessionTimeout()
+
+        METRICS.observe("<batch>", "ttfb_ms", (_first_byte - _start) * 1000)
+        METRICS.observe("<batch>", "total_ms", (_end - _start) * 1000)
+        METRICS.observe("<batch>", "fragments", sum(_fragments))
+        METRICS.observe("<batch>", "bytes", sum(len(_b) for _b in _buffers))
+        for _request, _buffer, _count in zip(_requests, _buffers, _fragments):
+            _command = command_name(_request.payload)
+            METRICS.observe(_command, "bytes", len(_buffer))
+            METRICS.observe(_command, "fragments", _count)
+
+        return BatchResult(
+            [
+                BatchOutput(_request.id, _command, str(_buffer, encoding, errors='ignore'))
+                for _request, _command, _buffer in zip(_requests, commands, _buffers)
+            ],
+            _first_byte - _start,
+            _end - _start,
+        )
 
 
 def make_command_frag() -> Packet:
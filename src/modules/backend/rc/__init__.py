@@ -0,0 +1 @@
+from src.modules.backend.rc.proc_reporter import is_hl2_running, get_hl2_pid, HL2Tracker, TRACKER
@@ -0,0 +1,138 @@
+"""
+breaker.py
+A circuit breaker for the remote console, so a closed game (or one where `net_start` hasn't been run) costs one failed
+connect per backoff period rather than one per scheduled update.
+
+CLOSED     - calls go through. `failure_threshold` connection failures in a row open the breaker.
+OPEN       - the game is unavailable, calls are rejected without touching the network until the backoff expires.
+HALF_OPEN  - the backoff expired, and one probe call is let through. Success closes the breaker, failure reopens it
+             with the backoff doubled (up to `max_backoff`).
+
+Consumers can check `available` at any time for free.
+"""
+from enum import Enum
+from threading import Lock
+from typing import Callable
+
+import loguru
+import time
+
+
+class GameUnavailable(Exception):
+    """ Raised instead of attempting a remote console call while the breaker is open. """
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    :param failure_threshold: consecutive failures that open the breaker
+    :param base_backoff: seconds the breaker first stays open for
+    :param max_backoff: the longest it stays open for
+    """
+    failure_threshold: int = None
+    base_backoff: float = None
+    max_backoff: float = None
+
+    state: BreakerState = None
+    failures: int = None
+    backoff: float = None
+    retry_at: float = None
+
+    def __init__(self, failure_threshold: int = 2, base_backoff: float = 1.0, max_backoff: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.backoff = base_backoff
+        self.retry_at = 0.0
+        self._probing = False
+        self._lock = Lock()
+        self._subscribers: list[Callable[[BreakerState], None]] = []
+
+    @property
+    def available(self) -> bool:
+        """ False while the game is considered unavailable (open or waiting on a probe). No network access. """
+        return self.state == BreakerState.CLOSED
+
+    def subscribe(self, callback: Callable[[BreakerState], None]) -> None:
+        """ Call `callback(new_state)` on every state change. """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _set_state(self, state: BreakerState) -> Callable[[], None]:
+        """ Change state (lock held), returning a function that publishes the change once the lock is released. """
+        if state == self.state:
+            return lambda: None
+        self.state = state
+        _subscribers = list(self._subscribers)
+
+        def _publish() -> None:
+            for _callback in _subscribers:
+                try:
+                    _callback(state)
+                except Exception as e:
+                    loguru.logger.exception(f"RCON breaker subscriber failed: {e}")
+        return _publish
+
+    def allow(self) -> bool:
+        """ Whether a call may go ahead now. If this lets a half-open probe through, its outcome must be recorded. """
+        _publish = lambda: None
+        with self._lock:
+            if self.state == BreakerState.CLOSED:
+                return True
+            if self.state == BreakerState.OPEN and time.monotonic() >= self.retry_at:
+                _publish = self._set_state(BreakerState.HALF_OPEN)
+            if self.state == BreakerState.HALF_OPEN and not self._probing:
+                self._probing = True
+                _allowed = True
+            else:
+                _allowed = False
+        _publish()
+        return _allowed
+
+    def record_success(self) -> None:
+        with self._lock:
+            _was = self.state
+            self.failures = 0
+            self.backoff = self.base_backoff
+            self._probing = False
+            _publish = self._set_state(BreakerState.CLOSED)
+        if _was != BreakerState.CLOSED:
+            loguru.logger.info(f"Remote console reachable again.")
+        _publish()
+
+    def record_failure(self, error: BaseException | None = None) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == BreakerState.HALF_OPEN:
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+            elif self.state == BreakerState.CLOSED and self.failures < self.failure_threshold:
+                return
+            self._probing = False
+            self.retry_at = time.monotonic() + self.backoff
+            _opened = self.state == BreakerState.CLOSED
+            _publish = self._set_state(BreakerState.OPEN)
+            _backoff = self.backoff
+
+        if _opened:
+            loguru.logger.warning(
+                f"Remote console unavailable ({type(error).__name__ if error else 'failed'}), is TF2 running with "
+                f"`net_start`? Retrying in {_backoff:g}s, backing off up to {self.max_backoff:g}s."
+            )
+        else:
+            loguru.logger.debug(f"Remote console still unavailable, retrying in {_backoff:g}s.")
+        _publish()
+
+    def probe_now(self) -> None:
+        """ Let the next call through as a probe straight away, e.g. when the game process has just been seen. """
+        with self._lock:
+            if self.state == BreakerState.OPEN:
+                self.retry_at = 0.0
+                self.backoff = self.base_backoff
@@ -0,0 +1,192 @@
+"""
+metrics.py
+Per-command instrumentation for the remote console clients. FragClient, AsyncFragClient and RCONListener record into the
+module level METRICS instance:
+
+    connect_ms  - socket connect time (recorded under CONNECTION)
+    auth_ms     - login time (recorded under CONNECTION)
+    ttfb_ms     - time from sending a command to reading the first packet of its response
+    total_ms    - time from sending a command to reading its delimiting packet
+    call_ms     - wall time of RCONListener.run, including waiting for and (re)connecting pooled connections
+    bytes       - response payload size
+    fragments   - response packet count
+
+and counts `calls`, `errors`, `reconnects` and `invalid_packets`. Query it in process with METRICS.get / METRICS.snapshot
+/ METRICS.summary, or call METRICS.dump_on_exit(path) to have everything written as JSON when the process exits.
+"""
+from bisect import bisect_left
+from pathlib import Path
+from threading import Lock
+
+import atexit
+import json
+import loguru
+
+# the pseudo command that connection level metrics (connect/auth) are recorded under
+CONNECTION: str = "<connection>"
+
+LATENCY_BUCKETS_MS: tuple[float, ...] = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SIZE_BUCKETS: tuple[float, ...] = tuple(float(4 ** _n) for _n in range(3, 11))  # 64 B .. 1 MiB
+COUNT_BUCKETS: tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def buckets_for(metric: str) -> tuple[float, ...]:
+    if metric.endswith("_ms"):
+        return LATENCY_BUCKETS_MS
+    if metric == "bytes":
+        return SIZE_BUCKETS
+    return COUNT_BUCKETS
+
+
+class Histogram:
+    """
+    A fixed bucket histogram. Each bucket counts the samples <= its upper bound (and greater than the previous
+    bound), with one extra bucket for samples above the last bound. Exact count/sum/min/max are kept alongside.
+    """
+    bounds: tuple[float, ...] = None
+    counts: list[int] = None
+    count: int = None
+    total: float = None
+    min: float | None = None
+    max: float | None = None
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> float | None:
+        """ The upper bound of the bucket holding the q-th quantile (capped at the largest sample seen). """
+        if not self.count:
+            return None
+        _rank = q * self.count
+        _seen = 0
+        for _idx, _count in enumerate(self.counts):
+            _seen += _count
+            if _seen >= _rank and _count:
+                return min(self.bounds[_idx], self.max) if _idx < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                **{str(_bound): _count for _bound, _count in zip(self.bounds, self.counts)},
+                "+inf": self.counts[-1],
+            },
+        }
+
+
+class RCONMetrics:
+    """ Thread safe store of per-command histograms and counters. """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._histograms: dict[str, dict[str, Histogram]] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+        self._dump_path: Path | None = None
+
+    def observe(self, command: str, metric: str, value: float) -> None:
+        with self._lock:
+            _metrics = self._histograms.setdefault(command, {})
+            _hist = _metrics.get(metric)
+            if _hist is None:
+                _hist = _metrics[metric] = Histogram(buckets_for(metric))
+            _hist.observe(value)
+
+    def increment(self, command: str, counter: str, n: int = 1) -> None:
+        with self._lock:
+            _counters = self._counters.setdefault(command, {})
+            _counters[counter] = _counters.get(counter, 0) + n
+
+    def get(self, command: str, metric: str) -> dict | None:
+        """ A snapshot of one histogram (see Histogram.as_dict), or None if nothing has been recorded for it. """
+        with self._lock:
+            _hist = self._histograms.get(command, {}).get(metric)
+            return None if _hist is None else _hist.as_dict()
+
+    def get_count(self, command: str, counter: str) -> int:
+        with self._lock:
+            return self._counters.get(command, {}).get(counter, 0)
+
+    def commands(self) -> list[str]:
+        with self._lock:
+            return sorted(set(self._histograms) | set(self._counters))
+
+    def snapshot(self) -> dict[str, dict]:
+        """ Everything recorded so far, as {command: {"histograms": {metric: ...}, "counters": {counter: n}}}. """
+        with self._lock:
+            return {
+                _command: {
+                    "histograms": {
+                        _metric: _hist.as_dict() for _metric, _hist in self._histograms.get(_command, {}).items()
+                    },
+                    "counters": dict(self._counters.get(_command, {})),
+                }
+                for _command in sorted(set(self._histograms) | set(self._counters))
+            }
+
+    def summary(self) -> str:
+        """ A human readable table of count/mean/p50/p90/max per command and metric, plus the counters. """
+        _lines = [f"{'command':<20} {'metric':<10} {'count':>7} {'mean':>10} {'p50':>10} {'p90':>10} {'max':>10}"]
+        for _command, _data in self.snapshot().items():
+            for _metric, _hist in _data["histograms"].items():
+                _lines.append(
+                    f"{_command:<20} {_metric:<10} {_hist['count']:>7} {_hist['mean']:>10.2f} {_hist['p50']:>10.2f} "
+                    f"{_hist['p90']:>10.2f} {_hist['max']:>10.2f}"
+                )
+            for _counter, _n in _data["counters"].items():
+                _lines.append(f"{_command:<20} {_counter:<10} {_n:>7}")
+        return "\n".join(_lines)
+
+    def dump(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as h:
+            json.dump(self.snapshot(), h, indent=2)
+
+    def dump_on_exit(self, path: Path) -> None:
+        """ Write the snapshot to `path` as JSON when the interpreter exits. Calling again just changes the path. """
+        if self._dump_path is None:
+            atexit.register(self._dump_at_exit)
+        self._dump_path = path
+
+    def _dump_at_exit(self) -> None:
+        try:
+            self.dump(self._dump_path)
+            loguru.logger.info(f"Wrote RCON metrics to {self._dump_path}")
+        except OSError as e:
+            loguru.logger.warning(f"Failed to write RCON metrics to {self._dump_path}: {e}")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+METRICS: RCONMetrics = RCONMetrics()
+
+
+def command_name(payload: bytes) -> str:
+    """ The command a command packet payload runs, e.g. b"echo hello" -> "echo". """
+    return payload.split(b' ', 1)[0].decode('utf-8', errors='replace')
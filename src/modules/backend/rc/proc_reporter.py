@@ -1,15 +1,131 @@
+"""
+proc_reporter.py
+Tracks whether the game (any hl2 process) is running.
+
+Scanning the process table is expensive, so it is only done to find the game. Once found, its psutil.Process is kept and
+checked with Process.is_running(), which only looks at that one PID and compares its creation time, so a recycled PID
+isn't mistaken for the game. When the game goes away, the rescanning moves to a background thread, and every change
+(found/lost) is published to the subscribed callbacks. Asking is_hl2_running() every GUI frame is therefore cheap.
+"""
+from threading import Thread, Lock, Event
+from typing import Callable
+
+import loguru
 import psutil
 
 hl2_pid: int = 0
 
 
-def is_hl2_running() -> bool:
-    global hl2_pid
-    for proc in psutil.process_iter():
-        if "hl2" in proc.name():
-            hl2_pid = proc.pid
+class HL2Tracker:
+    """
+    :param rescan_interval: seconds between process table scans while the game isn't running
+    """
+    rescan_interval: float = None
+    process: psutil.Process | None = None
+
+    def __init__(self, rescan_interval: float = 2.0) -> None:
+        self.rescan_interval = rescan_interval
+        self.process = None
+        self._lock = Lock()
+        self._scanned = False
+        self._subscribers: list[Callable[[bool, int], None]] = []
+        self._rescanner: Thread | None = None
+        self._stop = Event()
+
+    @staticmethod
+    def _scan() -> psutil.Process | None:
+        for proc in psutil.process_iter(["name"]):
+            if "hl2" in (proc.info["name"] or ""):
+                return proc
+        return None
+
+    def subscribe(self, callback: Callable[[bool, int], None]) -> None:
+        """ Call `callback(running, pid)` whenever the game is found or lost (from whichever thread noticed). """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[bool, int], None]) -> None:
+        with self._lock:
+            self._subscribers.remove(callback)
+
+    def _publish(self, running: bool, pid: int) -> None:
+        with self._lock:
+            _subscribers = list(self._subscribers)
+        for _callback in _subscribers:
+            try:
+                _callback(running, pid)
+            except Exception as e:
+                loguru.logger.exception(f"hl2 liveness subscriber failed: {e}")
+
+    def _found(self, process: psutil.Process) -> None:
+        global hl2_pid
+        with self._lock:
+            if self.process is not None:
+                return
+            self.process = process
+            hl2_pid = process.pid
+        loguru.logger.info(f"Found hl2 process (pid {process.pid}).")
+        self._publish(True, process.pid)
+
+    def _lost(self, process: psutil.Process) -> None:
+        with self._lock:
+            if self.process is not process:
+                # someone else already noticed
+                return
+            self.process = None
+        loguru.logger.info(f"hl2 process (pid {process.pid}) is gone.")
+        self._publish(False, process.pid)
+        self._start_rescanning()
+
+    def _start_rescanning(self) -> None:
+        with self._lock:
+            if self._rescanner is not None and self._rescanner.is_alive():
+                return
+            self._rescanner = Thread(target=self._rescan_loop, daemon=True, name="HL2Tracker-rescan")
+            self._rescanner.start()
+
+    def _rescan_loop(self) -> None:
+        while not self._stop.is_set():
+            _process = self._scan()
+            if _process is not None:
+                self._found(_process)
+                return
+            self._stop.wait(self.rescan_interval)
+
+    def is_running(self) -> bool:
+        """
+        The first call scans the process table, so the answer is right straight away. After that only the known
+        PID is checked, or, while the game isn't running, the background rescans' result is returned.
+        """
+        if not self._scanned:
+            with self._lock:
+                _first = not self._scanned
+                self._scanned = True
+            if _first:
+                _process = self._scan()
+                if _process is not None:
+                    self._found(_process)
+                else:
+                    self._start_rescanning()
+
+        _process = self.process
+        if _process is None:
+            return False
+        if _process.is_running():
             return True
-    return False
+        self._lost(_process)
+        return False
+
+    def stop(self) -> None:
+        """ Stop rescanning in the background. """
+        self._stop.set()
+
+
+TRACKER: HL2Tracker = HL2Tracker()
+
+
+def is_hl2_running() -> bool:
+    return TRACKER.is_running()
 
 
 def get_hl2_pid() -> int:
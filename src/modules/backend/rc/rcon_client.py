@@ -1,13 +1,215 @@
-from rcon.source import Client
-from src.modules.backend.rc import is_hl2_running
+from rcon.exceptions import SessionTimeout, EmptyResponse, WrongPassword
+from src.modules.backend.rc import is_hl2_running, TRACKER
+from src.modules.backend.rc.breaker import CircuitBreaker, GameUnavailable
+from src.modules.backend.rc.FragClient import FragClient, BatchResult
+from src.modules.backend.rc.AsyncFragClient import PipelineSession
+from src.modules.backend.rc.metrics import METRICS, CONNECTION
+from src.modules.backend.rc.response_cache import ResponseCache
+from contextlib import contextmanager
+from threading import Lock, BoundedSemaphore
+from typing import Callable, Iterator, TypeVar
 
 import loguru
+import time
+
+T = TypeVar("T")
+
+# Errors that mean the connection itself is unusable (game closed/restarted, socket timed out, etc.)
+CONNECTION_ERRORS: tuple[type[Exception], ...] = (OSError, SessionTimeout, EmptyResponse)
+
+
+class RCONPool:
+    """
+    A bounded pool of long-lived, authenticated FragClient connections to the games remote console.
+
+    Rather than connecting and authenticating for every command, connections are handed back to the pool and reused.
+    A connection that has sat idle for longer than `max_idle` seconds is health checked before reuse, and when a
+    command fails because its connection died (e.g. TF2 was restarted) the connection is dropped along with every idle
+    one, and the command is retried once on a fresh, re-authenticated one. At most `max_size` callers hold a connection
+    at once, the rest block until one is returned.
+
+    Every call goes through a CircuitBreaker. While it is open (the game is unavailable) calls raise GameUnavailable
+    without touching the network.
+    """
+    rcon_ip: str = None
+    rcon_port: int = None
+    rcon_pword: str = None
+    max_size: int = None
+    max_idle: float = None
+    timeout: float | None = None
+    breaker: CircuitBreaker = None
+
+    def __init__(
+            self,
+            pword: str,
+            ip: str = "127.0.0.1",
+            port: int = 27015,
+            max_size: int = 2,
+            max_idle: float = 30.0,
+            timeout: float | None = 5.0
+    ) -> None:
+        self.rcon_ip = ip
+        self.rcon_port = port
+        self.rcon_pword = pword
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.breaker = CircuitBreaker()
+
+        self._slots = BoundedSemaphore(max_size)
+        self._lock = Lock()
+        # (connection, time.monotonic() of last use), most recently used last
+        self._idle: list[tuple[FragClient, float]] = []
+
+    def _connect(self) -> FragClient:
+        _client = FragClient(self.rcon_ip, self.rcon_port, passwd=self.rcon_pword, timeout=self.timeout)
+        try:
+            _client.connect(login=True)
+        except BaseException:
+            _client.close()
+            raise
+        return _client
+
+    @staticmethod
+    def _discard(client: FragClient) -> None:
+        try:
+            client.close()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _healthy(client: FragClient) -> bool:
+        try:
+            client.frag_run("echo")
+            return True
+        except CONNECTION_ERRORS:
+            return False
+
+    def _checkout(self) -> FragClient:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                _client, _last_used = self._idle.pop()
+
+            if time.monotonic() - _last_used < self.max_idle or self._healthy(_client):
+                return _client
+            self._discard(_client)
+
+        return self._connect()
+
+    def _checkin(self, client: FragClient) -> None:
+        with self._lock:
+            self._idle.append((client, time.monotonic()))
+
+    @contextmanager
+    def connection(self) -> Iterator[FragClient]:
+        """
+        Borrow a connection for the duration of the with block. If the block raises, the connection is closed rather
+        than returned, since we can't know what is left unread on it.
+        """
+        with self._slots:
+            _client = self._checkout()
+            try:
+                yield _client
+            except BaseException:
+                self._discard(_client)
+                raise
+            self._checkin(_client)
+
+    def call(self, fn: Callable[[FragClient], T], retry: bool | Callable[[], bool] = True) -> T:
+        """
+        Run `fn` with a pooled connection. If the connection turns out to be dead, retry once on a new one (if `retry`,
+        or if calling it returns True).
+
+        :raises GameUnavailable: if the breaker is open
+        """
+        return self.guard(lambda: self._call(fn, retry))
+
+    def guard(self, fn: Callable[[], T]) -> T:
+        """
+        Run `fn` (which talks to the remote console some other way than through the pool, e.g. a PipelineSession)
+        through the breaker: connection failures count against the game, anything else means it answered.
+
+        :raises GameUnavailable: if the breaker is open
+        """
+        if not self.breaker.allow():
+            METRICS.increment(CONNECTION, "rejected")
+            raise GameUnavailable()
+
+        try:
+            _result = fn()
+        except (*CONNECTION_ERRORS, EOFError, WrongPassword) as e:
+            self.breaker.record_failure(e)
+            raise
+        except BaseException:
+            # the game answered, whatever went wrong after that isn't the connections fault
+            self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return _result
+
+    def _call(self, fn: Callable[[FragClient], T], retry: bool | Callable[[], bool]) -> T:
+        _connected = False
+        try:
+            with self.connection() as _client:
+                _connected = True
+                return fn(_client)
+        except CONNECTION_ERRORS:
+            # no point retrying if we couldn't even connect
+            if not _connected:
+                raise
+            # whatever killed this connection (e.g. TF2 restarting) most likely killed the idle ones too
+            self.close()
+            if not (retry() if callable(retry) else retry):
+                raise
+            loguru.logger.info("RCON connection lost, reconnecting...")
+            METRICS.increment(CONNECTION, "reconnects")
+
+        with self.connection() as _client:
+            return fn(_client)
+
+    def run(self, command: str, *args: str) -> str:
+        """ Run a command over a pooled connection and return its (defragmented) output. """
+        return self.call(lambda _client: _client.frag_run(command, *args))
+
+    def run_batch(self, commands: list[str]) -> BatchResult:
+        """ Run several command lines back to back on one pooled connection, see FragClient.frag_batch. """
+        return self.call(lambda _client: _client.frag_batch(commands))
+
+    def frag_stream(self, command: str, *args: str, on_fragment: Callable[[bytes], None]) -> None:
+        """
+        Run a command over a pooled connection, handing each response fragment to on_fragment as it arrives. Only
+        retried on a new connection if the failure happened before any fragment was handed over.
+        """
+        _handed_over = [0]
+
+        def _counted(fragment: bytes) -> None:
+            _handed_over[0] += 1
+            on_fragment(fragment)
+
+        self.call(
+            lambda _client: _client.frag_stream(command, *args, on_fragment=_counted),
+            retry=lambda: not _handed_over[0]
+        )
+
+    def close(self) -> None:
+        """ Close every idle connection. Connections currently borrowed are closed when they are returned. """
+        with self._lock:
+            _idle, self._idle = self._idle, []
+        for _client, _ in _idle:
+            self._discard(_client)
 
 
 class RCONListener:
     rcon_ip: str = None
     rcon_port: int = None
     rcon_pword: str = None
+    pool: RCONPool = None
+    # one multiplexed connection for pipelining several commands at once (see RCONHelper.get_refresh_data)
+    session: PipelineSession = None
+    # shared by everything using this listener, so consumers polling the same command share round trips
+    cache: ResponseCache = None
 
     def __init__(
             self,
@@ -18,31 +220,93 @@ class RCONListener:
         self.rcon_ip = ip
         self.rcon_port = port
         self.rcon_pword = pword
+        self.pool = RCONPool(pword, ip, port)
+        self.session = PipelineSession(ip, port, pword, timeout=self.pool.timeout)
+        self.cache = ResponseCache()
+        # don't sit out the rest of a backoff once the game is seen starting
+        self._on_hl2 = lambda running, pid: running and self.pool.breaker.probe_now()
+        TRACKER.subscribe(self._on_hl2)
+
+    @property
+    def game_available(self) -> bool:
+        """ False while the remote console is known to be unreachable. Doesn't touch the network. """
+        return self.pool.breaker.available
 
-    def spawn_client(self) -> None:
-        if is_hl2_running():
-            with Client(self.rcon_ip, self.rcon_port, passwd=self.rcon_pword) as h:
-                loguru.logger.info(f"RCON: " + h.run("echo", "hello tf2e!").strip())
+    def spawn_client(self, require_hl2: bool = True) -> None:
+        """
+        Check the remote console is reachable by echoing through it.
+
+        :param require_hl2: fail early if no hl2 process is running. Pass False when talking to something other than a
+        local game, e.g. the StandInRCONServer.
+        """
+        if not require_hl2 or is_hl2_running():
+            loguru.logger.info(f"RCON: " + self.pool.run("echo", "hello tf2e!").strip())
         else:
             loguru.logger.error(f"TF2 (or any hl2.exe process) is not running currently, cannot spawn an rcon client.")
             # loguru error should raise an exception already, but this line is here to satisfy linting.
             raise Exception(f"TF2 (or any hl2.exe process) is not running currently, cannot spawn an rcon client.")
 
     def run(self, command: str, *args) -> str:
+        _start = time.perf_counter()
+        METRICS.increment(command, "calls")
         try:
-            with Client(self.rcon_ip, self.rcon_port, passwd=self.rcon_pword) as h:
-                _response = h.run(command, *args)
+            _response = self.pool.run(command, *args)
 
+        except GameUnavailable:
+            return ""
         except ConnectionRefusedError:
-            loguru.logger.error(f"Unable to connect to the remote console - have you run `net_start` in TF2?")
-            return ""  # loguru errors will interrupt control flow (raise an exception), this is unreachable.
+            # the breaker warns (once) that the game is unavailable
+            METRICS.increment(command, "errors")
+            loguru.logger.debug(f"Unable to connect to the remote console - have you run `net_start` in TF2?")
+            return ""
+        except Exception:
+            METRICS.increment(command, "errors")
+            raise
+        finally:
+            METRICS.observe(command, "call_ms", (time.perf_counter() - _start) * 1000)
         return _response
 
+    def run_batch(self, commands: list[str]) -> BatchResult | None:
+        """
+        Run several command lines (e.g. ["status", "tf_lobby_debug"]) back to back on one connection, rather than one
+        run() each. Returns each commands output by request id and the batch timing, or None if the game can't be
+        reached.
+        """
+        _start = time.perf_counter()
+        METRICS.increment("<batch>", "calls")
+        try:
+            return self.pool.run_batch(commands)
+        except GameUnavailable:
+            return None
+        except ConnectionRefusedError:
+            METRICS.increment("<batch>", "errors")
+            loguru.logger.debug(f"Unable to connect to the remote console - have you run `net_start` in TF2?")
+            return None
+        except Exception:
+            METRICS.increment("<batch>", "errors")
+            raise
+        finally:
+            METRICS.observe("<batch>", "call_ms", (time.perf_counter() - _start) * 1000)
+
+    def run_cached(self, command: str, *args, max_age: float | None = None) -> str:
+        """
+        Like run, but answered from the response cache if the same command line ran less than `max_age` seconds ago
+        (the caches default TTL if None), or shared with an identical call that is still waiting on the game.
+        Only for commands without side effects.
+        """
+        return self.cache.get(" ".join((command, *args)), lambda: self.run(command, *args), max_age)
+
+    def close(self) -> None:
+        """ Stop following the game process, and close the pooled and pipelining connections. """
+        TRACKER.unsubscribe(self._on_hl2)
+        self.pool.close()
+        self.session.close()
+
 
 class RCONHelper:
     @classmethod
     def get_lobby_data(cls, rcon_listener: RCONListener) -> str:
-        _lobby = rcon_listener.run("tf_lobby_debug")
+        _lobby = rcon_listener.run_cached("tf_lobby_debug")
         return _lobby
 
     @classmethod
@@ -52,3 +316,30 @@ class RCONHelper:
     @classmethod
     def invoke_status(cls, rcon_listener: RCONListener) -> None:
         rcon_listener.run("status")
+
+    @classmethod
+    def echo_framed(cls, rcon_listener: RCONListener, command: str, marker: str) -> BatchResult | None:
+        """
+        Run `command` between two echoed markers in one batch, so its output can be framed in console.log by
+        "<marker> begin" and "<marker> end".
+        """
+        return rcon_listener.run_batch([f"echo {marker} begin", command, f"echo {marker} end"])
+
+    @classmethod
+    def get_refresh_data(cls, rcon_listener: RCONListener) -> dict[str, str]:
+        """
+        Pipeline `status`, `g15_dumpplayer` and `tf_lobby_debug` on the listeners shared session, so a full lobby
+        refresh costs about one round trip. The `g15_dumpplayer` and `tf_lobby_debug` outputs are also stored in the
+        listeners response cache, for anything polling them meanwhile.
+
+        :return: each commands output keyed by command, or an empty dict if the game can't be reached
+        """
+        _commands = ("status", "g15_dumpplayer", "tf_lobby_debug")
+        try:
+            _outputs = rcon_listener.pool.guard(lambda: rcon_listener.session.run_many(*_commands))
+        except (GameUnavailable, *CONNECTION_ERRORS, EOFError, WrongPassword):
+            return {}
+        _refresh = dict(zip(_commands, _outputs))
+        for _command in ("g15_dumpplayer", "tf_lobby_debug"):
+            rcon_listener.cache.put(_command, _refresh[_command])
+        return _refresh
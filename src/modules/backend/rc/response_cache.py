@@ -0,0 +1,123 @@
+"""
+response_cache.py
+A short-TTL, single-flight cache for remote console work. Every consumer (the lobby updates, the GUI loops, helpers)
+asking for the same thing within the TTL shares one answer, and consumers asking while it is still being fetched wait
+for that one request instead of starting their own round trip.
+"""
+from threading import Lock, Event
+from typing import Any, Callable, Hashable, TypeVar
+
+import time
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """ One running load, that callers arriving meanwhile wait on. """
+    done: Event = None
+    value: Any = None
+    error: BaseException | None = None
+
+    def __init__(self) -> None:
+        self.done = Event()
+
+
+class _Entry:
+    """ One cached key, its last value and its counters. """
+    value: Any = None
+    stored_at: float | None = None
+    in_flight: _Flight | None = None
+    hits: int = None
+    shared: int = None
+    misses: int = None
+    errors: int = None
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.errors = 0
+
+
+class ResponseCache:
+    """
+    Single-flight cache keyed by anything hashable, e.g. the command string.
+
+    get() returns the stored value if it is younger than `ttl` (a hit), waits for and shares the result of a load
+    already running for the key (a shared hit), or otherwise runs the loader itself (a miss). A loader that raises
+    isn't cached, the error is raised to the caller and to every caller that was waiting on it.
+    """
+    default_ttl: float = None
+
+    def __init__(self, default_ttl: float = 1.0) -> None:
+        self.default_ttl = default_ttl
+        self._lock = Lock()
+        self._entries: dict[Hashable, _Entry] = {}
+
+    def get(self, key: Hashable, loader: Callable[[], T], ttl: float | None = None) -> T:
+        _ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            _entry = self._entries.get(key)
+            if _entry is None:
+                _entry = self._entries[key] = _Entry()
+
+            if _entry.stored_at is not None and time.monotonic() - _entry.stored_at < _ttl:
+                _entry.hits += 1
+                return _entry.value
+
+            _flight = _entry.in_flight
+            if _flight is not None:
+                _entry.shared += 1
+                _loading = False
+            else:
+                _entry.misses += 1
+                _flight = _entry.in_flight = _Flight()
+                _loading = True
+
+        if not _loading:
+            _flight.done.wait()
+            if _flight.error is not None:
+                raise _flight.error
+            return _flight.value
+
+        try:
+            _flight.value = loader()
+        except BaseException as e:
+            _flight.error = e
+            with self._lock:
+                _entry.errors += 1
+                _entry.in_flight = None
+            _flight.done.set()
+            raise
+
+        with self._lock:
+            _entry.value = _flight.value
+            _entry.stored_at = time.monotonic()
+            _entry.in_flight = None
+        _flight.done.set()
+        return _flight.value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """ Store a value fetched some other way (e.g. pipelined along with other commands), as if just loaded. """
+        with self._lock:
+            _entry = self._entries.get(key)
+            if _entry is None:
+                _entry = self._entries[key] = _Entry()
+            _entry.value = value
+            _entry.stored_at = time.monotonic()
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """ Drop the stored value for `key` (every key if None), keeping the counters. """
+        with self._lock:
+            for _key, _entry in self._entries.items():
+                if key is None or _key == key:
+                    _entry.stored_at = None
+                    _entry.value = None
+
+    def stats(self) -> dict[Hashable, dict[str, int]]:
+        """ Per key hit (fresh value), shared (joined an in-flight load), miss and error counts. """
+        with self._lock:
+            return {
+                _key: {"hits": _entry.hits, "shared": _entry.shared, "misses": _entry.misses, "errors": _entry.errors}
+                for _key, _entry in self._entries.items()
+            }
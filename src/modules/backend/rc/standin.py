@@ -0,0 +1,279 @@
+"""
+standin.py
+A local stand-in for TF2's remote console, so the RCON clients and the lobby update path can be tested and benchmarked
+without the game running.
+
+It speaks the Source RCON protocol the way the game does, as far as FragClient and AsyncFragClient rely on it:
+  - a login is answered by an empty SERVERDATA_RESPONSE_VALUE followed by the SERVERDATA_AUTH_RESPONSE (id -1 on a
+    wrong password),
+  - command output is split into SERVERDATA_RESPONSE_VALUE packets of at most `fragment_size` bytes (always at least
+    one packet, even for empty output),
+  - an (empty) SERVERDATA_RESPONSE_VALUE packet is mirrored back, followed by a packet with the same id carrying
+    0x00000001 00000000.
+
+Responses are served from a dict of command -> output, where an output is a str/bytes or a callable taking the
+arguments string. By default `status` and `g15_dumpplayer` are replayed from the recordings in data/logs/, and
+`tf_lobby_debug` is generated from the recorded status.
+
+Run from the repository root:
+    python -m src.modules.backend.rc.standin [--port 27015] [--latency 0.02] [--fragment-size 4096] [--bench 100]
+"""
+from src.modules.backend.rc.metrics import METRICS
+from rcon.source.proto import Type
+from socketserver import ThreadingTCPServer, StreamRequestHandler
+from threading import Thread
+from queue import Queue
+from pathlib import Path
+from typing import Callable
+
+import argparse
+import loguru
+import struct
+import time
+import re
+
+DATA_PATH: Path = Path(__file__).parents[4].joinpath("data")
+RECORDED_STATUS: Path = DATA_PATH.joinpath("logs/status_example.log")
+RECORDED_G15: Path = DATA_PATH.joinpath("logs/g15_dumpplayer.log")
+
+# the largest payload TF2 puts in one response packet
+DEFAULT_FRAGMENT_SIZE: int = 4096
+_TRAILER: bytes = b'\x00\x00\x00\x01\x00\x00\x00\x00'
+
+Response = str | bytes | Callable[[str], str | bytes]
+
+
+def _packet(request_id: int, packet_type: int, payload: bytes) -> bytes:
+    _body = struct.pack("<ii", request_id, packet_type) + payload + b'\x00\x00'
+    return struct.pack("<i", len(_body)) + _body
+
+
+def load_recorded_responses() -> dict[str, Response]:
+    """ The default responses, `status` and `g15_dumpplayer` replayed from data/logs/, plus `tf_lobby_debug`. """
+    with open(RECORDED_STATUS, 'r', encoding='utf-8') as h:
+        _status = h.read().replace("\r\n", "\n")
+    if _status.startswith("] "):
+        # the recording is of the console, which echoes the command first
+        _status = _status.split("\n", 1)[1]
+
+    with open(RECORDED_G15, 'rb') as h:
+        _g15 = h.read()
+
+    return {
+        "status": _status,
+        "g15_dumpplayer": _g15,
+        "tf_lobby_debug": make_lobby_debug(_status),
+        "echo": lambda args: args + "\n",
+    }
+
+
+def make_lobby_debug(status: str) -> str:
+    """ Generate `tf_lobby_debug` output listing the players of a `status` output, alternating between the teams. """
+    _sid3s = re.findall(r"\[U:\d:\d+]", status)
+    _lines = [f"CTFLobbyShared: ID:00021c6a0e6d2c9e  {len(_sid3s)} member(s), 0 pending"]
+    for _idx, _sid3 in enumerate(_sid3s):
+        _team = "TF_GC_TEAM_DEFENDERS" if _idx % 2 == 0 else "TF_GC_TEAM_INVADERS"
+        _lines.append(f"  Member[{_idx}] {_sid3}  team = {_team}  type = MATCH_PLAYER")
+    return "\n".join(_lines) + "\n"
+
+
+class _RCONHandler(StreamRequestHandler):
+    server: "StandInRCONServer"
+    disable_nagle_algorithm = True
+
+    def _read_packet(self) -> tuple[int, int, bytes] | None:
+        _head = self.rfile.read(4)
+        if len(_head) < 4:
+            return None
+        _size = struct.unpack("<i", _head)[0]
+        _body = self.rfile.read(_size)
+        if len(_body) < _size or _size < 10:
+            return None
+        _id, _type = struct.unpack("<ii", _body[:8])
+        return _id, _type, _body[8:-2]
+
+    def _read_packets(self, queue: Queue) -> None:
+        """ Read packets as they arrive, stamped with their arrival time, so pipelined commands share latency. """
+        while (_packet_in := self._read_packet()) is not None:
+            queue.put((time.perf_counter(), _packet_in))
+        queue.put(None)
+
+    def handle(self) -> None:
+        _queue: Queue = Queue()
+        Thread(target=self._read_packets, args=(_queue,), daemon=True, name="StandInRCONServer-reader").start()
+
+        _authed = False
+        while (_item := _queue.get()) is not None:
+            _received, (_id, _type, _payload) = _item
+
+            if _type == Type.SERVERDATA_AUTH:
+                _authed = _payload.decode('utf-8', errors='ignore') == self.server.password
+                self.wfile.write(
+                    _packet(_id, Type.SERVERDATA_RESPONSE_VALUE, b'')
+                    + _packet(_id if _authed else -1, Type.SERVERDATA_AUTH_RESPONSE, b'')
+                )
+            elif not _authed:
+                # the game drops unauthenticated connections
+                return
+            elif _type == Type.SERVERDATA_EXECCOMMAND:
+                self._respond(_id, _payload.decode('utf-8', errors='ignore'), _received)
+            elif _type == Type.SERVERDATA_RESPONSE_VALUE:
+                self.wfile.write(
+                    _packet(_id, Type.SERVERDATA_RESPONSE_VALUE, b'')
+                    + _packet(_id, Type.SERVERDATA_RESPONSE_VALUE, _TRAILER)
+                )
+
+    def _respond(self, request_id: int, command_line: str, received: float) -> None:
+        _command, _, _args = command_line.partition(" ")
+        _output = self.server.get_output(_command, _args)
+
+        _wait = received + self.server.latency - time.perf_counter()
+        if _wait > 0:
+            time.sleep(_wait)
+        _size = self.server.fragment_size
+        for _offset in range(0, max(len(_output), 1), _size):
+            self.wfile.write(_packet(request_id, Type.SERVERDATA_RESPONSE_VALUE, _output[_offset:_offset + _size]))
+            if self.server.fragment_latency:
+                time.sleep(self.server.fragment_latency)
+
+
+class StandInRCONServer(ThreadingTCPServer):
+    """
+    A threaded Source RCON server answering from canned responses. Use port 0 to have the OS pick a free port, the
+    chosen one is in `.port` once constructed. Either call start()/stop(), or use it as a context manager.
+
+    :param responses: command -> output (str, bytes, or callable taking the arguments string), defaults to the
+    recorded responses
+    :param latency: seconds from receiving each command to answering it (pipelined commands wait concurrently)
+    :param fragment_latency: seconds to wait after sending each response fragment
+    :param fragment_size: the largest payload put in one response packet
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    password: str = None
+    responses: dict[str, Response] = None
+    latency: float = None
+    fragment_latency: float = None
+    fragment_size: int = None
+
+    def __init__(
+            self,
+            password: str = "tf2e",
+            host: str = "127.0.0.1",
+            port: int = 0,
+            responses: dict[str, Response] | None = None,
+            latency: float = 0.0,
+            fragment_latency: float = 0.0,
+            fragment_size: int = DEFAULT_FRAGMENT_SIZE
+    ) -> None:
+        super().__init__((host, port), _RCONHandler)
+        self.password = password
+        self.responses = load_recorded_responses() if responses is None else responses
+        self.latency = latency
+        self.fragment_latency = fragment_latency
+        self.fragment_size = fragment_size
+        self._thread: Thread | None = None
+
+    @property
+    def host(self) -> str:
+        return self.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def get_output(self, command: str, args: str) -> bytes:
+        _response = self.responses.get(command)
+        if _response is None:
+            _output = f"Unknown command \"{command}\"\n"
+        elif callable(_response):
+            _output = _response(args)
+        else:
+            _output = _response
+        return _output.encode('utf-8') if isinstance(_output, str) else _output
+
+    def start(self) -> None:
+        self._thread = Thread(target=self.serve_forever, daemon=True, name="StandInRCONServer")
+        self._thread.start()
+        loguru.logger.info(f"Stand-in RCON server listening on {self.host}:{self.port}")
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StandInRCONServer":
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+
+def bench(server: StandInRCONServer, cycles: int) -> None:
+    """
+    Run `cycles` lobby refreshes against the server the way the backend does (status, tf_lobby_debug and
+    g15_dumpplayer one after the other over the pooled RCONListener, the dump fed to the delta parser), then the same
+    refreshes pipelined, and print the throughput and the recorded RCON metrics. Neither leg goes through the response
+    cache, so every refresh is three commands over the socket.
+    """
+    # imported here, so just serving doesn't need the parser dependencies
+    from src.modules.backend.rc.rcon_client import RCONListener, RCONHelper
+    from src.modules.backend.g15parser.consumer import G15DeltaParser
+
+    _listener = RCONListener(server.password, server.host, server.port)
+    _delta = G15DeltaParser()
+
+    _start = time.perf_counter()
+    for _ in range(cycles):
+        _listener.run("status")
+        _listener.run("tf_lobby_debug")
+        _delta.update(_listener.run("g15_dumpplayer"))
+    _sequential = time.perf_counter() - _start
+
+    _start = time.perf_counter()
+    for _ in range(cycles):
+        _delta.update(RCONHelper.get_refresh_data(_listener)["g15_dumpplayer"])
+    _pipelined = time.perf_counter() - _start
+    _listener.close()
+
+    print(METRICS.summary())
+    print(f"\n{cycles} refreshes: sequential {_sequential / cycles * 1000:.2f} ms/refresh, "
+          f"pipelined {_pipelined / cycles * 1000:.2f} ms/refresh")
+
+
+def main():
+    _parser = argparse.ArgumentParser(description="Serve recorded TF2 remote console responses.")
+    _parser.add_argument("--host", default="127.0.0.1")
+    _parser.add_argument("--port", type=int, default=27015)
+    _parser.add_argument("--password", default="tf2e")
+    _parser.add_argument("--latency", type=float, default=0.0, help="seconds before answering each command")
+    _parser.add_argument("--fragment-latency", type=float, default=0.0, help="seconds after each fragment")
+    _parser.add_argument("--fragment-size", type=int, default=DEFAULT_FRAGMENT_SIZE)
+    _parser.add_argument("--bench", type=int, metavar="CYCLES", help="run lobby refreshes against it, then exit")
+    _args = _parser.parse_args()
+
+    _server = StandInRCONServer(
+        password=_args.password,
+        host=_args.host,
+        port=_args.port,
+        latency=_args.latency,
+        fragment_latency=_args.fragment_latency,
+        fragment_size=_args.fragment_size,
+    )
+    with _server:
+        if _args.bench:
+            bench(_server, _args.bench)
+            return
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
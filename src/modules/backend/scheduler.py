@@ -0,0 +1,206 @@
+"""
+scheduler.py
+An adaptive scheduler for the lobby update sources (status, g15_dumpplayer, ...).
+
+Each source is an AdaptiveJob, whose poll interval moves between its min and max interval with the observed rate at
+which its runs change something: a source that keeps changing is polled at its min interval, a source that never
+changes drifts out to its max interval. While we aren't in a live match every job falls back to its idle interval, and
+a job is never polled more often than its measured cost allows (cost / cost_budget). Time a job spends blocked inside
+waiting() (e.g. for the console to print a status) doesn't count towards its cost.
+
+Runs of the same job never overlap. Between runs the scheduler thread blocks on a condition until the next job is due,
+or until wake() is called (e.g. on a console "connected" line), so an idle menu costs next to nothing. A job can check
+woken() to tell a run triggered by wake() apart from a routine poll, e.g. to skip cached data.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Thread, Condition, local
+from typing import Callable, Iterator
+
+import loguru
+import time
+
+# per worker thread, the seconds the running job has spent inside waiting(), and whether wake() triggered the run
+_job_state = local()
+
+
+@contextmanager
+def waiting() -> Iterator[None]:
+    """
+    Mark a block where a scheduled job is waiting on something else rather than doing work, so the time isn't counted
+    in the jobs cost. Does nothing outside a scheduled job.
+    """
+    _start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _job_state.waited = getattr(_job_state, "waited", 0.0) + time.perf_counter() - _start
+
+
+def woken() -> bool:
+    """ Whether the scheduled job running on this thread was triggered by wake(). False outside a scheduled job. """
+    return getattr(_job_state, "woken", False)
+
+
+class AdaptiveJob:
+    """
+    :param name: the name the job is woken by
+    :param fn: the update to run, returning whether it changed anything (None counts as no change)
+    :param min_interval: seconds between runs while every run changes something
+    :param max_interval: seconds between runs while nothing changes
+    :param idle_interval: seconds between runs while not in a live match
+    :param cost_budget: the largest fraction of wall time the job may spend running
+    """
+    # weight of the newest run in the change rate and cost averages
+    SMOOTHING: float = 0.3
+
+    name: str = None
+    fn: Callable[[], bool | None] = None
+    min_interval: float = None
+    max_interval: float = None
+    idle_interval: float = None
+    cost_budget: float = None
+
+    interval: float = None
+    change_rate: float = None
+    cost: float | None = None
+    next_run: float = None
+    running: bool = None
+    # wake() was called since the job was last started
+    woken: bool = None
+    runs: int = None
+
+    def __init__(
+            self,
+            name: str,
+            fn: Callable[[], bool | None],
+            min_interval: float,
+            max_interval: float,
+            idle_interval: float | None = None,
+            cost_budget: float = 0.05
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_interval = max_interval if idle_interval is None else idle_interval
+        self.cost_budget = cost_budget
+
+        self.interval = min_interval
+        self.change_rate = 1.0
+        self.cost = None
+        self.next_run = time.monotonic()
+        self.running = False
+        self.woken = False
+        self.runs = 0
+
+    def adapt(self, changed: bool, cost: float, live: bool) -> None:
+        """ Update the change rate and cost averages with a finished run, and pick the next interval from them. """
+        _alpha = self.SMOOTHING
+        self.runs += 1
+        self.change_rate = (1 - _alpha) * self.change_rate + _alpha * (1.0 if changed else 0.0)
+        self.cost = cost if self.cost is None else (1 - _alpha) * self.cost + _alpha * cost
+
+        if live:
+            _interval = self.max_interval - (self.max_interval - self.min_interval) * self.change_rate
+        else:
+            _interval = self.idle_interval
+        self.interval = max(_interval, self.cost / self.cost_budget)
+
+
+class AdaptiveScheduler:
+    """
+    Runs AdaptiveJobs on a small thread pool as they come due.
+
+    :param live: returns whether we're in a live match (jobs use their idle interval when not)
+    :param workers: how many jobs may run at once
+    """
+    live: Callable[[], bool] = None
+    jobs: dict[str, AdaptiveJob] = None
+
+    def __init__(self, live: Callable[[], bool] = lambda: True, workers: int = 2) -> None:
+        self.live = live
+        self.jobs = {}
+        self._cond = Condition()
+        self._running = False
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="AdaptiveScheduler-job")
+        self._thread: Thread | None = None
+
+    def add_job(self, job: AdaptiveJob) -> AdaptiveJob:
+        with self._cond:
+            self.jobs[job.name] = job
+            self._cond.notify()
+        return job
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = Thread(target=self._loop, daemon=True, name="AdaptiveScheduler")
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
+
+    def wake(self, *names: str) -> None:
+        """
+        Make the named jobs (all jobs if none are named) due now. A job that is running at the time runs again as soon
+        as it finishes.
+        """
+        with self._cond:
+            _now = time.monotonic()
+            for _job in self.jobs.values():
+                if names and _job.name not in names:
+                    continue
+                _job.woken = True
+                if not _job.running:
+                    _job.next_run = _now
+            self._cond.notify()
+
+    def _loop(self) -> None:
+        with self._cond:
+            while self._running:
+                _now = time.monotonic()
+                _wait: float | None = None
+                for _job in self.jobs.values():
+                    if _job.running:
+                        continue
+                    if _job.next_run <= _now:
+                        _job.running = True
+                        self._executor.submit(self._run, _job, _job.woken)
+                        _job.woken = False
+                    else:
+                        _due_in = _job.next_run - _now
+                        _wait = _due_in if _wait is None else min(_wait, _due_in)
+                # woken by wake(), add_job(), stop() or a job finishing
+                self._cond.wait(timeout=_wait)
+
+    def _is_live(self) -> bool:
+        try:
+            return bool(self.live())
+        except Exception as e:
+            loguru.logger.warning(f"Scheduler liveness check failed, assuming live: {e}")
+            return True
+
+    def _run(self, job: AdaptiveJob, woken: bool) -> None:
+        _job_state.waited = 0.0
+        _job_state.woken = woken
+        _start = time.perf_counter()
+        try:
+            _changed = bool(job.fn())
+        except Exception as e:
+            loguru.logger.exception(f"Scheduled job '{job.name}' failed: {e}")
+            _changed = False
+        _cost = max(time.perf_counter() - _start - _job_state.waited, 0.0)
+        _live = self._is_live()
+
+        with self._cond:
+            job.adapt(_changed, _cost, _live)
+            # woken again while running, go again straight away
+            job.next_run = time.monotonic() if job.woken else time.monotonic() + job.interval
+            job.running = False
+            self._cond.notify()
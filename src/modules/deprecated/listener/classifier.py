@@ -0,0 +1,232 @@
+"""
+classifier.py
+Classifies console.log lines into typed events in a single pass.
+
+classify() dispatches on how the line starts first (a dict lookup for the fixed width `status` headers, the leading
+'#' of the `status` player list, the handful of fixed prefixes of `tf_lobby_debug`, connection and map messages), and
+only falls back to the free-form shapes (chat, kills, vote calls, connects) when a cheap substring test says the line
+could be one. So at most one or two precompiled regexes are run per line, and lines that are none of the above (most
+of them) are usually turned away by a couple of `in` tests.
+"""
+from typing import Callable, NamedTuple
+
+import re
+
+# `con_timestamp 1` prefixes every line with e.g. "10/18/2026 - 12:13:58: "
+_TIMESTAMP_REGEX: re.Pattern = re.compile(r"^\d\d/\d\d/\d{4} - \d\d:\d\d:\d\d: ")
+
+# fixed width `status` headers, by the first 10 characters of the line
+STATUS_PREFIX_LEN: int = 10
+_STATUS_HEADERS: dict[str, str] = {
+    "hostname: ": "hostname",
+    "version : ": "version",
+    "udp/ip  : ": "udp/ip",
+    "steamid : ": "steamid",
+    "account : ": "account",
+    "map     : ": "map",
+    "tags    : ": "tags",
+    "players : ": "players",
+    "edicts  : ": "edicts",
+}
+# the value of the players header, groups: humans, bots, max
+PLAYER_COUNT_REGEX: re.Pattern = re.compile(r"^(\d+)\s*humans,\s*(\d+)\s*bots\s*\((\d+)\s*max\)")
+
+# list seperator example: # userid name                uniqueid            connected ping loss state
+_PLAYER_LIST_SEPARATOR_REGEX: re.Pattern = re.compile(
+    r"^#\s+userid\s+name\s+uniqueid\s+connected\s+ping\s+loss\s+state"
+)
+# Groups ordering:
+# 0: full str, 1: userid, 2: Quote delimited username, 3: SteamID3, 4: time in server, 5: ping, 6: loss, 7: state
+_PLAYER_LIST_LINE_REGEX: re.Pattern = re.compile(
+    r'^(#\s+(\d{2,4})\s+(".+")\s+(\[U:\d:\d+\])\s+(\d?:?\d{2}:\d{2})\s+(\d{1,3})\s+(\d{1,3})\s+(\S+))'
+)
+
+# `tf_lobby_debug`
+_LOBBY_HEADER_REGEX: re.Pattern = re.compile(r"^CTFLobbyShared: ID:([0-9a-fA-F]+)\s+(\d+) member\(s\), (\d+) pending")
+_LOBBY_MEMBER_REGEX: re.Pattern = re.compile(
+    r"^\s+(Member|Pending)\[(\d+)\] (\[U:\d:\d+\])\s+team = (\S+)\s+type = (\S+)"
+)
+_NO_LOBBY: str = "Failed to find lobby shared object"
+
+# free-form shapes
+_CHAT_REGEX: re.Pattern = re.compile(r"^(\*DEAD\*|\*SPEC\*|\*COACH\*)?\s*(\(TEAM\))?\s*(.+?) :  (.*)$")
+_KILL_REGEX: re.Pattern = re.compile(r"^(.+) killed (.+) with (.+)\.( \(crit\))?$")
+# e.g. "bob called a vote." or "bob called a vote: Kick player: alice?", groups: caller, issue
+_VOTE_CALL_REGEX: re.Pattern = re.compile(r"^(.+?) called a vote(?:: (.+?))?\.?$")
+
+
+class StatusHeader(NamedTuple):
+    """ One of the `status` header lines, e.g. ("map", "pl_badwater at: 0 x, 0 y, 0 z"). """
+    field: str
+    value: str
+
+
+class StatusPlayerListHeader(NamedTuple):
+    """ The column headers above the `status` player list. """
+
+
+class StatusPlayer(NamedTuple):
+    """ A `status` player row. Laid out like the player row regex' groups, so it indexes the same way. """
+    line: str
+    userid: str
+    name: str  # quote delimited
+    steam_id3: str
+    connected: str
+    ping: str
+    loss: str
+    state: str
+
+
+class LobbyHeader(NamedTuple):
+    """ The first line of `tf_lobby_debug`. """
+    lobby_id: str
+    members: int
+    pending: int
+
+
+class LobbyMember(NamedTuple):
+    """ A `tf_lobby_debug` member (or pending member) line. """
+    index: int
+    steam_id3: str
+    team: str
+    member_type: str
+    pending: bool
+
+
+class NoLobby(NamedTuple):
+    """ `tf_lobby_debug` while not in a lobby. """
+
+
+class ServerConnected(NamedTuple):
+    """ We connected to a server. """
+    address: str
+
+
+class Disconnected(NamedTuple):
+    """ We were disconnected from the server. """
+    reason: str
+
+
+class MapChange(NamedTuple):
+    """ The map line printed when (re)joining a server, e.g. on a map change. """
+    map: str
+
+
+class PlayerConnected(NamedTuple):
+    """ A player joined the server we are on. """
+    name: str
+
+
+class Chat(NamedTuple):
+    name: str
+    message: str
+    dead: bool
+    team: bool
+    # "*SPEC*" or "*COACH*", else ""
+    tag: str
+
+
+class Kill(NamedTuple):
+    attacker: str
+    victim: str
+    weapon: str
+    crit: bool
+
+
+class Suicide(NamedTuple):
+    name: str
+
+
+class VoteCall(NamedTuple):
+    """ A player called a vote. """
+    caller: str
+    # what the vote is for, e.g. "Kick player: alice?", "" if the line doesn't say
+    issue: str
+
+
+ConsoleEvent = (
+    StatusHeader | StatusPlayerListHeader | StatusPlayer | LobbyHeader | LobbyMember | NoLobby | ServerConnected
+    | Disconnected | MapChange | PlayerConnected | Chat | Kill | Suicide | VoteCall
+)
+
+
+def _lobby_header(line: str) -> LobbyHeader | None:
+    _match = _LOBBY_HEADER_REGEX.match(line)
+    if _match is None:
+        return None
+    _id, _members, _pending = _match.groups()
+    return LobbyHeader(_id, int(_members), int(_pending))
+
+
+def _lobby_member(line: str) -> LobbyMember | None:
+    _match = _LOBBY_MEMBER_REGEX.match(line)
+    if _match is None:
+        return None
+    _kind, _idx, _sid3, _team, _type = _match.groups()
+    return LobbyMember(int(_idx), _sid3, _team, _type, _kind == "Pending")
+
+
+# lines that only start one way, by prefix
+_PREFIXED: tuple[tuple[str, Callable[[str], ConsoleEvent | None]], ...] = (
+    ("CTFLobbyShared: ", _lobby_header),
+    ("  Member[", _lobby_member),
+    ("  Pending[", _lobby_member),
+    (_NO_LOBBY, lambda line: NoLobby()),
+    ("Connected to ", lambda line: ServerConnected(line[13:].strip())),
+    ("Disconnect: ", lambda line: Disconnected(line[12:].rstrip("."))),
+    ("Map: ", lambda line: MapChange(line[5:].strip())),
+)
+_PREFIXES: tuple[str, ...] = tuple(_prefix for _prefix, _ in _PREFIXED)
+
+
+def classify(line: str) -> ConsoleEvent | None:
+    """
+    Classify one line of console output (without its line ending, though trailing whitespace is ignored).
+
+    :return: the typed event, or None if the line isn't any of the known shapes
+    """
+    if line[:1].isdigit():
+        _timestamp = _TIMESTAMP_REGEX.match(line)
+        if _timestamp is not None:
+            line = line[_timestamp.end():]
+    line = line.rstrip()
+    if not line:
+        return None
+
+    _field = _STATUS_HEADERS.get(line[:STATUS_PREFIX_LEN])
+    if _field is not None:
+        return StatusHeader(_field, line[STATUS_PREFIX_LEN:])
+
+    if line[0] == "#":
+        _match = _PLAYER_LIST_LINE_REGEX.match(line)
+        if _match is not None:
+            return StatusPlayer(*_match.groups())
+        if _PLAYER_LIST_SEPARATOR_REGEX.match(line):
+            return StatusPlayerListHeader()
+        return None
+
+    if line.startswith(_PREFIXES):
+        for _prefix, _parse in _PREFIXED:
+            if line.startswith(_prefix):
+                return _parse(line)
+
+    if " :  " in line:
+        _match = _CHAT_REGEX.match(line)
+        if _match is not None:
+            _tag, _team, _name, _message = _match.groups()
+            return Chat(_name, _message, _tag == "*DEAD*", _team is not None, "" if _tag in (None, "*DEAD*") else _tag)
+    if " killed " in line:
+        _match = _KILL_REGEX.match(line)
+        if _match is not None:
+            _attacker, _victim, _weapon, _crit = _match.groups()
+            return Kill(_attacker, _victim, _weapon, _crit is not None)
+    if " called a vote" in line:
+        _match = _VOTE_CALL_REGEX.match(line)
+        if _match is not None:
+            _caller, _issue = _match.groups()
+            return VoteCall(_caller, _issue or "")
+    if line.endswith(" connected"):
+        return PlayerConnected(line[:-10])
+    if line.endswith(" suicided."):
+        return Suicide(line[:-10])
+    return None
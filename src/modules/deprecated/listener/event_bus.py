@@ -0,0 +1,214 @@
+"""
+event_bus.py
+An in-process publish/subscribe bus for what is written to console.log, as it is written.
+
+A feeder thread reads lines from the watcher (see Watchdog.attach), and publishes every line on the `str` topic and,
+if the classifier recognises it, its typed event (a Kill, a Chat, a VoteCall, ...) on the topic of its type.
+Subscribers pick the topics (event types) they want, and get their own bounded queue, so a slow subscriber only ever
+loses its own oldest events and never holds up the feeder or anyone else. Every subscription counts what it was
+delivered, what it dropped, its largest backlog and how long events waited in it (lag).
+
+    _kills = bus.subscribe(Kill, maxsize=64)
+    _event = _kills.get(timeout=1.0)
+
+or, to have a callback run (on the subscriptions own thread) for every event:
+
+    bus.subscribe(PlayerConnected, ServerConnected, callback=lambda _event: scheduler.wake())
+"""
+from collections import deque
+from threading import Condition, Event, Lock, Thread
+from typing import Any, Callable
+
+from src.modules.deprecated.listener.classifier import classify
+
+import loguru
+import time
+
+# topic every line is published on, as is
+LINES: type = str
+
+
+class Subscription:
+    """
+    A bounded queue of the events published on some topics. When full, the oldest queued event is dropped.
+    """
+    topics: tuple[type, ...] = None
+    maxsize: int = None
+    delivered: int = None
+    dropped: int = None
+    max_backlog: int = None
+    max_lag: float = None
+    closed: bool = None
+
+    def __init__(self, topics: tuple[type, ...], maxsize: int) -> None:
+        self.topics = topics
+        self.maxsize = maxsize
+        self.delivered = 0
+        self.dropped = 0
+        self.max_backlog = 0
+        self.max_lag = 0.0
+        self.closed = False
+        # (published at, event)
+        self._queue: deque[tuple[float, Any]] = deque()
+        self._ready = Condition(Lock())
+        self._dispatcher: Thread | None = None
+
+    def _offer(self, published_at: float, event: Any) -> None:
+        with self._ready:
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append((published_at, event))
+            self.max_backlog = max(self.max_backlog, len(self._queue))
+            self._ready.notify()
+
+    def _take(self, count: int) -> list[Any]:
+        # lock held
+        _now = time.monotonic()
+        _events = []
+        for _ in range(min(count, len(self._queue))):
+            _published_at, _event = self._queue.popleft()
+            self.max_lag = max(self.max_lag, _now - _published_at)
+            _events.append(_event)
+        self.delivered += len(_events)
+        return _events
+
+    def get(self, timeout: float | None = None) -> Any | None:
+        """ The next event, waiting up to `timeout` seconds (forever if None) for one. None on timeout or close. """
+        with self._ready:
+            if not self._queue and not self.closed:
+                self._ready.wait(timeout)
+            _events = self._take(1)
+        return _events[0] if _events else None
+
+    def get_many(self, timeout: float = 0.0) -> list[Any]:
+        """ Every queued event, waiting up to `timeout` seconds for at least one if there are none. """
+        with self._ready:
+            if not self._queue and not self.closed and timeout > 0:
+                self._ready.wait(timeout)
+            return self._take(len(self._queue))
+
+    @property
+    def backlog(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "topics": [_topic.__name__ for _topic in self.topics],
+            "backlog": len(self._queue),
+            "max_backlog": self.max_backlog,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+        }
+
+    def _dispatch(self, callback: Callable[[Any], None]) -> None:
+        while not self.closed:
+            _event = self.get()
+            if _event is None:
+                continue
+            try:
+                callback(_event)
+            except Exception as e:
+                loguru.logger.exception(f"Console event subscriber failed on {type(_event).__name__}: {e}")
+
+    def close(self) -> None:
+        """ Stop receiving events (see ConsoleEventBus.unsubscribe), waking anything waiting on this subscription. """
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+
+class ConsoleEventBus:
+    """
+    Topics are event types: the classifier's event classes, or LINES (str) for every line as is.
+    """
+    published: dict[type, int] = None
+
+    def __init__(self) -> None:
+        self.published = {}
+        self._lock = Lock()
+        # copied on (un)subscribe, so publishing reads it without taking the lock
+        self._subscriptions: dict[type, tuple[Subscription, ...]] = {}
+        self._feeder: Thread | None = None
+        self._stop = Event()
+
+    def subscribe(
+            self, *topics: type, maxsize: int = 256, callback: Callable[[Any], None] | None = None
+    ) -> Subscription:
+        """
+        Subscribe to the events of the given types.
+
+        :param maxsize: the most events queued for this subscriber, beyond which its oldest are dropped
+        :param callback: if given, called with every event, in order, on a thread of the subscriptions own
+        """
+        _subscription = Subscription(topics, maxsize)
+        with self._lock:
+            for _topic in topics:
+                self._subscriptions[_topic] = self._subscriptions.get(_topic, ()) + (_subscription,)
+        if callback is not None:
+            _subscription._dispatcher = Thread(
+                target=_subscription._dispatch, args=(callback,), daemon=True, name="ConsoleEventBus-dispatch"
+            )
+            _subscription._dispatcher.start()
+        return _subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for _topic in subscription.topics:
+                self._subscriptions[_topic] = tuple(
+                    _sub for _sub in self._subscriptions.get(_topic, ()) if _sub is not subscription
+                )
+        subscription.close()
+
+    def publish(self, event: Any) -> None:
+        _topic = type(event)
+        self.published[_topic] = self.published.get(_topic, 0) + 1
+        _subscriptions = self._subscriptions.get(_topic)
+        if _subscriptions:
+            _now = time.monotonic()
+            for _subscription in _subscriptions:
+                _subscription._offer(_now, event)
+
+    def publish_line(self, line: str) -> None:
+        """ Publish a line on LINES, and its event (if it classifies as one) on the events topic. """
+        self.publish(line)
+        _event = classify(line)
+        if _event is not None:
+            self.publish(_event)
+
+    def feed(self, source: Callable[[float], list[str]], timeout: float = 0.25) -> None:
+        """
+        Start a thread publishing every line `source(timeout)` returns, until stop(). `source` should block for up to
+        `timeout` seconds while there are no new lines.
+        """
+        if self._feeder is not None and self._feeder.is_alive():
+            raise RuntimeError("This bus is already being fed.")
+        self._stop.clear()
+        self._feeder = Thread(target=self._feed, args=(source, timeout), daemon=True, name="ConsoleEventBus-feed")
+        self._feeder.start()
+
+    def _feed(self, source: Callable[[float], list[str]], timeout: float) -> None:
+        while not self._stop.is_set():
+            for _line in source(timeout):
+                self.publish_line(_line)
+
+    def stop(self) -> None:
+        """ Stop feeding (waiting for the feeder to finish), and close every subscription. """
+        self._stop.set()
+        if self._feeder is not None:
+            self._feeder.join()
+            self._feeder = None
+        with self._lock:
+            _subscriptions = {_sub for _subs in self._subscriptions.values() for _sub in _subs}
+            self._subscriptions = {}
+        for _subscription in _subscriptions:
+            _subscription.close()
+
+    def stats(self) -> dict[str, Any]:
+        """ Events published per topic, and every subscriptions counters (see Subscription.stats). """
+        _subscriptions = {_sub for _subs in self._subscriptions.values() for _sub in _subs}
+        return {
+            "published": {_topic.__name__: _count for _topic, _count in self.published.items()},
+            "subscriptions": [_subscription.stats() for _subscription in _subscriptions],
+        }
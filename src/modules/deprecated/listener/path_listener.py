@@ -8,25 +8,28 @@ and you are looking to grab the appended data as it is appended.
 
 I.e. something like a `console.log` file that grows throughout the process lifetime of an application
 """
-import datetime
 import multiprocessing
-import re
 import time
-import os
 import loguru
 
 from multiprocessing import Queue, Process
-from queue import Empty
 from pathlib import Path
 from src.modules.deprecated.listener.status import TF2StatusBlob
+from src.modules.deprecated.listener.classifier import classify, StatusHeader, PLAYER_COUNT_REGEX
+from src.modules.deprecated.listener.watch_backends import make_waiter, PollingWaiter
+from src.modules.deprecated.listener.tail_reader import TailReader
+from src.modules.deprecated.listener.shm_ring import ShmRing
+from src.modules.deprecated.listener.event_bus import ConsoleEventBus, Subscription, LINES
 from src.modules.backend.rc import FragClient
 from enum import Enum
-from typing import Callable
 from src.modules.backend.lobby import TF2Lobby, TF2Player
 
+# seconds between checks that the process that started the watcher is still alive
+PARENT_CHECK_INTERVAL: float = 0.5
+
 
 def threaded_watcher(
-        changes: Queue,
+        changes: ShmRing,
         watching: Path,
         full_start: bool,
         read_mode: str = "r",
@@ -36,77 +39,80 @@ def threaded_watcher(
     🚫 no access 🚫
     threaded_watcher
 
-    :param changes: the managed multiprocessing Queue to output changes into to be synced with parent threads
+    :param changes: the shared memory ring to write changes into (this process is its only producer)
     :param watching: the path to watch
     :param full_start: if true, treat the file as completely unseen and push whatever contents exist in the file into
                        the queue immediately. when false we initialise by setting the cursor to the current filesize.
-    :param read_mode: the 'mode' passed to `open()` to open the watched file as. 'r' default for files where you expect
-                      utf8 data, or for example, 'rb' where you expect raw binary data.
-    :param polling_rate: the (ideal) polling rate (in Hz) of the file being watched. I.e. polling_rate = 10 will sleep
-                         for 0.1 seconds between each polling cycle. This does not account for time taken to perform the
-                         actual polling.
-    :param logger: a multiprocessing Queue managed by the LilithLogger class from the master process. Used for logging.
+    :param read_mode: 'r' (default) to push each complete (utf16 decoded) line appended to the file as a utf8 frame, or
+                      'rb' to push the raw appended bytes as they are.
+    :param polling_rate: only used where inotify isn't available (see watch_backends), the slowest rate (in Hz) the
+                         file is polled at while it isn't changing. While it is, it is polled at 100 Hz.
     :return: None
     """
+    _waiter = make_waiter(watching)
+    if isinstance(_waiter, PollingWaiter):
+        _waiter.max_interval = max(1.0 / polling_rate, _waiter.min_interval)
+
     # _nm --> private no mangle
-    _nm_stat: os.stat_result = os.stat(str(watching))
-    _nm_cursor: int = 0 if full_start else _nm_stat.st_size
-    _nm_parent_check: int = 0
-    _PARENT_CHECK_FREQ: int = 5
+    # Since we are opening a file in a child process, nothing can have a read lock
+    # on the given fd, otherwise this fails. Since we are reading, we do not impact
+    # the external process from achieving a write-lock on the file.
+    _nm_reader: TailReader = TailReader(watching, start_at_end=not full_start)
+    _nm_parent_checked: float = time.monotonic()
+    _nm_failed: bool = False
+    _changed: bool = True
+
     while True:
-        time.sleep(1.0 / polling_rate)
-        # liveness check (check if parent is alive every
-        # _PARENT_CHECK_FREQ loops, i.e. every _PARENT_CHECK_FREQ/10 seconds)
-        if _nm_parent_check == (_PARENT_CHECK_FREQ - 1):
+        if _changed or _nm_failed:
+            # Try and read changes
+            try:
+                if "b" in read_mode:
+                    _inst_new_bytes = _nm_reader.read_new_bytes()
+                    _step = changes.max_frame
+                    _inst_new_changes = [_inst_new_bytes[i:i + _step] for i in range(0, len(_inst_new_bytes), _step)]
+                else:
+                    _inst_new_changes = [_line.encode("utf-8") for _line in _nm_reader.read_lines()]
+
+                # Append read changes to the shared ring
+                if _inst_new_changes:
+                    changes.put_many(_inst_new_changes)
+                _nm_failed = False
+
+            except OSError as e:
+                # Need logging here to complain about failure to open the watched path
+                _nm_reader.close()
+                _nm_failed = True
+
+        _changed = _waiter.wait(PARENT_CHECK_INTERVAL)
+
+        # liveness check (check if parent is alive every PARENT_CHECK_INTERVAL seconds)
+        if time.monotonic() - _nm_parent_checked >= PARENT_CHECK_INTERVAL:
+            _nm_parent_checked = time.monotonic()
             if not multiprocessing.parent_process().is_alive():
                 break
-        else:
-            _nm_parent_check += 1
-            _nm_parent_check %= _PARENT_CHECK_FREQ
-
-        # file metadata check
-        _inst_stat: os.stat_result = os.stat(str(watching))
-        if _inst_stat == _nm_stat:
-            continue
-
-        _nm_stat = _inst_stat
-
-        # Bounds check the cursor
-        if _nm_cursor > _nm_stat.st_size:
-            # TODO: Because this is a child process, nothing captures this logging output,
-            #       use a process safe logger (i.e. implement LilithLogger)
-            _nm_cursor = 0
-
-        # Try and read changes
-        # Since we are opening a file in a child process, nothing can have a read lock
-        # on the given fd, otherwise this fails. Since we are reading, we do not impact
-        # the external process from achieving a write-lock on the file.
-        try:
-            with open(str(watching), read_mode, encoding='utf16', errors='replace') as h:
-                h.seek(_nm_cursor)
-                _inst_new_changes = h.read()
-                _nm_cursor = h.tell()
-
-            # Append read changes to managed queue
-            if _inst_new_changes:
-                changes.put(_inst_new_changes, block=True, timeout=None)
-
-        except OSError as e:
-            # Need logging here to complain about failure to open the watched path
-            continue
+
+    _nm_reader.close()
+    _waiter.close()
+    changes.close_producer()
+    changes.close()
 
 
 class Watchdog:
     _watchdog: Process = None
-    changes: Queue = None
+    changes: ShmRing = None
     watching: Path = None
     fn: str = None
     wd_logger: Queue = None
+    bus: ConsoleEventBus | None = None
 
     def __init__(self, path: Path, full_start: bool = False) -> None:
         self.watching: Path = path
         self.fn: str = path.name
-        self.changes = Queue()
+        self.changes = ShmRing()
+        # lines read back out of the ring but handed back (push_back) by whoever read them
+        self._pushed_back: list[str] = []
+        # once attached to a bus, the lines come from this subscription instead of the ring
+        self._line_feed: Subscription | None = None
         self._watchdog = Process(target=threaded_watcher, args=(self.changes, self.watching, full_start), daemon=True)
 
     def begin(self) -> None:
@@ -115,13 +121,49 @@ class Watchdog:
 
     def end(self) -> None:
         loguru.logger.info("killing path watchdog...")
+        if self.bus is not None:
+            self.bus.stop()
         self._watchdog.kill()
+        self._watchdog.join()
+        self.changes.close()
+
+    def attach(self, bus: ConsoleEventBus, backlog: int = 10000) -> None:
+        """
+        Hand the ring over to `bus`, which publishes every line (and its classified event) as soon as it is written.
+        get_lines() and invoke_status() keep working, reading from a subscription to every line on the bus instead,
+        which keeps up to `backlog` lines that haven't been asked for yet.
+        """
+        self.bus = bus
+        self._line_feed = bus.subscribe(LINES, maxsize=backlog)
+        bus.feed(self._read_ring)
+
+    def _read_ring(self, timeout: float) -> list[str]:
+        if timeout > 0:
+            self.changes.wait(timeout)
+        return self.changes.read_lines()
+
+    def get_lines(self, timeout: float = 0.0) -> list[str]:
+        """
+        Every line appended since the last call (pushed back lines first), waiting up to `timeout` seconds for some if
+        there are none yet.
+        """
+        _lines = self._pushed_back
+        if _lines:
+            self._pushed_back = []
+            timeout = 0.0
+        if self._line_feed is not None:
+            return _lines + self._line_feed.get_many(timeout)
+        return _lines + self._read_ring(timeout)
+
+    def push_back(self, lines: list[str]) -> None:
+        """ Hand lines back (e.g. ones that turned out not to be `status` output), to be returned by the next read. """
+        self._pushed_back = list(lines) + self._pushed_back
 
     def get_update(self) -> None | str:
-        try:
-            return self.changes.get_nowait()
-        except Empty:
+        _lines = self.get_lines()
+        if not _lines:
             return None
+        return "\n".join(_lines) + "\n"
 
     def invoke_status(self) -> TF2StatusBlob | None:
         """
@@ -135,54 +177,24 @@ class Watchdog:
         :return: A TF2StatusBlob instance (which contains the excess data)
         """
         _status = TF2StatusBlob()
-        _time_started: datetime.datetime = datetime.datetime.now()
-        _initial_data = self.get_update()
-        _data_lines: list[str] = []
+        _give_up_at: float = time.monotonic() + 2
 
         while not _status.full_munch:
-            if _initial_data is None:
-                _initial_data = self.get_update()
-                # If we pull None back from get_update() twice in a row, sleep for 50ms for every time
-                # None is returned (i.e. give the watcher time to pull data and achieve the Queue lock)
-
-            if _initial_data is None:
-                time.sleep(0.05)
-                _time = datetime.datetime.now() - _time_started
-                if _time.seconds > 2:
-                    return None
-
-            if not _data_lines and _initial_data is not None:
-                _data_lines = _initial_data.split("\n")
-                _initial_data = None
-
-            for line in _data_lines:
+            _remaining = _give_up_at - time.monotonic()
+            if _remaining <= 0:
+                return None
+
+            # block until the watcher has written more lines, rather than polling for them
+            _data_lines = self.get_lines(timeout=_remaining)
+            for _idx, line in enumerate(_data_lines):
                 if _status.munch(line):
+                    # whatever came in after the status output isn't ours
+                    _status.excess_junk.extend(_data_lines[_idx + 1:])
                     break
 
-            _data_lines = []
-
         return _status
 
 
-PREFIX_LEN: int = 10
-HST_REGEX: str = r"^hostname:\s*(.+)$"
-VER_REGEX: str = r"^version\s*:\s*(.+)$"
-UDP_REGEX: str = r"^udp/ip\s*:\s*([^:]+):*(.*)$"
-SID_REGEX: str = r"^steamid\s*:\s*(\[.+\])\s+(\(.+\))$"
-ACC_REGEX: str = r"^account\s*:\s*(.*)$"
-MAP_REGEX: str = r"^map\s*:\s*(\S*)(.*)$"
-TAG_REGEX: str = r"^tags\s*:\s*(.*)$"
-PLS_REGEX: str = r"^players\s*:\s*(\d+)\s*humans,\s*(\d+)\s*bots\s*\((\d+)\s*max\)$"
-EDS_PREFIX: str = r"^edicts\s*:\s*(\d+)\s*used\s*of\s*(\d+)\s*max$"
-# No groups
-# list seperator example: # userid name                uniqueid            connected ping loss state
-PLAYER_LIST_SEPARATOR_REGEX: str = r"^#\s+userid\s+name\s+uniqueid\s+connected\s+ping\s+loss\s+state$"
-# Groups ordering:
-# 0: full str, 1: userid, 2: Quote delimited username, 3: SteamID3, 4: time in server, 5: ping, 6: loss, 7: state
-PLAYER_LIST_LINE_REGEX: str = \
-    r'^(#\s+(\d{2,4})\s+(".+")\s+(\[U:\d:\d+\])\s+(\d?:?\d{2}:\d{2})\s+(\d{1,3})\s+(\d{1,3})\s+(\S+))$'
-
-
 def track_console_against_lobby(
         lobby: TF2Lobby,
         tfpath: Path,
@@ -199,66 +211,21 @@ def track_console_against_lobby(
     """
     _listener = Watchdog(path=tfpath, full_start=full_start)
     _listener.begin()
-    regexes = {
-        HST_REGEX: "hostname",
-        VER_REGEX: "none",
-        UDP_REGEX: "gameIp",
-        SID_REGEX: "none",
-        ACC_REGEX: "none",
-        MAP_REGEX: "gameMap",
-        TAG_REGEX: "none",
-        PLS_REGEX: ["int->numPlayers", "none", "int->maxPlayers"],
-        EDS_PREFIX: "none",
-        PLAYER_LIST_SEPARATOR_REGEX: "none",
-        PLAYER_LIST_LINE_REGEX: "__PLAYER__",
-    }
     while True:
-        _data = _listener.get_update()
-        _lines = _data.split("\n")
-        _cleaned = [x.strip() for x in _lines]
-        for _line in _cleaned:
-            for _k in regexes:
-                if regexes[_k] == "none":
-                    continue
-
-                _match = re.search(_k, _line)
-                if not _match:
-                    continue
-
-                if type(regexes[_k]) is list:
-                    _groups = _match.groups()
-                    for idx, grp in enumerate(_groups):
-                        _attr = regexes[_k][idx]
-                        if _attr == "none":
-                            continue
-                        _caster: Callable = str
-                        if "int->" in _attr:
-                            _caster = int
-                            _attr = _attr.replace("int->", "")
-                        elif "float->" in _attr:
-                            _caster = float
-                            _attr = _attr.replace("float->", "")
-
-                        setattr(lobby, _attr, _caster(grp))
-                else:
-
-                    _attr = regexes[_k]
-                    if _attr == "none":
-                        continue
-
-                    if _attr == "__PLAYER__":
-                        pass
-                    # TODO: finish this
-
-                    _groups = _match.groups()
-                    _caster: Callable = str
-                    if "int->" in _attr:
-                        _caster = int
-                        _attr = _attr.replace("int->", "")
-                    elif "float->" in _attr:
-                        _caster = float
-                        _attr = _attr.replace("float->", "")
-                    setattr(lobby, _attr, _caster(_groups[0]))
-
-
-
+        for _line in _listener.get_lines(timeout=PARENT_CHECK_INTERVAL):
+            _event = classify(_line.strip())
+            if type(_event) is not StatusHeader:
+                # TODO: players (StatusPlayer)
+                continue
+
+            if _event.field == "hostname":
+                lobby.hostname = _event.value
+            elif _event.field == "udp/ip":
+                lobby.gameIp = _event.value.split(":")[0]
+            elif _event.field == "map":
+                lobby.gameMap = _event.value.split()[0] if _event.value else ""
+            elif _event.field == "players":
+                _match = PLAYER_COUNT_REGEX.match(_event.value)
+                if _match is not None:
+                    lobby.numPlayers = int(_match.group(1))
+                    lobby.maxPlayers = int(_match.group(3))
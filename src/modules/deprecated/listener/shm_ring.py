@@ -0,0 +1,256 @@
+"""
+shm_ring.py
+A single-producer, single-consumer ring buffer of framed lines in shared memory, for handing console text from the
+watcher process to the process that started it without pickling or a pipe in between.
+
+The producer copies each frame (a 4 byte length, the payload, padded to 4 bytes) into the ring, then publishes it by
+advancing the write index. The consumer reads frames as memoryviews straight out of the ring, and hands the space back
+by advancing the read index once it is done with them. Each index only ever has one writer, so neither side needs a
+lock to move data. Two events are only used to sleep on: the consumer waits on `_data` while the ring is empty, and
+the producer waits on `_space` while it is full.
+
+Both indices count bytes since creation (they never wrap), so `write - read` is always how much is unread.
+"""
+from multiprocessing import Event
+from multiprocessing.shared_memory import SharedMemory
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+import os
+import struct
+import time
+
+# Header, one cache line written by the producer, one by the consumer
+# producer: write index, frames written, frames dropped, bytes dropped, times it waited on a full ring, the most bytes
+#           ever unread at once, closed flag
+_PRODUCER = struct.Struct("<QQQQQQQ")
+_PRODUCER_OFFSET: int = 0
+# consumer: read index, frames read
+_CONSUMER = struct.Struct("<QQ")
+_CONSUMER_OFFSET: int = 64
+_DATA_OFFSET: int = 128
+
+_LENGTH = struct.Struct("<I")
+# in place of a length: the rest of the ring is unused, the next frame starts back at the beginning
+_WRAP: int = 0xFFFFFFFF
+
+DEFAULT_CAPACITY: int = 1024 * 1024
+
+
+def _frame_size(length: int) -> int:
+    return (_LENGTH.size + length + 3) & ~3
+
+
+class ShmRing:
+    """
+    :param capacity: bytes of frame data the ring holds (rounded up to a multiple of 4). A single frame can be at most
+                     half of it.
+    :param put_timeout: how long the producer waits on a full ring before dropping what doesn't fit
+    :param name: attach to an existing ring by its shared memory name instead of creating one
+    """
+    name: str = None
+    capacity: int = None
+    max_frame: int = None
+    put_timeout: float = None
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, put_timeout: float = 1.0, name: str | None = None) -> None:
+        self.capacity = (capacity + 3) & ~3
+        self.max_frame = self.capacity // 2 - _LENGTH.size
+        self.put_timeout = put_timeout
+        # only the process that created the block frees it (a forked child has a copy of this object too)
+        self._owner_pid = os.getpid() if name is None else None
+        if name is None:
+            self._shm = SharedMemory(create=True, size=_DATA_OFFSET + self.capacity)
+            self._shm.buf[:_DATA_OFFSET] = bytes(_DATA_OFFSET)
+        else:
+            self._shm = SharedMemory(name=name)
+        self.name = self._shm.name
+        self._data = Event()
+        self._space = Event()
+
+    def __getstate__(self) -> dict:
+        # for handing the ring to a spawned child process: it attaches to the same block by name
+        return {
+            "name": self.name, "capacity": self.capacity, "put_timeout": self.put_timeout,
+            "_data": self._data, "_space": self._space,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["capacity"], state["put_timeout"], name=state["name"])
+        self._data = state["_data"]
+        self._space = state["_space"]
+
+    def _producer(self) -> list[int]:
+        return list(_PRODUCER.unpack_from(self._shm.buf, _PRODUCER_OFFSET))
+
+    def _read_index(self) -> int:
+        return _CONSUMER.unpack_from(self._shm.buf, _CONSUMER_OFFSET)[0]
+
+    def _write_index(self) -> int:
+        return _PRODUCER.unpack_from(self._shm.buf, _PRODUCER_OFFSET)[0]
+
+    # producer side
+
+    def put(self, payload: bytes) -> bool:
+        """ Write one frame. See put_many(). """
+        return self.put_many((payload,)) == 1
+
+    def put_many(self, payloads: Iterable[bytes]) -> int:
+        """
+        Write a frame per payload, publishing them all at once (and waking the consumer once). If the ring is full,
+        what has been written so far is published, and the producer waits up to `put_timeout` for the consumer to
+        make room, after which the remaining frames are dropped (and counted as dropped).
+
+        :return: how many frames were written
+        """
+        _buf = self._shm.buf
+        _capacity = self.capacity
+        _pack_length = _LENGTH.pack_into
+        _write, _written, _dropped, _dropped_bytes, _stalls, _high_water, _ = self._producer()
+        _read = self._read_index()
+        _count = 0
+        _give_up_at: float | None = None
+
+        for _payload in payloads:
+            _length = len(_payload)
+            if _length > self.max_frame:
+                _dropped += 1
+                _dropped_bytes += _length
+                continue
+
+            _size = _frame_size(_length)
+            _position = _write % _capacity
+            _tail = _capacity - _position
+            # a frame that doesn't fit before the end of the ring also uses up the rest of it
+            _needed = _size if _size <= _tail else _tail + _size
+            while _capacity - (_write - _read) < _needed:
+                if _give_up_at is None:
+                    _give_up_at = time.monotonic() + self.put_timeout
+                    _stalls += 1
+                # full, let the consumer have what there is, and wait for it to make room
+                _high_water = max(_high_water, _write - _read)
+                self._publish(_write, _written, _dropped, _dropped_bytes, _stalls, _high_water)
+                self._space.clear()
+                _read = self._read_index()
+                _remaining = _give_up_at - time.monotonic()
+                if _capacity - (_write - _read) >= _needed or _remaining <= 0:
+                    break
+                self._space.wait(_remaining)
+                _read = self._read_index()
+
+            if _capacity - (_write - _read) < _needed:
+                _dropped += 1
+                _dropped_bytes += _length
+                continue
+
+            if _size > _tail:
+                _pack_length(_buf, _DATA_OFFSET + _position, _WRAP)
+                _write += _tail
+                _position = 0
+            _start = _DATA_OFFSET + _position
+            _pack_length(_buf, _start, _length)
+            _buf[_start + 4:_start + 4 + _length] = _payload
+            _write += _size
+            _written += 1
+            _count += 1
+
+        _high_water = max(_high_water, _write - _read)
+        self._publish(_write, _written, _dropped, _dropped_bytes, _stalls, _high_water)
+        return _count
+
+    def _publish(
+            self, write: int, written: int, dropped: int, dropped_bytes: int, stalls: int, high_water: int
+    ) -> None:
+        # the frames are in place before the write index that covers them is stored
+        _PRODUCER.pack_into(
+            self._shm.buf, _PRODUCER_OFFSET, write, written, dropped, dropped_bytes, stalls, high_water, 0
+        )
+        self._data.set()
+
+    def close_producer(self) -> None:
+        """ Mark the ring closed (no more frames are coming), waking a waiting consumer. """
+        _header = self._producer()
+        _header[6] = 1
+        _PRODUCER.pack_into(self._shm.buf, _PRODUCER_OFFSET, *_header)
+        self._data.set()
+
+    # consumer side
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._producer()[6])
+
+    @property
+    def lag(self) -> int:
+        """ Bytes published but not yet read. """
+        return self._write_index() - self._read_index()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """ Block until there is something to read (or the producer has closed), or `timeout` seconds pass. """
+        self._data.clear()
+        if self.lag or self.closed:
+            return True
+        self._data.wait(timeout)
+        return bool(self.lag) or self.closed
+
+    @contextmanager
+    def read(self, max_frames: int | None = None) -> Iterator[list[memoryview]]:
+        """
+        The unread frames (up to `max_frames`), as memoryviews into the ring, without copying them. The space is handed
+        back to the producer when the block exits, after which the views are released and must not be used.
+
+            with ring.read() as frames:
+                for frame in frames:
+                    ...
+        """
+        _buf = self._shm.buf
+        _read, _read_frames = _CONSUMER.unpack_from(_buf, _CONSUMER_OFFSET)
+        _write = self._write_index()
+        _capacity = self.capacity
+        _unpack_length = _LENGTH.unpack_from
+        _limit = -1 if max_frames is None else max_frames
+        _views: list[memoryview] = []
+        while _read < _write and len(_views) != _limit:
+            _position = _read % _capacity
+            _length = _unpack_length(_buf, _DATA_OFFSET + _position)[0]
+            if _length == _WRAP:
+                _read += _capacity - _position
+                continue
+            _start = _DATA_OFFSET + _position + 4
+            _views.append(_buf[_start:_start + _length])
+            _read += (_length + 7) & ~3
+
+        try:
+            yield _views
+        finally:
+            _read_frames += len(_views)
+            for _view in _views:
+                _view.release()
+            _CONSUMER.pack_into(_buf, _CONSUMER_OFFSET, _read, _read_frames)
+            self._space.set()
+
+    def read_lines(self, encoding: str = "utf-8") -> list[str]:
+        """ Every unread frame, decoded (copied) to str. """
+        with self.read() as _frames:
+            return [str(_frame, encoding, 'replace') for _frame in _frames]
+
+    def stats(self) -> dict[str, int]:
+        """ Counters for both sides, e.g. whether the consumer is falling behind (lag, high_water, stalls, dropped). """
+        _write, _written, _dropped, _dropped_bytes, _stalls, _high_water, _ = self._producer()
+        _read, _read_frames = _CONSUMER.unpack_from(self._shm.buf, _CONSUMER_OFFSET)
+        return {
+            "capacity": self.capacity,
+            "lag": _write - _read,
+            "high_water": _high_water,
+            "frames_written": _written,
+            "frames_read": _read_frames,
+            "frames_dropped": _dropped,
+            "bytes_dropped": _dropped_bytes,
+            "producer_stalls": _stalls,
+        }
+
+    def close(self) -> None:
+        """ Detach from the shared memory, and free it if this is the side that created it. """
+        self._shm.close()
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
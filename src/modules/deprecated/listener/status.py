@@ -1,24 +1,21 @@
-import re
+from src.modules.deprecated.listener.classifier import (
+    classify, StatusHeader, StatusPlayerListHeader, StatusPlayer, PLAYER_COUNT_REGEX
+)
 
 
 class TF2StatusBlob:
-    PREFIX_LEN: int = 10
-    HST_PREFIX: str = "hostname: "
-    VER_PREFIX: str = "version : "
-    UDP_PREFIX: str = "udp/ip  : "
-    SID_PREFIX: str = "steamid : "
-    ACC_PREFIX: str = "account : "
-    MAP_PREFIX: str = "map     : "
-    TAG_PREFIX: str = "tags    : "
-    PLS_PREFIX: str = "players : "
-    NUM_PLAYERS_REGEX: str = r"(players\s:\s)(\d+)\shumans,\s(\d+)\sbots\s\((\d+)\smax\)"
-    EDS_PREFIX: str = "edicts  : "
-    # No groups
-    # list seperator example: # userid name                uniqueid            connected ping loss state
-    PLAYER_LIST_SEPARATOR_REGEX: str = r"#\s+userid\s+name\s+uniqueid\s+connected\s+ping\s+loss\s+state"
-    # Groups ordering:
-    # 0: full str, 1: userid, 2: Quote delimited username, 3: SteamID3, 4: time in server, 5: ping, 6: loss, 7: state
-    PLAYER_LIST_LINE_REGEX: str = r'(#\s+(\d{2,4})\s+(".+")\s+(\[U:\d:\d+\])\s+(\d?:?\d{2}:\d{2})\s+(\d{1,3})\s+(\d{1,3})\s+(\S+))'
+    # the attribute each `status` header is kept in
+    HEADER_ATTRS: dict[str, str] = {
+        "hostname": "status_hst",
+        "version": "status_ver",
+        "udp/ip": "status_udp",
+        "steamid": "status_sid",
+        "account": "status_acc",
+        "map": "status_map",
+        "tags": "status_tag",
+        "players": "status_pls",
+        "edicts": "status_eds",
+    }
 
     status_hst: str = None
     status_ver: str = None
@@ -32,7 +29,7 @@ class TF2StatusBlob:
 
     munched_player_sep: bool = None
 
-    players: list[re.Match] = None
+    players: list[StatusPlayer] = None
     num_players: int = None
     num_bots: int = None
     max_players: int = None
@@ -55,44 +52,23 @@ class TF2StatusBlob:
         """
         if not next_line.strip():
             return self.full_munch
-        if not self.status_hst and next_line.startswith(self.HST_PREFIX):
-            self.status_hst = next_line[self.PREFIX_LEN:]
-        elif not self.status_ver and next_line.startswith(self.VER_PREFIX):
-            self.status_ver = next_line[self.PREFIX_LEN:]
-        elif not self.status_udp and next_line.startswith(self.UDP_PREFIX):
-            self.status_udp = next_line[self.PREFIX_LEN:]
-        elif not self.status_sid and next_line.startswith(self.SID_PREFIX):
-            self.status_sid = next_line[self.PREFIX_LEN:]
-        elif not self.status_acc and next_line.startswith(self.ACC_PREFIX):
-            self.status_acc = next_line[self.PREFIX_LEN:]
-        elif not self.status_map and next_line.startswith(self.MAP_PREFIX):
-            self.status_map = next_line[self.PREFIX_LEN:]
-        elif not self.status_tag and next_line.startswith(self.TAG_PREFIX):
-            self.status_tag = next_line[self.PREFIX_LEN:]
-        elif not self.status_pls and next_line.startswith(self.PLS_PREFIX):
-            self.status_pls = next_line[self.PREFIX_LEN:]
-            _match = re.search(self.NUM_PLAYERS_REGEX, next_line)
-            if _match is None:
-                self.excess_junk.append(next_line)
-            else:
-                _groups = _match.groups()
-                self.num_players = _groups[1]
-                self.num_bots = _groups[2]
-                self.max_players = _groups[3]
-        elif not self.status_eds and next_line.startswith(self.EDS_PREFIX):
-            self.status_eds = next_line[self.PREFIX_LEN:]
-        elif not self.munched_player_sep and \
-                re.search(self.PLAYER_LIST_SEPARATOR_REGEX, next_line) is not None:
+        _event = classify(next_line)
+        _type = type(_event)
+        if _type is StatusHeader and getattr(self, self.HEADER_ATTRS[_event.field]) is None:
+            setattr(self, self.HEADER_ATTRS[_event.field], _event.value)
+            if _event.field == "players":
+                _match = PLAYER_COUNT_REGEX.match(_event.value)
+                if _match is None:
+                    self.excess_junk.append(next_line)
+                else:
+                    self.num_players, self.num_bots, self.max_players = _match.groups()
+        elif _type is StatusPlayerListHeader and not self.munched_player_sep:
             self.munched_player_sep = True
-        elif next_line.startswith("#"):
-            _match = re.search(self.PLAYER_LIST_LINE_REGEX, next_line)
-            if _match is not None:
-                self.players.append(_match)
-                if self.num_players is not None and len(self.players) > int(self.num_players):
-                    print(f"Extra player match on: {next_line}. Found {len(self.players)} / {int(self.num_players)}")
-                    raise ValueError("Matched more players than expected. What is happening?")
-            else:
-                self.excess_junk.append(next_line)
+        elif _type is StatusPlayer:
+            self.players.append(_event)
+            if self.num_players is not None and len(self.players) > int(self.num_players):
+                print(f"Extra player match on: {next_line}. Found {len(self.players)} / {int(self.num_players)}")
+                raise ValueError("Matched more players than expected. What is happening?")
         else:
             self.excess_junk.append(next_line)
 
@@ -0,0 +1,124 @@
+"""
+tail_reader.py
+Follows a growing text file (console.log) by raw byte offset.
+
+Each read costs only the newly appended bytes: they are read with a single pread (or seek + readinto where pread isn't
+available) into a buffer that is reused between reads, fed through a stateful incremental decoder (so a character split
+across two appends decodes correctly), and framed into complete lines, holding back a trailing partial line until its
+newline arrives. The file is only reopened if it is replaced or truncated.
+"""
+from pathlib import Path
+
+import codecs
+import os
+
+# console.log is UTF-16 (little endian, with a BOM) on Windows
+DEFAULT_ENCODING: str = "utf-16"
+_BOMS: dict[bytes, str] = {codecs.BOM_UTF16_LE: "utf-16-le", codecs.BOM_UTF16_BE: "utf-16-be"}
+
+
+class TailReader:
+    """
+    :param path: the file to follow
+    :param encoding: its text encoding. For "utf-16" the byte order is taken from the files BOM (little endian if it
+    has none), so reading can start at any offset.
+    :param start_at_end: skip whatever is in the file already, and only return what is appended from now on
+    """
+    path: Path = None
+    encoding: str = None
+    offset: int = None
+
+    def __init__(self, path: Path, encoding: str = DEFAULT_ENCODING, start_at_end: bool = True) -> None:
+        self.path = path
+        self.encoding = encoding
+        self.offset = 0
+        self._start_at_end = start_at_end
+        self._file = None
+        self._identity: tuple[int, int] | None = None
+        self._buffer = bytearray(64 * 1024)
+        self._decoder = None
+        self._partial = ""
+
+    def _open(self, size: int) -> None:
+        self.close()
+        self._file = open(str(self.path), 'rb', buffering=0)
+        _stat = os.fstat(self._file.fileno())
+        self._identity = (_stat.st_dev, _stat.st_ino)
+        self._partial = ""
+
+        _encoding = self.encoding
+        self.offset = 0
+        if _encoding.replace("-", "").lower() == "utf16":
+            _bom = self._file.read(2)
+            if _bom in _BOMS:
+                _encoding = _BOMS[_bom]
+                self.offset = 2
+            else:
+                # an empty file may still get its BOM, the generic decoder takes it (or assumes little endian)
+                _encoding = "utf-16" if size < 2 else "utf-16-le"
+        self._decoder = codecs.getincrementaldecoder(_encoding)(errors='replace')
+
+        if self._start_at_end:
+            # keep to the start of a code unit
+            _unit = 2 if _encoding.startswith("utf-16") else 1
+            self.offset = max(self.offset, size - (size - self.offset) % _unit)
+        self._start_at_end = False
+
+    def _read_into(self, count: int) -> memoryview:
+        if count > len(self._buffer):
+            self._buffer = bytearray(max(count, len(self._buffer) * 2))
+        _view = memoryview(self._buffer)[:count]
+        if hasattr(os, "preadv"):
+            _read = os.preadv(self._file.fileno(), [_view], self.offset)
+        else:
+            self._file.seek(self.offset)
+            _read = self._file.readinto(_view)
+        self.offset += _read
+        return _view[:_read]
+
+    def _pending(self) -> int:
+        """ How many new bytes there are to read, (re)opening the file first if it is new, replaced or truncated. """
+        _stat = os.stat(str(self.path))
+        if (
+                self._file is None
+                or (_stat.st_dev, _stat.st_ino) != self._identity
+                or _stat.st_size < self.offset
+        ):
+            self._open(_stat.st_size)
+        return max(_stat.st_size - self.offset, 0)
+
+    def read_new_bytes(self) -> bytes:
+        """
+        The raw bytes appended since the last read (empty if none). Don't mix with the text/line reads, this bypasses
+        the decoder.
+
+        :raises OSError: if the file can't be opened or read (e.g. it doesn't exist yet)
+        """
+        _pending = self._pending()
+        return bytes(self._read_into(_pending)) if _pending else b""
+
+    def read_new_text(self) -> str:
+        """
+        The text appended since the last read, decoded incrementally. May end partway through a line.
+
+        :raises OSError: if the file can't be opened or read (e.g. it doesn't exist yet)
+        """
+        _pending = self._pending()
+        return self._decoder.decode(self._read_into(_pending)) if _pending else ""
+
+    def read_lines(self) -> list[str]:
+        """
+        The complete lines appended since the last read, without their line endings. A trailing partial line is held
+        back until the rest of it (and its newline) has been written.
+        """
+        _text = self.read_new_text()
+        if not _text:
+            return []
+        _lines = (self._partial + _text).split("\n")
+        self._partial = _lines.pop()
+        return [_line[:-1] if _line.endswith("\r") else _line for _line in _lines]
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,145 @@
+"""
+watch_backends.py
+Ways for the console.log watcher to wait until the watched file changes.
+
+InotifyWaiter (Linux) blocks on inotify, so it wakes as soon as the file is written, truncated, replaced or moved, and
+not at all otherwise. PollingWaiter is the fallback everywhere else, it stats the file at an interval that drops to
+`min_interval` while the file is changing and backs off to `max_interval` while it isn't.
+
+Both have the same interface, wait(timeout) returns True if the file (may have) changed, False if the timeout passed
+without a change.
+"""
+from pathlib import Path
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# inotify(7)
+IN_MODIFY: int = 0x00000002
+IN_ATTRIB: int = 0x00000004
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_Q_OVERFLOW: int = 0x00004000
+IN_NONBLOCK: int = 0o4000
+IN_CLOEXEC: int = 0o2000000
+# wd, mask, cookie, len
+_EVENT = struct.Struct("iIII")
+
+# what happens to console.log: appended to, truncated, deleted, or replaced/renamed (e.g. by `con_logfile`)
+_WATCH_MASK: int = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class InotifyWaiter:
+    """
+    Watches the files parent directory rather than the file itself, and filters the events by name, so the watch
+    survives the file being deleted, recreated or renamed over.
+    """
+    path: Path = None
+
+    def __init__(self, path: Path) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+
+        self.path = path
+        self._name = os.fsencode(path.name)
+        self._fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if _libc.inotify_add_watch(self._fd, os.fsencode(str(path.parent)), _WATCH_MASK) < 0:
+            _errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(_errno, f"inotify_add_watch failed on {path.parent}")
+
+    def _drain(self) -> bool:
+        _relevant = False
+        while True:
+            try:
+                _data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return _relevant
+            _offset = 0
+            while _offset < len(_data):
+                _, _mask, _, _length = _EVENT.unpack_from(_data, _offset)
+                _offset += _EVENT.size
+                _name = _data[_offset:_offset + _length].rstrip(b'\x00')
+                _offset += _length
+                if _name == self._name or _mask & IN_Q_OVERFLOW:
+                    _relevant = True
+
+    def wait(self, timeout: float) -> bool:
+        _deadline = time.monotonic() + timeout
+        while True:
+            _remaining = _deadline - time.monotonic()
+            if _remaining <= 0:
+                return False
+            _readable, _, _ = select.select([self._fd], [], [], _remaining)
+            if _readable and self._drain():
+                return True
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWaiter:
+    """
+    :param min_interval: seconds between stats right after a change
+    :param max_interval: the most seconds between stats while nothing changes
+    :param backoff: how much the interval grows by per unchanged stat
+    """
+    path: Path = None
+    min_interval: float = None
+    max_interval: float = None
+    backoff: float = None
+    interval: float = None
+
+    def __init__(
+            self, path: Path, min_interval: float = 0.01, max_interval: float = 0.25, backoff: float = 1.5
+    ) -> None:
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self._stat = self._try_stat()
+
+    def _try_stat(self) -> tuple | None:
+        try:
+            _stat = os.stat(str(self.path))
+        except OSError:
+            return None
+        return _stat.st_ino, _stat.st_size, _stat.st_mtime_ns
+
+    def wait(self, timeout: float) -> bool:
+        _deadline = time.monotonic() + timeout
+        while True:
+            _remaining = _deadline - time.monotonic()
+            if _remaining <= 0:
+                return False
+            time.sleep(min(self.interval, _remaining))
+            _stat = self._try_stat()
+            if _stat != self._stat:
+                self._stat = _stat
+                self.interval = self.min_interval
+                return True
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def close(self) -> None:
+        pass
+
+
+def make_waiter(path: Path) -> InotifyWaiter | PollingWaiter:
+    """ An InotifyWaiter where inotify is available, otherwise a PollingWaiter. """
+    try:
+        return InotifyWaiter(path)
+    except (OSError, AttributeError):
+        # AttributeError: a libc without the inotify functions
+        return PollingWaiter(path)
@@ -3,7 +3,10 @@ import sys
 import time
 
 import src.modules.backend.rc.rcon_client as rcc
+import src.modules.backend.rc.metrics as rcmetrics
+import src.modules.backend.g15parser.consumer as g15consumer
 import src.modules.deprecated.listener.path_listener as l2  # l2 is the legacy name for this listener class
+import src.modules.deprecated.listener.event_bus as evbus
 import src.modules.deprecated.helpers.conf as conf
 import src.modules.caching.avatar_cache as avcache
 import src.modules.backend.lobby as lobby
@@ -20,6 +23,7 @@ import os
 class TF2eLoader:
     rcon_client: rcc.RCONListener = None
     log_listener: l2.Watchdog = None
+    console_bus: evbus.ConsoleEventBus = None
     steam_client: Steam = None
     av_cache: avcache = None
 
@@ -39,6 +43,8 @@ class TF2eLoader:
             return  # unreachable - logger.error should abort execution
         self.log_listener = l2.Watchdog(_tf_path.joinpath("console.log"))
         self.log_listener.begin()
+        self.console_bus = evbus.ConsoleEventBus()
+        self.log_listener.attach(self.console_bus)
         loguru.logger.success(f"l2 listener watching...")
 
         loguru.logger.info(f"Initialising RCON client (tf2 must be running!)...")
@@ -64,6 +70,8 @@ class TF2eLoader:
         )
         self.rcon_client.spawn_client()
         loguru.logger.success(f"RCON client loaded...")
+        rcmetrics.METRICS.dump_on_exit(data_path.joinpath("logs/rcon_metrics.json"))
+        g15consumer.UnknownFieldRegistry.report_on_exit()
 
         loguru.logger.info(f"Initialising Steam API client (must have valid steam api key in .env!)...")
         self.steam_client = Steam(key=os.environ["STEAM_WEB_API_KEY"])
@@ -78,6 +86,7 @@ def main():
     _data_path = Path("../../../../data/")
     client_loader = TF2eLoader(_data_path)
     game_lobby = lobby.LobbyWatching(client_loader.rcon_client, client_loader.steam_client)
+    game_lobby.watch_console(client_loader.console_bus)
     term_width = 240  # os.get_terminal_size().columns
     print("Players:")
     while True:
@@ -300,7 +300,7 @@ def update_status(window_: sg.Window, loader: TF2eLoader) -> None:
     _tf2_pid: sg.Text = window_["tf2pidkey"]
     _steam_status: sg.Text = window_["steamstatuskey"]
 
-    if is_hl2_running:
+    if is_hl2_running():
         _tf2_status.update(value="TF2 is running!", text_color="green")
     else:
         _tf2_status.update(value="TF2 is closed :(", text_color="red")
@@ -431,7 +431,7 @@ def main(loader: TF2eLoader, globby: lobby.LobbyWatching, window: sg.Window):
             _tf2_pid: sg.Text = window["tf2pidkey"]
             _steam_status: sg.Text = window["steamstatuskey"]
 
-            if is_hl2_running:
+            if is_hl2_running():
                 _tf2_status.update(value="TF2 is running!", text_color="green")
             else:
                 _tf2_status.update(value="TF2 is closed :(", text_color="red")
@@ -515,7 +515,7 @@ def main2(loader: TF2eLoader, globby: lobby.LobbyWatching):
         _tf2_pid: sg.Text = _window["tf2pidkey"]
         _steam_status: sg.Text = _window["steamstatuskey"]
 
-        if is_hl2_running:
+        if is_hl2_running():
             _tf2_status.update(value="TF2 is running!", text_color="green")
         else:
             _tf2_status.update(value="TF2 is closed :(", text_color="red")
@@ -564,6 +564,7 @@ if __name__ == "__main__":
     client_loader = TF2eLoader(_data_path)
     game_lobby = lobby.LobbyWatching(client_loader.rcon_client, client_loader.steam_client)
     game_lobby.lobby.connect_listener(client_loader.log_listener)
+    game_lobby.watch_console(client_loader.console_bus)
 
     main2(client_loader, game_lobby)
     # _window = sg.Window("SimpleLobbyViewer", layout=layout, resizable=True)
@@ -0,0 +1,12 @@
+from src.modules.deprecated.listener.classifier import classify, VoteCall, Chat
+
+
+def test_vote_call():
+    assert classify("bob called a vote.") == VoteCall("bob", "")
+    assert classify("10/18/2026 - 12:13:58: bob called a vote: Kick player: alice?") == VoteCall(
+        "bob", "Kick player: alice?"
+    )
+
+
+def test_vote_call_in_chat_is_chat():
+    assert isinstance(classify("alice :  bob called a vote."), Chat)
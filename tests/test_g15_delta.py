@@ -0,0 +1,35 @@
+from src.modules.backend.g15parser.consumer import G15DeltaParser, G15DumpPlayer
+
+
+def _dump(*playerresource_lines: str) -> str:
+    return "\n".join(["g15_dumpplayer ", G15DumpPlayer.playerresource, "", *playerresource_lines, G15DumpPlayer.end])
+
+
+def test_removed_line_resets_field_and_reports_change():
+    _delta = G15DeltaParser()
+    _delta.update(_dump("m_iPing[3] integer (50)", 'm_szName[3] string (bob)'))
+    assert _delta.dump.get_local_player_resource_data().m_iPing[3] == 50
+
+    _changes = _delta.update(_dump("m_iPing[3] integer (50)"))
+
+    assert _delta.dump.get_local_player_resource_data().m_szName[3] == ""
+    assert [(_c.slot, _c.field, _c.old, _c.new) for _c in _changes] == [(3, "m_szName", "bob", "")]
+    assert _delta.dump.get_local_player_resource_data().m_iPing[3] == 50
+
+
+def test_edited_line_is_not_reset():
+    _delta = G15DeltaParser()
+    _delta.update(_dump("m_iPing[3] integer (50)"))
+
+    _changes = _delta.update(_dump("m_iPing[3] integer (70)"))
+
+    assert [(_c.field, _c.old, _c.new) for _c in _changes] == [("m_iPing", 50, 70)]
+    assert _delta.dump.get_local_player_resource_data().m_iPing[3] == 70
+
+
+def test_fields_limit_what_is_applied():
+    _delta = G15DeltaParser({G15DumpPlayer.playerresource: {"m_iPing"}})
+    _changes = _delta.update(_dump("m_iPing[3] integer (50)", "m_iScore[3] integer (7)"))
+
+    assert [(_c.field, _c.new) for _c in _changes] == [("m_iPing", 50)]
+    assert _delta.dump.get_local_player_resource_data().m_iScore[3] == 0
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from src.modules.backend.g15parser.consumer import G15DumpPlayer, LazyG15DumpPlayer, LOBBY_G15_FIELDS
+
+RECORDED_DUMP: Path = Path(__file__).parents[1].joinpath("data/logs/g15_dumpplayer.log")
+
+
+def _recorded() -> str:
+    with open(RECORDED_DUMP, 'r') as h:
+        return h.read()
+
+
+def test_lazy_sections_match_the_full_parse():
+    _dump = _recorded()
+    _full = G15DumpPlayer(_dump)
+    _lazy = LazyG15DumpPlayer(_dump)
+
+    for _column in ("name", "ping", "score", "team", "account_id", "user_id"):
+        assert getattr(_lazy.get_player_resource_table(), _column).tolist() == \
+            getattr(_full.get_player_resource_table(), _column).tolist()
+    assert _lazy.get_local_player_data().m_iHealth == _full.get_local_player_data().m_iHealth
+    assert _lazy.get_local_player_data().m_vecOrigin.xyz == _full.get_local_player_data().m_vecOrigin.xyz
+    assert _lazy.get_local_team_data().m_iScore == _full.get_local_team_data().m_iScore
+
+
+def test_lazy_field_subset_leaves_the_rest_at_defaults():
+    _dump = _recorded()
+    _full = G15DumpPlayer(_dump)
+    _lazy = LazyG15DumpPlayer(_dump, LOBBY_G15_FIELDS)
+
+    assert _lazy.get_local_player_data().m_iAmmo == _full.get_local_player_data().m_iAmmo
+    assert _full.get_local_player_data().m_iHealth is not None
+    assert _lazy.get_local_player_data().m_iHealth is None
+    assert _lazy.get_local_team_data().m_iScore is None
+    assert _lazy.get_player_resource_table().account_id.tolist() == \
+        _full.get_player_resource_table().account_id.tolist()
+
+
+def test_section_lines_only_yields_requested_fields():
+    _lazy = LazyG15DumpPlayer(_recorded(), LOBBY_G15_FIELDS)
+
+    _lines = list(_lazy.section_lines(G15DumpPlayer.localplayer))
+    assert _lines and all(_line.startswith("m_iAmmo[") for _line in _lines)
+    assert list(_lazy.section_lines(G15DumpPlayer.localteam)) == []
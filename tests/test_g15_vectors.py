@@ -0,0 +1,22 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.modules.backend.g15parser.consumer import G15DumpPlayer
+
+RECORDED_DUMP: Path = Path(__file__).parents[1].joinpath("data/logs/g15_dumpplayer.log")
+
+
+def test_packed_vectors_match_the_decoded_ones():
+    with open(RECORDED_DUMP, 'r') as h:
+        _dump = h.read()
+    _full = G15DumpPlayer(_dump)
+    _packed = G15DumpPlayer(_dump, pack_vectors=True)
+    _block = _packed.get_vector_block(G15DumpPlayer.localplayer)
+
+    for _name in ("m_vecOrigin", "m_angRotation", "m_Collision.m_vecMins"):
+        _sub, _, _field = _name.rpartition(".")
+        _holder = getattr(_full.get_local_player_data(), _sub) if _sub else _full.get_local_player_data()
+        assert np.allclose(_block.get(_name), getattr(_holder, _field).xyz)
+    assert _packed.get_local_player_data().m_vecOrigin is None
+    assert _block.values.dtype.name == "float32"
@@ -0,0 +1,69 @@
+from src.modules.backend.rc.standin import StandInRCONServer, load_recorded_responses
+from src.modules.backend.rc.rcon_client import RCONListener, RCONHelper
+from src.modules.backend.rc.AsyncFragClient import run_pipelined
+from rcon.exceptions import WrongPassword
+
+import pytest
+
+RECORDED = load_recorded_responses()
+
+
+@pytest.fixture
+def server():
+    with StandInRCONServer(port=0) as _server:
+        yield _server
+
+
+@pytest.fixture
+def listener(server):
+    _listener = RCONListener(server.password, server.host, server.port)
+    yield _listener
+    _listener.close()
+
+
+def test_run_returns_recorded_output(listener):
+    assert listener.run("status") == RECORDED["status"]
+    assert listener.run("g15_dumpplayer") == RECORDED["g15_dumpplayer"].decode('utf-8', errors='ignore')
+
+
+def test_run_batch_keeps_command_order(listener):
+    _result = listener.run_batch(["status", "tf_lobby_debug", "echo marker"])
+
+    assert [_out.command for _out in _result.outputs] == ["status", "tf_lobby_debug", "echo marker"]
+    assert _result.outputs[0].output == RECORDED["status"]
+    assert _result.outputs[1].output == RECORDED["tf_lobby_debug"]
+    assert _result.outputs[2].output.strip() == "marker"
+
+
+def test_run_cached_shares_one_round_trip(listener):
+    assert listener.run_cached("status", max_age=60) == RECORDED["status"]
+    assert listener.run_cached("status", max_age=60) == RECORDED["status"]
+
+    assert listener.cache.stats()["status"] == {"hits": 1, "shared": 0, "misses": 1, "errors": 0}
+
+
+def test_wrong_password_raises(server):
+    _listener = RCONListener("not " + server.password, server.host, server.port)
+    try:
+        with pytest.raises(WrongPassword):
+            _listener.run("status")
+    finally:
+        _listener.close()
+
+
+def test_multi_fragment_output_is_reassembled():
+    _output = "".join(f"line {_i} of a long response\n" for _i in range(500))
+    with StandInRCONServer(port=0, responses={"long": _output}, fragment_size=512) as _server:
+        _listener = RCONListener(_server.password, _server.host, _server.port)
+        try:
+            assert _listener.run("long") == _output
+        finally:
+            _listener.close()
+
+
+def test_pipelined_matches_sequential(server, listener):
+    _commands = ("status", "g15_dumpplayer", "tf_lobby_debug")
+    _sequential = [listener.run(_command) for _command in _commands]
+
+    assert run_pipelined(server.host, server.port, server.password, *_commands) == _sequential
+    assert list(RCONHelper.get_refresh_data(listener).values()) == _sequential